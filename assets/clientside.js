@@ -0,0 +1,106 @@
+/*
+Clientside callbacks for the dashboard (main.py).
+
+The server sends the latest values of every pollutant in one small 'latest-values' store per tick (or, with push
+enabled, over the WebSocket in push.js, which read_push copies into 'push-values'), these functions turn them into the
+graduated bars and the wind direction plot in the browser.
+*/
+
+//whichever of the polled and pushed latest values is newer
+function newest_values(latest_values, push_values) {
+    if (!push_values) {
+        return latest_values;
+    }
+    if (!latest_values) {
+        return push_values;
+    }
+    return (push_values.version > latest_values.version) ? push_values : latest_values;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    plume: {
+        //copies the newest pushed message into 'push-values' and switches the polling timers off while the WebSocket is
+        //open. The push timer itself is switched off if the server doesn't offer push
+        read_push: function(n, push_values, polling_disabled) {
+            var push = window.plume_push;
+            var no_update = window.dash_clientside.no_update;
+            if (!push) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+
+            var values = no_update;
+            if (push.connected && push.message && (!push_values || (push.message.version !== push_values.version))) {
+                values = push.message;
+            }
+            var disabled = (push.connected === Boolean(polling_disabled)) ? no_update : push.connected;
+            var push_disabled = push.unavailable ? true : no_update;
+
+            if ((values === no_update) && (disabled === no_update) && (push_disabled === no_update)) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            return [values, disabled, disabled, push_disabled];
+        },
+
+        //value and text of every graduated bar, bars without data yet are left alone
+        update_bars: function(latest_values, push_values) {
+            latest_values = newest_values(latest_values, push_values);
+            if (!latest_values) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            var bar_values = [];
+            var bar_texts = [];
+            latest_values.bars.forEach(function(bar) {
+                if (bar === null) {
+                    bar_values.push(window.dash_clientside.no_update);
+                    bar_texts.push(window.dash_clientside.no_update);
+                } else {
+                    bar_values.push(bar[0]);
+                    bar_texts.push(bar[1]);
+                }
+            });
+            return bar_values.concat(bar_texts);
+        },
+
+        //wind direction plot, a 40 degree wedge pointing at the wind direction with the wind speed as its radius
+        update_wind_direction: function(latest_values, push_values, colors) {
+            latest_values = newest_values(latest_values, push_values);
+            if (!latest_values) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            var val = latest_values.ws;
+            var direction = [0, latest_values.wd - 20, latest_values.wd + 20, 0];
+
+            var traces_scatterpolar = [
+                {r: [0, val, val, 0], fillcolor: colors.red},
+                {r: [0, val * 0.65, val * 0.65, 0], fillcolor: colors.yellow},
+                {r: [0, val * 0.3, val * 0.3, 0], fillcolor: colors.green}
+            ];
+            var data = traces_scatterpolar.map(function(traces) {
+                return {
+                    type: "scatterpolar",
+                    r: traces.r,
+                    theta: direction,
+                    mode: "lines",
+                    fill: "toself",
+                    fillcolor: traces.fillcolor,
+                    line: {color: "rgba(32, 32, 32, .6)", width: 1}
+                };
+            });
+
+            var layout = {
+                margin: {t: 10, b: 10, l: 10, r: 10},
+                responsive: true,
+                font: {color: "black"},
+                polar: {
+                    bgcolor: colors.graph_bg,
+                    //range = wind speed range
+                    radialaxis: {range: [0, 5], angle: 45, dtick: 2},
+                    angularaxis: {direction: "clockwise", showline: true, tickcolor: "black"}
+                },
+                showlegend: false
+            };
+
+            return {data: data, layout: layout};
+        }
+    }
+});
@@ -0,0 +1,38 @@
+/*
+WebSocket push client for the dashboard (see push_channel.py).
+
+Keeps the newest message the server pushed in window.plume_push, where the read_push clientside callback picks it up.
+If the socket can't be opened the first time the server doesn't offer push, so polling carries on and nothing is
+retried. If an open socket closes it's reopened, backing off up to 30 s, and polling covers the gap.
+*/
+
+(function() {
+    var push = window.plume_push = {connected: false, unavailable: false, message: null};
+    var opened = false;
+    var retry_ms = 1000;
+
+    function connect() {
+        var protocol = (window.location.protocol === 'https:') ? 'wss://' : 'ws://';
+        var socket = new WebSocket(protocol + window.location.host + '/push');
+
+        socket.onopen = function() {
+            opened = true;
+            retry_ms = 1000;
+            push.connected = true;
+        };
+        socket.onmessage = function(event) {
+            push.message = JSON.parse(event.data);
+        };
+        socket.onclose = function() {
+            push.connected = false;
+            if (!opened) {
+                push.unavailable = true;
+                return;
+            }
+            setTimeout(connect, retry_ms);
+            retry_ms = Math.min(retry_ms * 2, 30000);
+        };
+    }
+
+    connect();
+})();
@@ -14,6 +14,7 @@ import pandas as pd
 from collections import deque
 from configparser import ConfigParser
 from os.path import exists
+from binary_transcript import read_transcript
 
 if exists('user_defined_settings.ini') == False:
     sys.exit("ERROR: \"user_defined_settings.ini\" config file not found, please run \"create_default_config.py\"")
@@ -172,7 +173,7 @@ def csv_count_rows(csv_filename, column_names, chunk_size):
     chunk = 0
     result = 0
     while True:
-        csv_data = pd.read_csv(csv_filename, names=column_names, skiprows=(1 + chunk * chunk_size), nrows=chunk_size)
+        csv_data = read_transcript(csv_filename, names=column_names, columns=["Row"], start=chunk * chunk_size, stop=(chunk + 1) * chunk_size)
         row_list = csv_data["Row"].to_list()
         result += len(row_list)
 
@@ -309,7 +310,7 @@ if bulk_processing == False:
     if interlace_chunks:
         while True:
             #read in the current chunk
-            data = pd.read_csv(filename, names=col_names, skiprows=(1 + current_chunk * queue_size), nrows=queue_size)
+            data = read_transcript(filename, names=col_names, start=current_chunk * queue_size, stop=(current_chunk + 1) * queue_size)
 
             #convert current chunk to lists
             no2_list = data["NO2 (ppb)"].to_list()
@@ -349,7 +350,7 @@ if bulk_processing == False:
             #check if there's data ahead that we can use for interlacing
             if len(row_list) == queue_size:
                 # read in current chunk with the first half of the next chunk
-                data_more = pd.read_csv(filename, names=col_names, skiprows=(1 + current_chunk * queue_size), nrows=int(2 * queue_size))
+                data_more = read_transcript(filename, names=col_names, start=current_chunk * queue_size, stop=(current_chunk + 2) * queue_size)
 
                 #save this increased chunk to new lists
                 no2_list_more = data_more["NO2 (ppb)"].to_list()
@@ -417,7 +418,7 @@ if bulk_processing == False:
     else:
         while True:
             #read in the current chunk
-            data = pd.read_csv(filename, names=col_names, skiprows=(1 + current_chunk * queue_size), nrows=queue_size)
+            data = read_transcript(filename, names=col_names, start=current_chunk * queue_size, stop=(current_chunk + 1) * queue_size)
 
             #convert current chunk to lists
             no2_list = data["NO2 (ppb)"].to_list()
@@ -491,7 +492,7 @@ else:
         if interlace_chunks:
             while True:
                 # read in the current chunk
-                data = pd.read_csv(filename, names=col_names, skiprows=(1 + current_chunk * queue_size), nrows=queue_size)
+                data = read_transcript(filename, names=col_names, start=current_chunk * queue_size, stop=(current_chunk + 1) * queue_size)
 
                 # convert current chunk to lists
                 no2_list = data["NO2 (ppb)"].to_list()
@@ -530,8 +531,8 @@ else:
                 # check if there's data ahead that we can use for interlacing
                 if len(row_list) == queue_size:
                     # read in current chunk with the first half of the next chunk
-                    data_more = pd.read_csv(filename, names=col_names, skiprows=(1 + current_chunk * queue_size),
-                                            nrows=int(2 * queue_size))
+                    data_more = read_transcript(filename, names=col_names, start=current_chunk * queue_size,
+                                                stop=(current_chunk + 2) * queue_size)
 
                     # save this increased chunk to new lists
                     no2_list_more = data_more["NO2 (ppb)"].to_list()
@@ -601,7 +602,7 @@ else:
         else:
             while True:
                 # read in the current chunk
-                data = pd.read_csv(filename, names=col_names, skiprows=(1 + current_chunk * queue_size), nrows=queue_size)
+                data = read_transcript(filename, names=col_names, start=current_chunk * queue_size, stop=(current_chunk + 1) * queue_size)
 
                 # convert current chunk to lists
                 no2_list = data["NO2 (ppb)"].to_list()
@@ -0,0 +1,142 @@
+"""
+Binary Sensor Transcript for the dashboard (main.py) and the post-processing scripts (baseline.py, new_PP_A1.py and
+merge_data.py).
+
+Alongside 'Sensor Transcript <date>.csv' the dashboard can write 'Sensor Transcript <date>.plume', an append-only file
+of fixed-size typed records: 'Row' is an int64, 'Time' a datetime64[s] and every pollutant column a float64. The file
+starts with a small header (a magic string, the header length and a JSON list of the column names and dtypes) padded
+to header_alignment bytes, followed by the records back to back. Because every record has the same size, the records
+can be memory-mapped with NumPy and any range of rows or any subset of columns read without parsing text, so loading a
+month-long transcript takes a fraction of a second instead of re-parsing the csv. A record that was only partly written
+(e.g. the laptop lost power mid-write) is ignored by the reader and overwritten by the next write.
+
+read_transcript() reads either format, so the post-processing scripts accept a '.csv' or a '.plume' input file.
+"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from transcript_writer import TranscriptWriter
+
+binary_transcript_extension = 'plume'
+binary_transcript_magic = b'PLUMETR1'
+header_alignment = 256
+
+#record dtype for a list of transcript column names, 'Row' and 'Time' are special, everything else is a float64
+def transcript_dtype(fieldnames):
+    fields = []
+    for name in fieldnames:
+        if name == 'Row':
+            fields.append((name, '<i8'))
+        elif name == 'Time':
+            fields.append((name, '<M8[s]'))
+        else:
+            fields.append((name, '<f8'))
+    return np.dtype(fields)
+
+#header bytes for a record dtype
+def encode_header(dtype):
+    columns = json.dumps([[name, dtype.fields[name][0].str] for name in dtype.names]).encode('utf-8')
+    header_length = len(binary_transcript_magic) + 4 + len(columns)
+    header_length += (-header_length) % header_alignment
+    header = binary_transcript_magic + np.array(header_length, dtype='<u4').tobytes() + columns
+    return header.ljust(header_length, b' ')
+
+#reads the header of a binary transcript, returns (record dtype, header length)
+def read_header(filename):
+    with open(filename, 'rb') as file:
+        start = file.read(len(binary_transcript_magic) + 4)
+        if (len(start) < len(binary_transcript_magic) + 4) or (start[:len(binary_transcript_magic)] != binary_transcript_magic):
+            raise ValueError('"' + filename + '" is not a binary sensor transcript')
+        header_length = int(np.frombuffer(start[len(binary_transcript_magic):], dtype='<u4')[0])
+        columns = json.loads(file.read(header_length - len(start)).decode('utf-8'))
+    return np.dtype([(name, dtype) for name, dtype in columns]), header_length
+
+def is_binary_transcript(filename):
+    return filename.lower().endswith('.' + binary_transcript_extension)
+
+#number of complete records in a binary transcript
+def binary_transcript_length(filename):
+    dtype, header_length = read_header(filename)
+    return max(0, os.path.getsize(filename) - header_length) // dtype.itemsize
+
+#reads rows [start, stop) of a binary transcript into a DataFrame. 'names' renames the stored columns in order (like
+#pandas.read_csv's names argument) and 'columns' selects which (renamed) columns to load
+def read_binary_transcript(filename, names=None, columns=None, start=0, stop=None):
+    dtype, header_length = read_header(filename)
+    length = max(0, os.path.getsize(filename) - header_length) // dtype.itemsize
+
+    if names is None:
+        names = list(dtype.names)
+    elif len(names) != len(dtype.names):
+        raise ValueError('"' + filename + '" has ' + str(len(dtype.names)) + ' columns, ' + str(len(names)) + ' names were given')
+    if columns is None:
+        columns = list(names)
+
+    start, stop, step = slice(start, stop).indices(length)
+    if (length == 0) or (start >= stop):
+        return pd.DataFrame({name: np.empty(0, dtype=dtype.fields[dtype.names[names.index(name)]][0]) for name in columns})
+
+    records = np.memmap(filename, dtype=dtype, mode='r', offset=header_length, shape=(length,))[start:stop]
+    data = pd.DataFrame({name: np.array(records[dtype.names[names.index(name)]]) for name in columns})
+    del records
+    return data
+
+#reads rows [start, stop) of a csv or binary Sensor Transcript, see read_binary_transcript for names and columns
+def read_transcript(filename, names=None, columns=None, start=0, stop=None):
+    if is_binary_transcript(filename):
+        return read_binary_transcript(filename, names=names, columns=columns, start=start, stop=stop)
+
+    nrows = None if stop is None else max(0, stop - start)
+    if names is None:
+        return pd.read_csv(filename, usecols=columns, skiprows=range(1, start + 1), nrows=nrows)
+    return pd.read_csv(filename, names=names, usecols=columns, skiprows=(1 + start), nrows=nrows)
+
+#TranscriptWriter that writes the binary format instead of csv + txt, rows are the same csv rows (Row, Time, values)
+class BinaryTranscriptWriter(TranscriptWriter):
+    def __init__(self, folder_path, name, fieldnames, flush_rows=1, flush_interval_s=0, fsync=True):
+        super().__init__(folder_path, name, None, fieldnames, flush_rows=flush_rows, flush_interval_s=flush_interval_s,
+                         fsync=fsync)
+        self.dtype = transcript_dtype(self.fieldnames)
+        self.binary_file = None
+
+    def binary_filename(self, day):
+        return self.folder_path + "/" + self.csv_name + " " + str(day) + "." + binary_transcript_extension
+
+    #opens the binary transcript for a given day, writing the header if it's new and dropping a partly written record
+    def open_files(self, day):
+        self.close_files()
+
+        filename = self.binary_filename(day)
+        if os.path.isfile(filename) and os.path.getsize(filename) > 0:
+            dtype, header_length = read_header(filename)
+            if dtype != self.dtype:
+                raise IOError('"' + filename + '" was written with different columns, move it out of the log folder')
+            self.binary_file = open(filename, 'r+b')
+            self.binary_file.truncate(header_length + binary_transcript_length(filename) * self.dtype.itemsize)
+            self.binary_file.seek(0, os.SEEK_END)
+        else:
+            self.binary_file = open(filename, 'wb')
+            self.binary_file.write(encode_header(self.dtype))
+        self.file_day = day
+
+    def close_files(self):
+        if self.binary_file is not None:
+            self.binary_file.close()
+        self.binary_file = None
+        self.file_day = None
+
+    #writes rows of one day to its binary transcript as one block of records
+    def write_rows(self, day, rows):
+        if self.file_day != day:
+            self.open_files(day)
+
+        records = np.empty(len(rows), dtype=self.dtype)
+        for i, (csv_row, txt_line) in enumerate(rows):
+            records[i] = tuple(csv_row)
+        self.binary_file.write(records.tobytes())
+
+        self.binary_file.flush()
+        if self.fsync:
+            os.fsync(self.binary_file.fileno())
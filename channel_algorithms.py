@@ -0,0 +1,85 @@
+"""
+Vectorized auto event algorithms (A1 peak detection and AQ threshold crossings) for the dashboard (main.py).
+
+Every channel's trace lives in one (channels x trace_length) NumPy buffer (see trace_store.py), so each tick the A1
+percentiles, the stdev of the values below the A1 percentile, the A1 thresholds and the AQ crossing states of every
+channel that received data are computed in one vectorized pass, without a Python loop per channel. A percentile only
+needs the one or two order statistics it's interpolated from, so the windows are np.partition'ed (O(n) per channel)
+around those positions instead of fully sorted. The functions here only do the maths and return which channels fired,
+main.py marks the events afterwards.
+
+Percentiles are interpolated the same way as np.percentile and the stdev is the sample stdev, like statistics.stdev, so
+the results match what A1 computed per channel before. As with np.percentile, a window holding a NaN has a NaN
+percentile and no values below it, so A1 skips it.
+"""
+
+import numpy as np
+
+#positions of the order statistics each row's percentile is interpolated from (like np.percentile), and the fraction
+#of the way from the lower to the upper one. percentiles and counts are one per row
+def percentile_positions(counts, percentiles):
+    virtual_index = (np.asarray(percentiles, dtype=np.float64) / 100) * (counts - 1)
+    lower_index = np.floor(virtual_index).astype(np.intp)
+    upper_index = np.minimum(lower_index + 1, counts - 1)
+    return lower_index, upper_index, virtual_index - lower_index
+
+#per-row percentiles of rows partitioned around (at least) their lower and upper positions
+def row_percentiles(partitioned, lower_index, upper_index, fraction):
+    rows = np.arange(partitioned.shape[0])
+    below = partitioned[rows, lower_index]
+    above = partitioned[rows, upper_index]
+    with np.errstate(invalid='ignore'):
+        difference = above - below
+        return np.where(fraction == 0, below,
+                        np.where(fraction >= 0.5, above - difference * (1 - fraction), below + difference * fraction))
+
+#per-row count and sample standard deviation of the values strictly below m, from the sums of their deviations from m
+#(which is close to them, so the sums don't lose precision) in one pass. The stdev is nan for rows with fewer than two
+#such values
+def below_percentile_stats(windows, m):
+    below = windows < m[:, None]
+    below_counts = below.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        deviations = np.where(below, windows - m[:, None], 0.0)
+        total = deviations.sum(axis=1)
+        squared_deviations = np.einsum('ij,ij->i', deviations, deviations) - total * total / below_counts
+        sd = np.sqrt(np.maximum(squared_deviations, 0.0) / (below_counts - 1))
+    return below_counts, np.where(below_counts >= 2, sd, np.nan)
+
+#A1 statistics of a set of channels' windows (as returned by TraceStore.windows, empty slots +inf): the number and
+#sample stdev (nan for fewer than two) of the values below each channel's A1 percentile, and its thresh bump percentile
+#(0 where the bump percentile is 0)
+def A1_window_stats(windows, counts, percentiles, thresh_bump_percentiles):
+    thresh_bump_percentiles = np.asarray(thresh_bump_percentiles, dtype=np.float64)
+    positions = percentile_positions(counts, percentiles)
+    bump_positions = percentile_positions(counts, thresh_bump_percentiles)
+
+    #one partition of every row around every position any row needs
+    partitioned = np.partition(windows, np.unique(np.concatenate(positions[:2] + bump_positions[:2])), axis=1)
+    has_nan = np.isnan(windows).any(axis=1)
+    m = np.where(has_nan, np.nan, row_percentiles(partitioned, *positions))
+    below_counts, sd = below_percentile_stats(windows, m)
+    thresh_bump = np.where(thresh_bump_percentiles == 0, 0.0,
+                           np.where(has_nan, np.nan, row_percentiles(partitioned, *bump_positions)))
+    return below_counts, sd, thresh_bump
+
+#A1 peak detection for a set of channels, from their A1_window_stats. last is each channel's newest value, A1_n the
+#number of consecutive peaks so far. A value is a peak if it reaches coeff * sd (+ the thresh bump percentile, if not 0),
+#raised by sd * sqrt(A1_n) for consecutive peaks. Channels with fewer than two values below the percentile are skipped.
+#Returns (peaks, new A1_n)
+def evaluate_A1(below_counts, sd, thresh_bump, last, coeffs, A1_n):
+    thresh = np.asarray(coeffs, dtype=np.float64) * sd + thresh_bump
+
+    A1_n = np.asarray(A1_n)
+    evaluated = below_counts >= 2
+    with np.errstate(invalid='ignore'):
+        peaks = evaluated & (last >= thresh + sd * np.sqrt(A1_n))
+    return peaks, np.where(evaluated, np.where(peaks, A1_n + 1, 0), A1_n)
+
+#AQ threshold crossings. Returns (went over, went under, new over state)
+def evaluate_AQ(last, thresholds, over):
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    over = np.asarray(over, dtype=bool)
+    went_over = (last > thresholds) & ~over
+    went_under = (last < thresholds) & over
+    return went_over, went_under, (over | went_over) & ~went_under
@@ -0,0 +1,181 @@
+"""
+Channel registry for the dashboard (main.py).
+
+Every pollutant (channel) the dashboard shows is described by one Channel: its name, label and units, where the DAQ
+script puts its samples in redis (the key, and the fields of the JSON record holding the value and its time stamp),
+the range of its graduated bar, and its settings (y axis range, autoscale, A1 and AQ parameters, real or simulated
+data). The trace store, the ingest engine, the bars, the dropdown, the log file columns and the auto event algorithm
+state are all built from the registry, so adding a channel only takes settings, not code.
+
+The eight channels the PLUME platform has always had are built in. Their settings are read from the usual sections
+([y-ranges], [A1_coeff], [A1_percentile], [A1_thresh_bump_percentile], [AQ_thresh] and [real_or_simulated], keyed by
+the channel's label). Any channel, built in or new, can also have a [channel.<name>] section, whose keys take
+precedence. A new channel is added by listing it in [channels] "names" and giving it a section, e.g.
+
+    [channels]
+    names = no2, wcpc, o3, co, co2, no, ws, wd, so2
+
+    [channel.so2]
+    label = SO2
+    unit = ppb
+    redis_key = so2
+    value_field = SO2
+    time_field = time9
+    bar_range = 0,100
+    aq_thresh = 75
+
+Settings a new channel doesn't give fall back to the defaults of create_default_config.py (its y axis range falls back
+to its bar range and it has no AQ threshold). Channel names become Dash component ids, so they can only contain
+letters, digits, '_' and '-'; labels (e.g. "PM2.5") can be anything.
+"""
+
+import os
+import re
+import copy
+from configparser import ConfigParser
+
+class Channel:
+    def __init__(self, name, label, unit, redis_key, value_field, time_field, bar_range, quantity='Concentration',
+                 log_unit=None, integer=False):
+        self.name = name
+        self.label = label
+        self.unit = unit
+        self.redis_key = redis_key
+        self.value_field = value_field
+        self.time_field = time_field
+        self.bar_range = list(bar_range)
+        self.quantity = quantity
+        #unit in the log file column names, which stay plain ascii
+        self.log_unit = unit if log_unit is None else log_unit
+        #whole-number channels (particle counts) are stored as ints, the rest rounded to 2 decimals
+        self.integer = integer
+
+        #settings, see load_channel_registry
+        self.y_range = list(bar_range)
+        self.autoscale = False
+        self.A1_coeff = 15
+        self.A1_percentile = 50
+        self.A1_thresh_bump_percentile = 1
+        self.AQ_thresh = None
+        self.source = 'real'
+        self.sim_filename = label + '_sim.csv'
+
+    #y axis title of the live plot
+    def axis_label(self):
+        return self.quantity + " (" + self.unit + ")"
+
+    #column name in the Sensor Transcript and Event Markers
+    def log_column(self):
+        return self.label + " (" + self.log_unit + ")"
+
+    #rounds a raw sample the way the channel is stored
+    def convert(self, value):
+        if self.integer:
+            return int(value)
+        return round(value, 2)
+
+#the built in channels, in log file column order
+builtin_channels = [
+    Channel('no2', 'NO2', 'ppb', 'no2', 'NO2', 'time1', [0, 200]),
+    Channel('wcpc', 'WCPC', '#/cm³', 'wcpc', 'concentration', 'time2', [1000, 20000], log_unit='#/cm^3', integer=True),
+    Channel('o3', 'O3', 'ppb', 'ozone', 'Ozone', 'time3', [0, 100]),
+    Channel('co', 'CO', 'ppm', 'teledyne', 'CO', 'time4', [0, 20]),
+    Channel('co2', 'CO2', 'ppm', 'licor', 'CO2', 'time5', [0, 1000]),
+    Channel('no', 'NO', 'ppb', 'no', 'NO', 'time6', [0, 200]),
+    Channel('ws', 'WS', 'm/s', 'ws', 'WS', 'time7', [0, 20], quantity='Wind-speed'),
+    Channel('wd', 'WD', 'degrees', 'wd', 'WD', 'time8', [0, 360], quantity='Wind-direction'),
+]
+
+class ChannelRegistry:
+    def __init__(self, channels):
+        self.channels = list(channels)
+        #row of each channel in the registry (and in the trace store and the algorithm state arrays), by name
+        self.index = {channel.name: i for i, channel in enumerate(self.channels)}
+        self.by_label = {channel.label: channel for channel in self.channels}
+
+    def __len__(self):
+        return len(self.channels)
+
+    def __iter__(self):
+        return iter(self.channels)
+
+    def __getitem__(self, name):
+        return self.channels[self.index[name]]
+
+    def names(self):
+        return [channel.name for channel in self.channels]
+
+    def labels(self):
+        return [channel.label for channel in self.channels]
+
+#helper for range settings, changes "int,int" into [int,int]
+def parse_range(string_in):
+    lower, upper = string_in.replace(" ", "").split(",")
+    return [int(lower), int(upper)]
+
+#reads a channel setting from its [channel.<name>] section, then from the legacy section, else returns the fallback
+def channel_setting(parser, channel, key, legacy_section, legacy_key, fallback, convert=str):
+    section = 'channel.' + channel.name
+    if parser.has_option(section, key):
+        return convert(parser.get(section, key))
+    if parser.has_option(legacy_section, legacy_key):
+        return convert(parser.get(legacy_section, legacy_key))
+    return fallback
+
+def parse_boolean(string_in):
+    return ConfigParser.BOOLEAN_STATES[string_in.lower()]
+
+#builds the registry from a settings file (or an already read ConfigParser), see the module docstring
+def load_channel_registry(settings):
+    if isinstance(settings, ConfigParser):
+        parser = settings
+    else:
+        parser = ConfigParser(allow_no_value=True)
+        if os.path.exists(settings):
+            parser.read(settings)
+
+    builtins = {channel.name: channel for channel in builtin_channels}
+    names = [channel.name for channel in builtin_channels]
+    if parser.has_option('channels', 'names'):
+        names = [name.strip().lower() for name in parser.get('channels', 'names').split(',') if name.strip() != '']
+
+    channels = []
+    for name in names:
+        if not re.fullmatch(r'[a-z0-9_\-]+', name):
+            raise ValueError('channel name "' + name + '" can only contain letters, digits, "_" and "-", put anything '
+                             'else in its label')
+        section = 'channel.' + name
+        if name in builtins:
+            channel = copy.copy(builtins[name])
+        elif parser.has_section(section):
+            channel = Channel(name, parser.get(section, 'label', fallback=name.upper()), parser.get(section, 'unit'),
+                              parser.get(section, 'redis_key', fallback=name), parser.get(section, 'value_field'),
+                              parser.get(section, 'time_field'), parse_range(parser.get(section, 'bar_range')))
+        else:
+            raise ValueError('channel "' + name + '" is not built in and has no [' + section + '] section')
+
+        #description overrides
+        if parser.has_section(section):
+            for key in ['label', 'unit', 'redis_key', 'value_field', 'time_field', 'quantity', 'log_unit']:
+                if parser.has_option(section, key):
+                    setattr(channel, key, parser.get(section, key))
+            if parser.has_option(section, 'bar_range'):
+                channel.bar_range = parse_range(parser.get(section, 'bar_range'))
+            if parser.has_option(section, 'integer'):
+                channel.integer = parser.getboolean(section, 'integer')
+
+        #settings
+        label = channel.label
+        channel.y_range = channel_setting(parser, channel, 'y_range', 'y-ranges', label, list(channel.bar_range), parse_range)
+        channel.autoscale = channel_setting(parser, channel, 'autoscale', 'y-ranges', 'as_' + label, False, parse_boolean)
+        channel.A1_coeff = channel_setting(parser, channel, 'a1_coeff', 'A1_coeff', label, 15, int)
+        channel.A1_percentile = channel_setting(parser, channel, 'a1_percentile', 'A1_percentile', label, 50, int)
+        channel.A1_thresh_bump_percentile = channel_setting(parser, channel, 'a1_thresh_bump_percentile',
+                                                            'A1_thresh_bump_percentile', label, 1, int)
+        channel.AQ_thresh = channel_setting(parser, channel, 'aq_thresh', 'AQ_thresh', label, None, int)
+        channel.source = channel_setting(parser, channel, 'source', 'real_or_simulated', label, 'real')
+        channel.sim_filename = channel_setting(parser, channel, 'sim_filename', 'real_or_simulated',
+                                               'sim_' + label + '_filename', label + '_sim.csv')
+        channels.append(channel)
+
+    return ChannelRegistry(channels)
@@ -42,9 +42,65 @@ config['y-ranges'] = {
     'as_WD':'false',
 }
 
+#redis connection settings, shared by the dashboard and the DAQ script
+config['redis'] = {
+    'host': 'localhost',
+    'port': '6379',
+    'db': '0',
+    'socket_timeout': '5',
+    'socket_connect_timeout': '5',
+    'max_connections': '20',
+    'use_streams': 'false',
+    'stream_key': 'plume_frames',
+    'stream_maxlen': '10000',
+    'frame_key': 'plume_frame'
+}
+
 #log files directory
 config['log_directory'] = {
-    'log_files_path':''
+    'log_files_path':'',
+    'flush_rows':'10',
+    'flush_interval_s':'5',
+    'fsync':'true',
+    'queue_size':'1000',
+    'queue_overflow':'block',
+    'binary_transcript':'false'
+}
+
+#live updates pushed to the browsers over a WebSocket (needs flask-sock, not available when served by waitress)
+config['push'] = {
+    'enable_push':'false'
+}
+
+#web server settings, "debug" (dash's development server) or "production" (waitress, needs pip install waitress)
+config['server'] = {
+    'mode': 'debug',
+    'host': '127.0.0.1',
+    'port': '8090',
+    'threads': '4',
+    'compress': 'true',
+    'asset_max_age_s': '86400'
+}
+
+#where the live state is kept, "local" (one server process) or "redis" (shared by several, see wsgi.py)
+config['state'] = {
+    'backend': 'local',
+    'key_prefix': 'plume_state',
+    'lease_s': '5',
+    'record_maxlen': '100000'
+}
+
+#summary of the callback and ingest latency metrics (see /metrics) dumped to a daily csv in the log folder
+config['metrics'] = {
+    'csv_dump': 'false',
+    'csv_interval_s': '60',
+    'keep_days': '7'
+}
+
+#channels shown on the dashboard, in log file column order. Channels other than the built in ones need a
+#[channel.<name>] section, see channel_registry.py
+config['channels'] = {
+    'names': 'no2, wcpc, o3, co, co2, no, ws, wd'
 }
 
 #GPS merge data settings
@@ -86,6 +142,7 @@ config['real_or_simulated'] = {
     'WS': 'real',
     'WD': 'real',
     'sim_data_path': '',
+    'sim_end_behaviour': 'wrap',
     'sim_NO2_filename': 'NO2_sim.csv',
     'sim_WCPC_filename': 'WCPC_sim.csv',
     'sim_O3_filename': 'O3_sim.csv',
@@ -239,6 +296,16 @@ config['modbus-tcp'] ={
     'enable_wd': 'true',
     'wd_modbus_hr': '',
     'wd_hr_length': '2',
+    'max_gap': '10',
+    'sample_rate_hz': '1',
+    'byte_order': 'big',
+    'word_order': 'big',
+}
+
+#modbus devices polled concurrently by modbus-tcp_multi_daq.py, each with a [modbus-device.<name>] section (see the
+#script). Left blank, the [modbus-tcp] settings are polled as a single device
+config['modbus-devices'] = {
+    'names': ''
 }
 
 '''
@@ -0,0 +1,74 @@
+"""
+Fixed-rate acquisition scheduler for the DAQ scripts (e.g. modbus-tcp_daq.py).
+
+FixedRateScheduler paces a DAQ loop at rate_hz samples per second off the monotonic clock. Tick n is due at
+start + n / rate_hz, computed from the tick number rather than by adding up sleeps, so the time spent reading the
+instruments doesn't make the rate drift. When a sample takes longer than a period (an overrun) the ticks it ran into
+are skipped, not bunched up, and the loop carries on at the next tick on the original grid, so samples stay evenly
+spaced and the DAQ never runs faster than rate_hz. stats() returns the tick, overrun and skipped tick counts and the
+worst lateness seen, and tick_time() the wall clock time a tick was due, which the DAQ scripts stamp the samples with.
+Asyncio DAQ loops use wait_async() instead of wait().
+"""
+
+import time
+import asyncio
+import datetime
+
+class FixedRateScheduler:
+    def __init__(self, rate_hz):
+        if rate_hz <= 0:
+            raise ValueError('the sample rate must be more than 0 Hz, not ' + str(rate_hz))
+        self.rate_hz = rate_hz
+        self.period_s = 1 / rate_hz
+        #the monotonic clock and the wall clock at tick 0, to turn ticks into wall clock times
+        self.start = time.monotonic()
+        self.start_wall = time.time()
+        self.tick = 0
+
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.max_lateness_s = 0.0
+
+    #monotonic time tick n is due
+    def due(self, tick):
+        return self.start + tick * self.period_s
+
+    #wall clock time (a datetime) the current tick was due
+    def tick_time(self):
+        return datetime.datetime.fromtimestamp(self.start_wall + self.tick * self.period_s)
+
+    #moves on to the next tick that isn't already past and returns how long to sleep until it's due. The first call
+    #is tick 0, due straight away
+    def next_tick(self):
+        if self.ticks > 0:
+            self.tick += 1
+            now = time.monotonic()
+            if now > self.due(self.tick):
+                #overrun, skip every tick we're already past
+                late_ticks = int((now - self.start) / self.period_s) + 1 - self.tick
+                self.overruns += 1
+                self.skipped_ticks += late_ticks
+                self.max_lateness_s = max(self.max_lateness_s, now - self.due(self.tick))
+                self.tick += late_ticks
+        self.ticks += 1
+        return max(0.0, self.due(self.tick) - time.monotonic())
+
+    #sleeps until the next tick is due and returns its number
+    def wait(self):
+        time.sleep(self.next_tick())
+        return self.tick
+
+    #wait() for asyncio DAQ loops
+    async def wait_async(self):
+        await asyncio.sleep(self.next_tick())
+        return self.tick
+
+    def stats(self):
+        return dict(
+            rate_hz=self.rate_hz,
+            ticks=self.ticks,
+            overruns=self.overruns,
+            skipped_ticks=self.skipped_ticks,
+            max_lateness_s=round(self.max_lateness_s, 4)
+        )
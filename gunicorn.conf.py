@@ -0,0 +1,15 @@
+"""
+gunicorn settings for serving the dashboard through wsgi.py. gunicorn reads ./gunicorn.conf.py by default, so run it
+from this folder (or pass -c gunicorn.conf.py).
+
+gunicorn handles SIGTERM itself and shuts its workers down gracefully, so the dashboard doesn't install a SIGTERM handler
+of its own there. worker_exit writes out the worker's buffered Sensor Transcript and Event Marker rows as it stops, the
+atexit handler registered by main.initialize is a fallback.
+"""
+
+import sys
+
+def worker_exit(server, worker):
+    main = sys.modules.get('main')
+    if (main is not None) and (getattr(main, 'transcript_queue', None) is not None):
+        main.close_transcript_writers()
@@ -0,0 +1,114 @@
+"""
+Multi-resolution plot history for the dashboard's live plot (main.py).
+
+The auto event algorithms only need the last trace_length samples of each pollutant (see trace_store.py), but the live
+plot can show hours of a drive. HistoryStore keeps a few levels of history per pollutant, each a TraceStore: the raw
+samples for the most recent stretch, then the means of fixed-length buckets (e.g. 10 s and 1 min) going further back.
+A bucket is added to its level once a sample from a later bucket arrives, and the bucket still filling up is appended
+to the end of window(), so even the coarse levels show the newest data.
+
+window() picks the finest level that covers the requested time range and, if that's still more points than the plot's
+budget, downsamples them with Largest-Triangle-Three-Buckets (lttb), which keeps the peaks and the shape of the trace
+far better than taking every n-th point. So the number of points sent to the browser stays the same however far back
+the plot goes.
+"""
+
+import numpy as np
+from trace_store import TraceStore
+
+#Largest-Triangle-Three-Buckets downsampling of (x, y) to n_out points. The first and last points are kept and every
+#bucket in between contributes the point that forms the largest triangle with the previously chosen point and the mean
+#of the next bucket. x must be increasing
+def lttb(x, y, n_out):
+    n = len(x)
+    if (n_out >= n) or (n_out < 3):
+        return x, y
+
+    x_float = x.astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    #bucket edges for the n - 2 points between the first and the last, and the mean point of each bucket (the last
+    #point stands in for the bucket after the last one)
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.intp)
+    widths = np.diff(edges)
+    next_x = np.append(np.add.reduceat(x_float[1:n - 1], edges[:-1] - 1)[1:] / widths[1:], x_float[n - 1]).tolist()
+    next_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1)[1:] / widths[1:], y[n - 1]).tolist()
+
+    #choosing a point per bucket depends on the point chosen in the bucket before, so this part is a plain loop (over
+    #python floats, which is quicker than numpy calls on buckets of a few points)
+    x_list = x_float.tolist()
+    y_list = y.tolist()
+    chosen = [0]
+    previous = 0
+    for i in range(n_out - 2):
+        px = x_list[previous]
+        py = y_list[previous]
+        dx = px - next_x[i]
+        dy = next_y[i] - py
+        best_area = -1.0
+        for j in range(edges[i], edges[i + 1]):
+            area = abs(dx * (y_list[j] - py) - (px - x_list[j]) * dy)
+            if area > best_area:
+                best_area = area
+                previous = j
+        chosen.append(previous)
+    chosen.append(n - 1)
+
+    return x[chosen], y[chosen]
+
+class HistoryStore:
+    #levels is a list of (resolution in seconds, number of points) pairs, finest first. Resolution 0 keeps every sample
+    def __init__(self, channels, levels):
+        self.channels = list(channels)
+        self.resolutions_ns = [int(resolution * 1e9) for resolution, length in levels]
+        self.levels = [TraceStore(self.channels, length) for resolution, length in levels]
+
+        #the bucket each level is filling up, per channel: [bucket start, sum, count]
+        self.buckets = [{channel: [None, 0.0, 0] for channel in self.channels} for level in self.levels]
+
+    def append(self, channel, value, timestamp_ns):
+        for level, resolution_ns, buckets in zip(self.levels, self.resolutions_ns, self.buckets):
+            if resolution_ns == 0:
+                level.append(channel, value, timestamp_ns)
+                continue
+
+            bucket = buckets[channel]
+            bucket_start = timestamp_ns - timestamp_ns % resolution_ns
+            if (bucket[0] is not None) and (bucket_start != bucket[0]):
+                level.append(channel, bucket[1] / bucket[2], bucket[0])
+                bucket[1:] = [0.0, 0]
+            bucket[0] = bucket_start
+            bucket[1] += value
+            bucket[2] += 1
+
+    #total number of samples a channel has ever received
+    def sequence(self, channel):
+        return self.levels[0].sequence(channel)
+
+    #index of the finest level that still holds everything from start_ns on (or has never dropped a point)
+    def level_for(self, channel, start_ns):
+        for i, level in enumerate(self.levels):
+            if (level.count(channel) == level.sequence(channel)) or (level.timestamps(channel)[0] <= start_ns):
+                return i
+        return len(self.levels) - 1
+
+    #a channel's samples from start_ns on, at most max_points of them. Returns copies of the timestamps and values, and
+    #whether they are the raw samples (rather than bucket means or downsampled)
+    def window(self, channel, start_ns, max_points):
+        i = self.level_for(channel, start_ns)
+        timestamps = self.levels[i].timestamps(channel)
+        values = self.levels[i].values(channel)
+        first = np.searchsorted(timestamps, start_ns)
+        timestamps = timestamps[first:]
+        values = values[first:]
+
+        #add the bucket that's still filling up
+        bucket = self.buckets[i][channel]
+        if (self.resolutions_ns[i] != 0) and (bucket[0] is not None):
+            timestamps = np.append(timestamps, bucket[0])
+            values = np.append(values, bucket[1] / bucket[2])
+
+        if len(timestamps) > max_points:
+            timestamps, values = lttb(timestamps, values, max_points)
+            return timestamps, values, False
+        return timestamps.copy(), values.copy(), (self.resolutions_ns[i] == 0)
@@ -12,10 +12,14 @@ Either modbus-tcp_daq.py or another DAQ script must first be running in order fo
 import os
 import math
 import sys
+import time
+import threading
+import atexit
+import signal
+import subprocess
+import uuid
 import dash
-import csv
-import statistics
-from dash.dependencies import Output, Input, State
+from dash.dependencies import Output, Input, State, ClientsideFunction
 from plotly.subplots import make_subplots
 from collections import deque
 import collections
@@ -26,11 +30,21 @@ import dash_bootstrap_components as dbc
 import datetime as dt
 import dash_daq as daq
 import redis
-import openpyxl
+from redis_connection import get_redis_connection, redis_pool_stats, load_redis_settings
+from flask import jsonify, Response
+from sim_data import SimulatedSource, simulated_data_extensions, get_extension
+from transcript_writer import TranscriptWriter, TranscriptQueue, overflow_policies
+from binary_transcript import BinaryTranscriptWriter
+from trace_store import TraceStore, time_of_day_to_ns, iso_time_to_ns, local_now_ns, ns_to_datetime
+from history_store import HistoryStore
+from push_channel import PushBroadcaster, register_push_route
+from channel_algorithms import A1_window_stats, evaluate_A1, evaluate_AQ
+from channel_registry import load_channel_registry
+from state_backend import LocalStateBackend, RedisStateBackend
+from metrics import Metrics, MetricsCSVWriter
 import pandas as pd
 import numpy as np
 from configparser import ConfigParser
-from pathlib import Path
 import json
 from os.path import exists
 import pyuac
@@ -50,55 +64,54 @@ app.title = 'PLUME Dashboard'
 
 
 interval_s = 2 #Instrument polling rates in seconds.normally 2
-graph_range = 2 * 60 #Range of graph display in seconds.
+ingest_interval_s = 1 #how often the ingest engine pulls from redis, in seconds
+stream_batch_size = 100 #max no. of frames the ingest engine reads from the redis stream at once
+graph_range = 2 * 60 #Default range of graph display in seconds.
+graph_zoom_options = [2 * 60, 10 * 60, 60 * 60, 6 * 60 * 60, 24 * 60 * 60] #graph display ranges offered by the zoom control, in seconds
+graph_max_points = 600 #max no. of points drawn per plot, longer ranges are downsampled to this many
+#(resolution, length) in seconds of each level of graph history, finest first. Resolution 0 keeps every sample
+history_levels = [(0, 60 * 60), (10, 6 * 60 * 60), (60, 24 * 60 * 60)]
 #trace_length = math.trunc(graph_range / interval_s)
-trace_length = 60 #no. of points on the graph
+trace_length = 60 #no. of points the auto event algorithms and autoscale work on
+
+#every channel (pollutant) on the dashboard, in log file column order, with its units, redis key and settings. The
+#dropdown, bars, traces, ingest engine, log files and auto event algorithm state are all built from it (see
+#channel_registry.py)
+channel_registry = load_channel_registry('user_defined_settings.ini')
 
 #list of dropdown options
-instrumentdict = [
-    {"label": "NO2", "value": "NO2"},
-    {"label": "WCPC", "value": "WCPC"},
-    {"label": "O3", "value": "O3"},
-    {"label": "CO", "value": "CO"},
-    {"label": "CO2", "value": "CO2"},
-    {"label": "NO", "value": "NO"},
-    {"label": "WS", "value": "WS"},
-    {"label": "WD", "value": "WD"},
-]
-
-#unit dictionary, this MUST be matched with instrumentdict
-labeldict = {"NO2": "Concentration (ppb)", "WCPC": "Concentration (#/cm\u00B3)",
-             "O3": "Concentration (ppb)", "CO": "Concentration (ppm)",
-             "CO2": "Concentration (ppm)", "NO": "Concentration (ppb)",
-             "WS": "Wind-speed (m/s)", "WD": "Wind-direction (degrees)"}
-
-#define our deques
-no2_trace_y = deque([0], maxlen=trace_length)
-no2_trace_x = deque([0], maxlen=trace_length)
-wcpc_trace_y = deque([0], maxlen=trace_length)
-wcpc_trace_x = deque([0], maxlen=trace_length)
-o3_trace_y = deque([0], maxlen=trace_length)
-o3_trace_x = deque([0], maxlen=trace_length)
-co_trace_y = deque([0], maxlen=trace_length)
-co_trace_x = deque([0], maxlen=trace_length)
-co2_trace_y = deque([0], maxlen=trace_length)
-co2_trace_x = deque([0], maxlen=trace_length)
-no_trace_y = deque([0], maxlen=trace_length)
-no_trace_x = deque([0], maxlen=trace_length)
-ws_trace_y = deque([0], maxlen=trace_length)
-ws_trace_x = deque([0], maxlen=trace_length)
-wd_trace_y = deque([0], maxlen=trace_length)
-wd_trace_x = deque([0], maxlen=trace_length)
-
-#define our container deques, these are used to pass data to the live plot
-no2_trace_container = deque([dict(x=0, y=0)], maxlen=1)
-wcpc_trace_container = deque([dict(x=0, y=0)], maxlen=1)
-o3_trace_container = deque([dict(x=0, y=0)], maxlen=1)
-co_trace_container = deque([dict(x=0, y=0)], maxlen=1)
-co2_trace_container = deque([dict(x=0, y=0)], maxlen=1)
-no_trace_container = deque([dict(x=0, y=0)], maxlen=1)
-ws_trace_container = deque([dict(x=0, y=0)], maxlen=1)
-wd_trace_container = deque([dict(x=0, y=0)], maxlen=1)
+instrumentdict = [{"label": channel.label, "value": channel.label} for channel in channel_registry]
+
+#unit dictionary, the y axis title of each pollutant
+labeldict = {channel.label: channel.axis_label() for channel in channel_registry}
+
+#the last trace_length samples of every pollutant (values and time stamps), shared by the ingest engine, the auto event
+#algorithms, the log files and the live plot (see trace_store.py). Its rows are in registry order
+trace_store = TraceStore(channel_registry.names(), trace_length)
+
+#latency histograms and counters of the callbacks and the ingest engine stages, served at /metrics and optionally dumped
+#to a daily csv in the log folder (see metrics.py)
+metrics = Metrics()
+metrics.describe('callback_duration_seconds', 'Time spent in each dash callback that returned an update.')
+metrics.describe('stage_duration_seconds', 'Time spent in each stage of the ingest engine and the live plot.')
+metrics.describe('prevent_update_total', 'Callback calls that raised PreventUpdate.')
+metrics.describe('duplicate_samples_total', 'Samples skipped because their time stamp was already ingested.')
+metrics_csv_writer = None
+
+#WebSocket push channel, set up in main if [push] "enable_push" is on (see push_channel.py)
+push_broadcaster = None
+
+#where the live state is shared with the other server processes, set up in initialize from the [state] settings (see
+#state_backend.py). Only the ingest leader pulls DAQ frames, the other processes replay the frames it publishes
+state_backend = LocalStateBackend()
+is_ingest_leader = False
+
+#identifies this server process in the browsers' liveplot-state, a figure is only extended by the process that drew it
+server_instance_id = uuid.uuid4().hex
+
+#hours of history for the live plot, at a few resolutions (see history_store.py)
+history_store = HistoryStore(trace_store.channels,
+                             [(resolution, int(length / max(resolution, ingest_interval_s))) for resolution, length in history_levels])
 
 #helper function for settings loading, changes "int,int" into [int,int]
 def string_to_list_interval(string_in):
@@ -137,79 +150,46 @@ foldend = 0
 ###################################'''
 avs = 0
 
-#peak detection algorithm
-def A1ap(data_points, pollutant):
-    #exiting the function if A1 is disabled
-    global A1
-    global A1_startup_bypass
-    global index_clock
-    if (A1 == False) or (index_clock<A1_startup_bypass):
-        return None
-
-    # defining vars and importing global vars
-    #m = statistics.median(data_points) #old command using 50th percentile (median)
-    global A1_percentile
-    global A1_thresh_bump_percentile
-    m = np.percentile(data_points, A1_percentile[pollutant]) #using a custom percentile as our median
-    below_m = []
-    global A1_auto_event_count
-    global A1_n
-    global A1_coeff
-
-    if A1_thresh_bump_percentile[pollutant] == 0:
-        thresh_bump = 0
-    else:
-        thresh_bump = np.percentile(data_points, A1_thresh_bump_percentile[pollutant])
-
-    #creating list of points below median and determining the threshold
-    for i in data_points:
-        if i < m:
-            below_m.append(i)
-    if len(below_m) < 2:
-        return None
-    sd = statistics.stdev(below_m) #stdev will do sample sd and pstdev will do population sd
-    thresh = A1_coeff[pollutant] * sd
-    thresh += thresh_bump #adding thresh bumpp
-
-    #(printing info for debugging purposes, only implemented for NO2)
-    '''
-    if pollutant == "no2":
-        global no2_clock_y
-        global no2_clock_x
-        below_m_rounded = [round(num, 2) for num in below_m]
-        print("x="+str(no2_clock_x)+", y=" + str(round(no2_clock_y, 2)) + ", median: " + str(round(m, 2)) + ", bm-sd: " + str(
-            round(sd, 2)) + ", thresh: " + str(round(thresh, 2)) + " A1_n=" + str(A1_n["no2"]) + ", below_m: " + str(
-            below_m_rounded))
-    '''
-
-    # checking the appropriate threshold
-    if A1_n[pollutant] == 0:
-        if data_points[-1] >= thresh:
-            A1_n[pollutant] += 1
-            auto_event_mark("A1-"+pollutant+"-" + str(A1_auto_event_count[pollutant]),"peak",pollutant)
-            A1_auto_event_count[pollutant] += 1
-
-            #for debugging
-            #if pollutant == "no2":
-                #print("peak")
-
-            return None
-        else:
-            return None
-    else:
-        if data_points[-1] >= (thresh + sd * math.sqrt(A1_n[pollutant])):
-            A1_n[pollutant] += 1
-            auto_event_mark("A1-" + pollutant + "-" + str(A1_auto_event_count[pollutant]),"peak",pollutant)
-            A1_auto_event_count[pollutant] += 1
-
-            # for debugging
-            #if pollutant == "no2":
-                #print("s-peak")
-
-            return None
-        else:
-            A1_n[pollutant] = 0
-            return None
+#A1 peak detection and AQ over/under detection for the pollutants that got new data this tick. The numbers for every
+#pollutant are computed in one vectorized pass over the trace store (see channel_algorithms.py), with the settings and
+#state of each pollutant kept in arrays in registry order, and the events are marked afterwards, in the order the
+#pollutants were ingested. Pollutants without an AQ threshold (nan) never cross it. The wind direction uses
+#wind_direction_alert instead of AQ. now is the frame's time, as written to the event markers
+@metrics.timed('stage_duration_seconds', 'stage', 'algorithms')
+def run_auto_event_algorithms(pollutants, now):
+    rows = np.array([channel_registry.index[pollutant] for pollutant in pollutants], dtype=np.intp)
+    last = trace_store.last_values(rows)
+    peaks = np.zeros(len(pollutants), dtype=bool)
+    went_over = np.zeros(len(pollutants), dtype=bool)
+    went_under = np.zeros(len(pollutants), dtype=bool)
+
+    #A1, skipped while disabled and for the first A1_startup_bypass rows
+    if A1 and (index_clock >= A1_startup_bypass):
+        windows, counts = trace_store.windows(rows)
+        below_counts, sd, thresh_bump = A1_window_stats(windows, counts, A1_percentile[rows],
+                                                        A1_thresh_bump_percentile[rows])
+        peaks, A1_n[rows] = evaluate_A1(below_counts, sd, thresh_bump, last, A1_coeff[rows], A1_n[rows])
+
+    #AQ
+    if AQ:
+        went_over, went_under, AQ_over[rows] = evaluate_AQ(last, AQ_thresh[rows], AQ_over[rows])
+
+    #marking the events
+    for i in np.flatnonzero(peaks | went_over | went_under):
+        pollutant = pollutants[i]
+        row = rows[i]
+        if peaks[i]:
+            auto_event_mark("A1-" + pollutant + "-" + str(A1_auto_event_count[row]), "peak", pollutant, now)
+            A1_auto_event_count[row] += 1
+        if went_over[i]:
+            auto_event_mark("AQ-" + pollutant.upper() + "-over-" + str(AQ_auto_event_count[row]), "AQ over", pollutant, now)
+            AQ_auto_event_count[row] += 1
+        elif went_under[i]:
+            auto_event_mark("AQ-" + pollutant.upper() + "-under-" + str(AQ_auto_event_count[row]), "AQ under", pollutant, now)
+            AQ_auto_event_count[row] += 1
+
+    if 'wd' in pollutants:
+        wind_direction_alert(trace_store.values('wd'), "wd", now)
 
 #A2 was originally designed to detect a steady increase... however we have disabled it. The code is here for anyone who wants to dabble with it
 def A2ap(data_points, pollutant):
@@ -263,37 +243,8 @@ def A2ap(data_points, pollutant):
     else:
         return None
 
-#AQ over/under detection
-def AQap(data_points, pollutant):
-    #exitting function if AQ is disabled
-    global AQ
-    if AQ == False:
-        return None
-
-    #import global vars
-    global AQ_thresh
-    global AQ_over
-    global AQ_auto_event_count
-
-    #detecting if the graph moves upward over the line
-    if (data_points[-1] > AQ_thresh[pollutant]) and (AQ_over[pollutant] == False):
-        AQ_over[pollutant] = True
-        #print(pollutant + " AQ over threshold of " + str(AQ_thresh[pollutant]))
-        ##
-        auto_event_mark("AQ-" + pollutant.upper() + "-over-" + str(AQ_auto_event_count[pollutant]), "AQ over", pollutant)
-        AQ_auto_event_count[pollutant] += 1
-        return None
-
-    #detecting if the graph moves downward over the line
-    if (data_points[-1] < AQ_thresh[pollutant]) and (AQ_over[pollutant] == True):
-        AQ_over[pollutant] = False
-        #print(pollutant + " AQ back to under threshold of " + str(AQ_thresh[pollutant]))
-        auto_event_mark("AQ-" + pollutant.upper() + "-under-" + str(AQ_auto_event_count[pollutant]), "AQ under", pollutant)
-        AQ_auto_event_count[pollutant] += 1
-        return None
-
 #detects when the wind direction is within a certain radial range
-def wind_direction_alert(data_points, pollutant):
+def wind_direction_alert(data_points, pollutant, now=None):
     #exitting function if wind direction alert is disabled
     global enable_wind_direction_alert
     if enable_wind_direction_alert == False:
@@ -305,54 +256,24 @@ def wind_direction_alert(data_points, pollutant):
     global AQ_over
     global AQ_auto_event_count
 
+    row = channel_registry.index[pollutant]
+
     #detecting if the direction moves INTO the alert range
-    if (data_points[-1] >= wind_direction_alert_range[0]) and (data_points[-1] <= wind_direction_alert_range[1]) and (AQ_over[pollutant] == False):
-        AQ_over[pollutant] = True
+    if (data_points[-1] >= wind_direction_alert_range[0]) and (data_points[-1] <= wind_direction_alert_range[1]) and (AQ_over[row] == False):
+        AQ_over[row] = True
         print("Wind direction is within alert range")
-        auto_event_mark("WD-alert-begin-" + str(AQ_auto_event_count[pollutant]), "WD alert begin", pollutant)
-        AQ_auto_event_count[pollutant] += 1
+        auto_event_mark("WD-alert-begin-" + str(AQ_auto_event_count[row]), "WD alert begin", pollutant, now)
+        AQ_auto_event_count[row] += 1
         return None
 
     #detecting if the direction moves OUT OF the alert range
-    if (not ( (data_points[-1] >= wind_direction_alert_range[0]) and (data_points[-1] <= wind_direction_alert_range[1]))) and (AQ_over[pollutant] == True):
-        AQ_over[pollutant] = False
+    if (not ( (data_points[-1] >= wind_direction_alert_range[0]) and (data_points[-1] <= wind_direction_alert_range[1]))) and (AQ_over[row] == True):
+        AQ_over[row] = False
         print("Wind direction is no longer within alert range")
-        auto_event_mark("WD-alert-end-" + str(AQ_auto_event_count[pollutant]), "WD alert end", pollutant)
-        AQ_auto_event_count[pollutant] += 1
-        return None
-
-#helper function to remove the leftmost zero of traces so that A1 can work properly
-def zero_flush():
-    #import our global switch and exit function if it's already been ran or if the queues are too small
-    global left_zero_popped
-    global no2_trace_y
-    if (left_zero_popped == True) or len(no2_trace_y) < 4:
+        auto_event_mark("WD-alert-end-" + str(AQ_auto_event_count[row]), "WD alert end", pollutant, now)
+        AQ_auto_event_count[row] += 1
         return None
 
-    #import all of our other pollutant queues
-    global wcpc_trace_y
-    global o3_trace_y
-    global co_trace_y
-    global co2_trace_y
-    global no_trace_y
-    global ws_trace_y
-    global wd_trace_y
-
-    #delete the leftmost entry (the trailing 0)
-    #print("flushing zeros")
-    no2_trace_y.popleft()
-    wcpc_trace_y.popleft()
-    o3_trace_y.popleft()
-    co_trace_y.popleft()
-    co2_trace_y.popleft()
-    no_trace_y.popleft()
-    ws_trace_y.popleft()
-    wd_trace_y.popleft()
-
-    #prevent function from running again
-    left_zero_popped = True
-
-
 srgdfg = 0
 
 
@@ -361,8 +282,8 @@ srgdfg = 0
 ##################'''
 avs=0
 # Helper function definitions for complex or repeated operations.
-def create_graduatedbar_helper(name):
-    """Helper function to create graduated bars (saves lines of code)"""
+def create_graduatedbar_helper(name, label):
+    """Helper function to create graduated bars (saves lines of code), ids are built from the channel name"""
 
     # Create each graduated bar row
     bar_row = dbc.Row(
@@ -377,7 +298,7 @@ def create_graduatedbar_helper(name):
                                               app_color['red']: [75, 100]}
                                    },
                             showCurrentValue=False,
-                            label=str(name),
+                            label=str(label),
                             id=str(name) + "-bar",
                             max=100,
                             step=2,
@@ -403,6 +324,7 @@ def create_graduatedbar_helper(name):
     # Define the graduated bar styling and return it
     return bar_row
 
+@metrics.timed('stage_duration_seconds', 'stage', 'figure_build')
 def update_liveplot_helper(trace_dict, dropdown_value):
     """Helper function to populate liveplot depending on selected pollutants"""
 
@@ -447,43 +369,43 @@ def update_liveplot_helper(trace_dict, dropdown_value):
     # Populate the divisions with scatter plots depending on number of selected pollutants.
     if numplots > 0:
         # Add a scatter in its respective row and column using the dropdown values to select pollutants
-        fig.add_scatter(y=list(trace_dict[list(dropdown_value)[0]]['y']),
-                        x=list(trace_dict[list(dropdown_value)[0]]['x']),
+        fig.add_scatter(y=trace_dict[dropdown_value[0]]['y'],
+                        x=trace_dict[dropdown_value[0]]['x'],
                         row=1, col=1, name=dropdown_value[0], mode='lines')
 
         # Update axis labels to correspond with those being plotted using the label dictionary.
         fig.update_xaxes(title_text="Time (HH:MM:SS)", row=1, col=1),
-        fig.update_yaxes(title_text=labeldict[dropdown_value[0]], row=1, col=1, range=y_range_dict[dropdown_value[0]])
+        fig.update_yaxes(title_text=labeldict[dropdown_value[0]], row=1, col=1, range=trace_dict[dropdown_value[0]]['y_range'])
 
     if numplots > 1:
         # Add a scatter in its respective row and column using the dropdown values to select pollutants
-        fig.add_scatter(y=list(trace_dict[list(dropdown_value)[1]]['y']),
-                        x=list(trace_dict[list(dropdown_value)[1]]['x']),
+        fig.add_scatter(y=trace_dict[dropdown_value[1]]['y'],
+                        x=trace_dict[dropdown_value[1]]['x'],
                         row=1, col=2, name=dropdown_value[1], mode='lines')
 
         # Update axis labels to correspond with those being plotted using the label dictionary.
         fig.update_xaxes(title_text="Time (HH:MM:SS)", row=1, col=2),
-        fig.update_yaxes(title_text=labeldict[dropdown_value[1]], row=1, col=2, range=y_range_dict[dropdown_value[1]])
+        fig.update_yaxes(title_text=labeldict[dropdown_value[1]], row=1, col=2, range=trace_dict[dropdown_value[1]]['y_range'])
 
     if numplots > 2:
         # Add a scatter in its respective row and column using the dropdown values to select pollutants
-        fig.add_scatter(y=list(trace_dict[list(dropdown_value)[2]]['y']),
-                        x=list(trace_dict[list(dropdown_value)[2]]['x']),
+        fig.add_scatter(y=trace_dict[dropdown_value[2]]['y'],
+                        x=trace_dict[dropdown_value[2]]['x'],
                         row=2, col=1, name=dropdown_value[2], mode='lines')
 
         # Update axis labels to correspond with those being plotted using the label dictionary.
         fig.update_xaxes(title_text="Time (HH:MM:SS)", row=2, col=1),
-        fig.update_yaxes(title_text=labeldict[dropdown_value[2]], row=2, col=1, range=y_range_dict[dropdown_value[2]])
+        fig.update_yaxes(title_text=labeldict[dropdown_value[2]], row=2, col=1, range=trace_dict[dropdown_value[2]]['y_range'])
 
     if numplots > 3:
         # Add a scatter in its respective row and column using the dropdown values to select pollutants
-        fig.add_scatter(y=list(trace_dict[list(dropdown_value)[3]]['y']),
-                        x=list(trace_dict[list(dropdown_value)[3]]['x']),
+        fig.add_scatter(y=trace_dict[dropdown_value[3]]['y'],
+                        x=trace_dict[dropdown_value[3]]['x'],
                         row=2, col=2, name=dropdown_value[3], mode='lines')
 
         # Update axis labels to correspond with those being plotted using the label dictionary.
         fig.update_xaxes(title_text="Time (HH:MM:SS)", row=2, col=2),
-        fig.update_yaxes(title_text=labeldict[dropdown_value[3]], row=2, col=2, range=y_range_dict[dropdown_value[3]])
+        fig.update_yaxes(title_text=labeldict[dropdown_value[3]], row=2, col=2, range=trace_dict[dropdown_value[3]]['y_range'])
 
     # Apply plot styling
     fig.update_layout(
@@ -495,11 +417,16 @@ def update_liveplot_helper(trace_dict, dropdown_value):
 
     # Set the number of ticks on the x axis in all plots to declutter the axis tick text.
     fig.update_xaxes(
-        nticks=4
+        nticks=4,
+        tickformat="%H:%M:%S"
     )
 
     return fig
 
+#zoom control options, the range of the live plot in seconds
+graph_zoom_dict = [{"label": str(zoom // 3600) + " h" if zoom >= 3600 else str(zoom // 60) + " min", "value": zoom}
+                   for zoom in graph_zoom_options]
+
 #define live plots
 liveplot = dbc.Card(
     [
@@ -508,6 +435,15 @@ liveplot = dbc.Card(
                 dbc.Col(
                     html.H5("Pollutant Histogram"),
                 ),
+                dbc.Col(
+                    dcc.Dropdown(
+                        id='graph-zoom',
+                        options=graph_zoom_dict,
+                        value=graph_range,
+                        clearable=False,
+                    ),
+                    width=3,
+                ),
             ]
         ),
         dcc.Graph(
@@ -579,16 +515,8 @@ liveplot = dbc.Card(
 livebar = dbc.Card(
     [
         html.H5("Live Pollutant Data"),
-        create_graduatedbar_helper("NO2"),
-        create_graduatedbar_helper("WCPC"),
-        create_graduatedbar_helper("O3"),
-        create_graduatedbar_helper("CO"),
-        create_graduatedbar_helper("CO2"),
-        create_graduatedbar_helper("NO"),
-        create_graduatedbar_helper("WS"),
-        create_graduatedbar_helper("WD"),
-    ],
-    style={"padding": "5px 5px 5px 5px"},
+    ] + [create_graduatedbar_helper(channel.name, channel.label) for channel in channel_registry],
+    style={"padding": "5px 5px 5px 5px", "overflow-y": "auto"},
     className="h-100"
 )
 
@@ -652,12 +580,6 @@ app.layout = dbc.Container(
                 ),
             ],
         ),
-        # Update interval for the wind direction module
-        dcc.Interval(
-            id='wind-interval',
-            interval=interval_s * 1000,
-            n_intervals=0,
-        ),
         # Update interval for instrument input
         dcc.Interval(
             id='daq-interval',
@@ -673,6 +595,28 @@ app.layout = dbc.Container(
         html.Div(
             id='dump-hdiv',
             style={'display': 'none'}
+        ),
+        # What the live plot in this browser currently shows, so only new samples are sent to it
+        dcc.Store(
+            id='liveplot-state'
+        ),
+        # Latest bar values and wind speed and direction, the bars and wind direction plot are drawn from it in the browser
+        dcc.Store(
+            id='latest-values'
+        ),
+        # Colours for the wind direction plot
+        dcc.Store(
+            id='app-colors',
+            data=app_color
+        ),
+        # Latest values pushed over the WebSocket, and the (browser only) timer that picks them up
+        dcc.Store(
+            id='push-values'
+        ),
+        dcc.Interval(
+            id='push-interval',
+            interval=50,
+            n_intervals=0
         )
     ],
     fluid=True,
@@ -685,108 +629,82 @@ avs=0
 ## SECTION 4. CSV data marking functions ##
 ########################################'''
 avs=0
-#shared auto event marking function
-def auto_event_mark(auto_event_name,algorithm,pollutant):
+#column headers of the Event Markers and Sensor Transcript csv files
+event_marker_fields = ['Type','Pollutant','Event Tag', 'Time'] + [channel.log_column() for channel in channel_registry]
+sensor_transcript_fields = ['Row','Time'] + [channel.log_column() for channel in channel_registry]
+
+#returns the current value of each pollutant, in the column order of the log files
+def current_pollutant_values():
+    return [trace_store.last(pollutant) for pollutant in channel_registry.names()]
+
+#writes out every queued row and closes the log files, registered with atexit so nothing is lost on shutdown
+def close_transcript_writers():
+    transcript_queue.close()
+
+#formats a time stamp (epoch nanoseconds) like the Time column of the log files
+def log_time(timestamp_ns):
+    return ns_to_datetime(timestamp_ns).strftime("%Y-%m-%d %H:%M:%S")
+
+#shared auto event marking function, now is the time of the frame that set off the event (the current time if not given)
+def auto_event_mark(auto_event_name,algorithm,pollutant,now=None):
     try:
-        # get today's date
-        this_day = dt.date.today()
-        # Create a file name.
-        filename = log_folder_path + "/Event Markers " + str(this_day) + ".csv"
-        txt_filename = log_folder_path + "/Event Markers Backup " + str(this_day) + ".txt"
-
-        # Check if the file exists already.
-        file_exists = os.path.isfile(filename)
-        with open(filename, 'a', newline='\n') as file, open(txt_filename, 'a', newline='\n') as txt_file:
-            # Create a dictionary with our seven csv columns
-            markerdict = dict.fromkeys(['Type','Pollutant','Event Tag', 'Time','NO2 (ppb)', 'WCPC (#/cm^3)', 'O3 (ppb)', 'CO (ppm)', 'CO2 (ppm)','NO (ppb)','WS (m/s)','WD (degrees)'])
-
-            # Populate our columns with the user input and current time and current values of pollutants
-            markerdict['Type'] = algorithm
-            markerdict['Pollutant'] = pollutant
-            markerdict['Time'] = (dt.datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
-            markerdict['Event Tag'] = auto_event_name
-            markerdict['NO2 (ppb)'] = no2_trace_y[-1]
-            markerdict['WCPC (#/cm^3)'] = wcpc_trace_y[-1]
-            markerdict['O3 (ppb)'] = o3_trace_y[-1]
-            markerdict['CO (ppm)'] = co_trace_y[-1]
-            markerdict['CO2 (ppm)'] = co2_trace_y[-1]
-            markerdict['NO (ppb)'] = no_trace_y[-1]
-            markerdict['WS (m/s)'] = ws_trace_y[-1]
-            markerdict['WD (degrees)'] = wd_trace_y[-1]
-
-            # Write our data to our csv
-            writer = csv.DictWriter(file, delimiter=',', fieldnames=list(markerdict.keys()))
-
-            # prepare a string to be written to our txt and then write to it
-            txt_string = str((dt.datetime.now()).strftime("%Y-%m-%d %H:%M:%S")) + ", " + auto_event_name + ", " + str(
-                no2_trace_y[-1]) + ", " + str(wcpc_trace_y[-1]) + ", " + str(o3_trace_y[-1]) + ", " + str(
-                co_trace_y[-1]) + ", " + str(co2_trace_y[-1]) +', ' +str(no_trace_y[-1]) +', ' +str(ws_trace_y[-1]) +', ' +str(wd_trace_y[-1]) +"\n"
-            txt_file.write(txt_string)
-
-            # If the log file did not already exist, write the column headers.
-            if not file_exists:
-                writer.writeheader()
-
-            # Write our row of data
-            writer.writerow(markerdict)
+        if now is None:
+            now = (dt.datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        values = current_pollutant_values()
+
+        # prepare a string to be written to our txt
+        txt_string = now + ", " + auto_event_name + ", " + ", ".join([str(value) for value in values]) + "\n"
+
+        # Queue our row of data for the transcript writer thread
+        transcript_queue.put('event_markers', [algorithm, pollutant, auto_event_name, now] + values, txt_string)
     # If an IO error occurs, do the following
     except IOError:
         print(
             "Error marking event. Check log folder read/write permissions or run bash script as administrator")
         return False, not False
 
-#sensor transcript function, writes current row to sensor transcript
-def sensor_dump():
+#sensor transcript function, writes current row to sensor transcript. now is the time of the frame the row is for, so
+#frames ingested together (a batch off the stream, or catching up after a stall) keep their own times
+@metrics.timed('stage_duration_seconds', 'stage', 'sensor_dump')
+def sensor_dump(now):
     global index_clock
     try:
-        # get today's date
-        this_day = dt.date.today()
-        # Create a file name.
-        filename = log_folder_path + "/Sensor Transcript " + str(this_day) + ".csv"
-        txt_filename = log_folder_path + "/Sensor Transcript Backup " + str(this_day) + ".txt"
-
-        # Check if the file exists already.
-        file_exists = os.path.isfile(filename)
-        with open(filename, 'a', newline='\n') as file, open(txt_filename, 'a', newline='\n') as txt_file:
-            # Create a dictionary with our seven csv columns
-            markerdict = dict.fromkeys(['Row','Time','NO2 (ppb)', 'WCPC (#/cm^3)', 'O3 (ppb)', 'CO (ppm)', 'CO2 (ppm)','NO (ppb)','WS (m/s)','WD (degrees)'])
-
-            # Populate our columns with the user input and current time and current values of pollutants
-            markerdict['Row'] = index_clock
-            markerdict['Time'] = (dt.datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
-            markerdict['NO2 (ppb)'] = no2_trace_y[-1]
-            markerdict['WCPC (#/cm^3)'] = wcpc_trace_y[-1]
-            markerdict['O3 (ppb)'] = o3_trace_y[-1]
-            markerdict['CO (ppm)'] = co_trace_y[-1]
-            markerdict['CO2 (ppm)'] = co2_trace_y[-1]
-            markerdict['NO (ppb)'] = no_trace_y[-1]
-            markerdict['WS (m/s)'] = ws_trace_y[-1]
-            markerdict['WD (degrees)'] = wd_trace_y[-1]
-
-            # Write our data to our csv
-            writer = csv.DictWriter(file, delimiter=',', fieldnames=list(markerdict.keys()))
-
-            # prepare a string to be written to our txt and then write to it
-            txt_string = str(index_clock)+", "+str((dt.datetime.now()).strftime("%Y-%m-%d %H:%M:%S")) + ", " +str(
-                no2_trace_y[-1]) + ", " + str(wcpc_trace_y[-1]) + ", " + str(o3_trace_y[-1]) + ", " +str(
-                co_trace_y[-1]) + ", " + str(co2_trace_y[-1]) + ", "+ str(no_trace_y[-1])  +', ' +str(ws_trace_y[-1]) +', ' +str(wd_trace_y[-1]) +"\n"
-            txt_file.write(txt_string)
-            index_clock += 1
-
-            # If the log file did not already exist, write the column headers.
-            if not file_exists:
-                writer.writeheader()
-
-            # Write our row of data
-            writer.writerow(markerdict)
+        values = current_pollutant_values()
+
+        # prepare a string to be written to our txt
+        txt_string = str(index_clock) + ", " + now + ", " + ", ".join([str(value) for value in values]) + "\n"
+
+        # Queue our row of data for the transcript writer thread, which batches rows and flushes them according to the
+        # [log_directory] settings
+        transcript_queue.put('sensor_transcript', [index_clock, now] + values, txt_string)
+        if binary_transcript:
+            transcript_queue.put('sensor_transcript_binary', [index_clock, now] + values, None)
+        index_clock += 1
     # If an IO error occurs, do the following
     except IOError:
         print(
-            "Error marking event. Check log folder read/write permissions or run bash script as administrator")
+            "Error writing sensor transcript. Check log folder read/write permissions or run bash script as administrator")
         return False, not False
 
-#function for reading commands and executing them
+#the channel a command names, by its name or (in any case) its label
+def command_channel(pollutant):
+    if pollutant in channel_registry.index:
+        return channel_registry[pollutant]
+    for channel in channel_registry:
+        if channel.label.lower() == pollutant:
+            return channel
+    raise KeyError('no channel "' + pollutant + '"')
+
+#function for reading commands and executing them. A command naming a pollutant there's no channel for, or with a
+#value that isn't a number, is printed and ignored, and still marked as an event
 def read_command(raw_command):
+    try:
+        return run_command(raw_command)
+    except (KeyError, ValueError) as e:
+        print("Invalid command \"" + raw_command + "\", ignoring it: " + str(e))
+        return None
+
+def run_command(raw_command):
     #exiting function if not a command
     global command_character
     if raw_command[0] != command_character:
@@ -823,7 +741,7 @@ def read_command(raw_command):
             new_coeff += command[i]
 
         print("changing A1_coeff for " + pollutant + " to " + new_coeff)
-        A1_coeff[pollutant] = int(new_coeff)
+        A1_coeff[channel_registry.index[command_channel(pollutant).name]] = int(new_coeff)
         return None
 
     #change of A1_percentile command
@@ -844,7 +762,7 @@ def read_command(raw_command):
             new_percentile += command[i]
 
         print("changing A1_percentile for " + pollutant + " to " + new_percentile)
-        A1_percentile[pollutant] = int(new_percentile)
+        A1_percentile[channel_registry.index[command_channel(pollutant).name]] = int(new_percentile)
         return None
 
     #change of AQ_thresh command
@@ -865,7 +783,7 @@ def read_command(raw_command):
             new_thresh += command[i]
 
         print("changing AQ_thresh for " + pollutant + " to " + new_thresh)
-        AQ_thresh[pollutant] = int(new_thresh)
+        AQ_thresh[channel_registry.index[command_channel(pollutant).name]] = int(new_thresh)
         return None
 
     #simple A1, AQ, and wind direction alert toggle switch
@@ -944,7 +862,7 @@ def read_command(raw_command):
                 lower_bound += command[i]
 
             print("changing graph y_range for " + pollutant + " to [" + lower_bound + "," + upper_bound + "]")
-            y_range_dict[pollutant.upper()] = [int(lower_bound), int(upper_bound)]
+            y_range_dict[command_channel(pollutant).label] = [int(lower_bound), int(upper_bound)]
             return None
 
 
@@ -964,7 +882,7 @@ def read_command(raw_command):
 
 
         print("changing graph y_range for " + pollutant + " to [" + lower_bound +","+upper_bound+"]" )
-        y_range_dict[pollutant.upper()] = [int(lower_bound),int(upper_bound)]
+        y_range_dict[command_channel(pollutant).label] = [int(lower_bound),int(upper_bound)]
         return None
 
 
@@ -981,7 +899,7 @@ def read_command(raw_command):
         for i in range(3, len(command)):
             pollutant += command[i]
 
-        pollutant = pollutant.upper()
+        pollutant = command_channel(pollutant).label
 
         if enable_autoscale_dict[pollutant]:
             print("Disabling autoscale for "+pollutant)
@@ -1017,12 +935,76 @@ def read_command(raw_command):
 
     ##
 
+#writes a manually marked event to the Event Markers, running it first if it's a command. now is when it was marked.
+#Only the ingest engine of the ingest leader calls this, holding trace_lock, so commands always change the settings the
+#ingest engine uses and never while a frame is being ingested or a plot drawn
+def write_event_marker(eventtag, now):
+    ################################################################################
+    read_command(eventtag)
+    global is_valid_command
+    global toggle_type
+
+    '''
+    #special commands for NO2 A1 settings and AQ setting
+    if eventtag[0] == "%":
+        global A1_coeff
+        global A1_percentile
+
+        #change of A1_coeff for no2
+        new_coeff = ""
+        if eventtag[1].lower() == "c":
+            for i in range(2, len(eventtag)):
+                new_coeff += eventtag[i]
+            print("changing A1_coeff for NO2 to "+new_coeff)
+            A1_coeff[channel_registry.index["no2"]] = int(new_coeff)
+
+        #change of A1_percentile for no2
+        new_percentile = ""
+        if eventtag[1].lower() == "p":
+            for i in range(2, len(eventtag)):
+                new_percentile += eventtag[i]
+            print("changing A1_percentile for NO2 to " + new_percentile)
+            A1_percentile[channel_registry.index["no2"]] = int(new_percentile)
+
+        #change AQ thresh for no2
+        new_thresh = ""
+        if eventtag[1].lower() == "a":
+            for i in range(2, len(eventtag)):
+                new_thresh += eventtag[i]
+            print("changing AQ_thresh for NO2 to " + new_thresh)
+            AQ_thresh[channel_registry.index["no2"]] = int(new_thresh)
+    '''
+    ###############################################################################
+
+    values = current_pollutant_values()
+
+    #determining if event should be marked as a manual event or a command
+    if is_valid_command:
+        event_type = "command"
+    else:
+        event_type = "manual"
+    #resetting the valid command switch
+    is_valid_command = False
+
+    if toggle_type == ('(A1 OFF)' or '(A1 ON)' or '(AQ OFF)' or '(AQ ON)' or '(WDA ON)' or '(WDA OFF)'):
+        event_name = str(eventtag)+' '+str(toggle_type)
+    else:
+        event_name = eventtag
+    toggle_type = ''
+
+    #prepare a string to be written to our txt
+    txt_string = now+", "+str(eventtag)+", "+", ".join([str(value) for value in values])+"\n"
+
+    # Queue our row of data for the transcript writer thread, event markers are always flushed straight away
+    transcript_queue.put('event_markers', [event_type, "-", event_name, now] + values, txt_string)
+
 #mark event function for manually marking events. This function is also used to call the read_command function. The
 #is_valid_command variable is fed through both this and the read_command function
 @app.callback([Output('mark-event-input', 'valid'),
                Output('mark-event-input', 'invalid')],
               Input('mark-event', 'n_clicks'),
               State('mark-event-input', 'value'))
+@metrics.timed('callback_duration_seconds', 'callback', 'mark_event', dash.exceptions.PreventUpdate, 'prevent_update_total')
 def mark_event(n, eventtag):
     """Marks an event with the current time and a user input. Handles exceptions and returns user feedback"""
 
@@ -1032,96 +1014,12 @@ def mark_event(n, eventtag):
             # try except else statements allow us to handle exceptions due to read/write errors
             try:
 
-                ################################################################################
-                read_command(eventtag)
-                global is_valid_command
-                global toggle_type
-
-                '''
-                #special commands for NO2 A1 settings and AQ setting
-                if eventtag[0] == "%":
-                    global A1_coeff
-                    global A1_percentile
-
-                    #change of A1_coeff for no2
-                    new_coeff = ""
-                    if eventtag[1].lower() == "c":
-                        for i in range(2, len(eventtag)):
-                            new_coeff += eventtag[i]
-                        print("changing A1_coeff for NO2 to "+new_coeff)
-                        A1_coeff["no2"] = int(new_coeff)
-
-                    #change of A1_percentile for no2
-                    new_percentile = ""
-                    if eventtag[1].lower() == "p":
-                        for i in range(2, len(eventtag)):
-                            new_percentile += eventtag[i]
-                        print("changing A1_percentile for NO2 to " + new_percentile)
-                        A1_percentile["no2"] = int(new_percentile)
-
-                    #change AQ thresh for no2
-                    new_thresh = ""
-                    if eventtag[1].lower() == "a":
-                        for i in range(2, len(eventtag)):
-                            new_thresh += eventtag[i]
-                        print("changing AQ_thresh for NO2 to " + new_thresh)
-                        AQ_thresh["no2"] = int(new_thresh)
-                '''
-                ###############################################################################
-
-                #get today's date
-                this_day = dt.date.today()
-                # Create a file name.
-                filename = log_folder_path + "/Event Markers "+str(this_day)+".csv"
-                txt_filename = log_folder_path + "/Event Markers Backup " + str(this_day) + ".txt"
-
-                # Check if the file exists already.
-                file_exists = os.path.isfile(filename)
-                with open(filename, 'a', newline='\n') as file, open(txt_filename, 'a',newline='\n') as txt_file:
-                    # Create a dictionary with our seven csv columns
-                    markerdict = dict.fromkeys(['Type','Pollutant','Event Tag', 'Time','NO2 (ppb)', 'WCPC (#/cm^3)', 'O3 (ppb)', 'CO (ppm)', 'CO2 (ppm)','NO (ppb)','WS (m/s)','WD (degrees)'])
-
-
-                    # Populate our columns with the user input and current time and current values of pollutants
-                    #determining if event should be marked as a manual event or a command
-                    if is_valid_command:
-                        markerdict['Type'] = "command"
-                    else:
-                        markerdict['Type'] = "manual"
-                    #resetting the valid command switch
-                    is_valid_command = False
-                    markerdict['Pollutant'] = "-"
-                    markerdict['Time'] = (dt.datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
-
-                    if toggle_type == ('(A1 OFF)' or '(A1 ON)' or '(AQ OFF)' or '(AQ ON)' or '(WDA ON)' or '(WDA OFF)'):
-                        markerdict['Event Tag'] = str(eventtag)+' '+str(toggle_type)
-                    else:
-                        markerdict['Event Tag'] = eventtag
-                    toggle_type = ''
-                    markerdict['NO2 (ppb)'] = no2_trace_y[-1]
-                    markerdict['WCPC (#/cm^3)'] = wcpc_trace_y[-1]
-                    markerdict['O3 (ppb)'] = o3_trace_y[-1]
-                    markerdict['CO (ppm)'] = co_trace_y[-1]
-                    markerdict['CO2 (ppm)'] = co2_trace_y[-1]
-                    markerdict['NO (ppb)'] = no_trace_y[-1]
-                    markerdict['WS (m/s)'] = ws_trace_y[-1]
-                    markerdict['WD (degrees)'] = wd_trace_y[-1]
-
-                    # Write our data to our csv
-                    writer = csv.DictWriter(file, delimiter=',', fieldnames=list(markerdict.keys()))
-
-                    #prepare a string to be written to our txt and then write to it
-                    txt_string = str((dt.datetime.now()).strftime("%Y-%m-%d %H:%M:%S"))+", "+str(eventtag)+", "+str(no2_trace_y[-1])+", "+str(wcpc_trace_y[-1])+", "+str(o3_trace_y[-1])+", "+str(co_trace_y[-1])+", "+str(co2_trace_y[-1])+', '+str(no_trace_y[-1])+', '+str(ws_trace_y[-1])+', '+str(wd_trace_y[-1])+"\n"
-                    txt_file.write(txt_string)
-
-                    # If the log file did not already exist, write the column headers.
-                    if not file_exists:
-                        writer.writeheader()
-
-                    # Write our row of data
-                    writer.writerow(markerdict)
-            # If an IO error occurs, do the following
-            except IOError:
+                # The event marker (and the command) is handed to the ingest engine through the state backend, even in
+                # the ingest leader, so commands only ever change the algorithm settings between frames
+                now = (dt.datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+                state_backend.submit_event([eventtag, now])
+            # If an IO error occurs (or the event can't be handed to the leader), do the following
+            except (IOError, redis.exceptions.RedisError):
                 print(
                     "Error marking event. Check log folder read/write permissions or run bash script as administrator")
                 return False, not False
@@ -1142,13 +1040,21 @@ avs=0
 ## SECTION 5. Get data functions ##
 ################################'''
 abc=1
-#these functions all use callbacks which is how we make the dashboard "live". They grab data from Redis
+#the ingest functions are run by the ingest engine on its own thread, independently of any browser tab. They grab data
+#from Redis, update the traces, run our algorithms and write the sensor transcript. The callbacks below them are how we
+#make the dashboard "live", they only read the state the ingest engine has already computed
+
+#lock shared by the ingest engine and the callbacks so that a callback never reads a half-updated trace
+trace_lock = threading.Lock()
+
+#latest graduated bar outputs (value, text) computed by the ingest engine, None until the first sample arrives
+latest_bar_outputs = {channel.name: None for channel in channel_registry}
 
 #helper function for autoscale
 def compute_interval(input_trace,pollutant):
     global autoscale_padding_dict
-    min_entry = min(input_trace)
-    max_entry = max(input_trace)
+    min_entry = float(np.min(input_trace))
+    max_entry = float(np.max(input_trace))
     range = max_entry - min_entry
     padding_amount = range * ( autoscale_padding_dict[pollutant]/100 )
 
@@ -1165,602 +1071,437 @@ def compute_interval(input_trace,pollutant):
 
     return [round(lower_bound,2), round(upper_bound,2)]
 
-#get_no2_data function is ALSO responsible for calling our sensor_dump and zero_flush functions
-@app.callback([Output('NO2-bar', 'value'),
-               Output('NO2-bar-text', 'children')],
-              Input('daq-interval', 'n_intervals'))
-def get_no2_data(n):
-    #set expected min and max for graduated bar
-    minimumvalue = 0
-    maximumvalue = 200
-
-    #connect to redis
-    conn = redis.Redis('localhost')
-
-    #pulling data from redis
-    redisdata = json.loads(conn.get('no2'))
-
-    #prevent update if we grabbed duplicate data, otherwise we carry on
-    if redisdata['time1'] == no2_trace_x[-1]:
-        raise dash.exceptions.PreventUpdate
+#ingests one pollutant's sample (its raw value and its time stamp in epoch nanoseconds), or the next value of its
+#simulated data. Returns False if there's nothing new (a duplicate, or the simulated data ran out)
+def ingest_channel_data(channel, raw_value, timestamp, check_duplicates=True):
+    #skip this pollutant if we grabbed duplicate data, otherwise we carry on
+    if check_duplicates and (timestamp == trace_store.last_timestamp(channel.name)):
+        metrics.count('duplicate_samples_total', 'channel', channel.name)
+        return False
+
+    #simulated data
+    simulated = channel.source == 'simulated'
+    if simulated:
+        #grabbing our simulated data, skip this pollutant if the simulated data has run out
+        value = sim_sources[channel.name].next_value()
+        if value is None:
+            return False
+        value = channel.convert(value)
     else:
-        #simulated data
-        global simulated_or_real
-        if simulated_or_real['no2'] == 'simulated':
-            global simulated_data_filenames
-            global no2_clock_x
-            global no2_clock_y
-
-
-            # grabbing simulated data
-            if simulated_data_filetypes['no2'] == 'csv':
-                no2_clock_y = no2_sim_csv[no2_clock_x-1]
-                no2_clock_y = round(no2_clock_y, 2)
-                no2_trace_y.append(no2_clock_y)
-            else:
-                xlsx_file = Path('SimData', simulated_data_filenames['no2'])
-                wb_obj = openpyxl.load_workbook(xlsx_file)
-                sheet = wb_obj.active
-                no2_clock_y = sheet["B" + str(no2_clock_x)].value
-                no2_clock_y = round(no2_clock_y, 2)
-                no2_trace_y.append(no2_clock_y)
-        else:
-            no2_trace_y.append(round(redisdata['NO2'],2))
-
-        no2_trace_x.append(redisdata['time1'])
-
-        #dictionary of new value to be added, then append to container
-        newvalue = dict(x=no2_trace_x, y=no2_trace_y)
-        no2_trace_container.append(newvalue)
-
-
-    #calling our algorithms
-    A1ap(no2_trace_y, "no2")
-    AQap(no2_trace_y, "no2")
-
-    sensor_dump()
-    zero_flush()
+        value = channel.convert(raw_value)
 
+    trace_store.append(channel.name, value, timestamp)
 
     ############ AUTOSCALE ###############
-    if enable_autoscale_dict['NO2'] and len(no2_trace_y) > 3:
-        global y_range_dict
-        new_interval = compute_interval(no2_trace_y,'NO2')
-        y_range_dict['NO2'] = new_interval
+    if enable_autoscale_dict[channel.label] and trace_store.count(channel.name) > 3:
+        y_range_dict[channel.label] = compute_interval(trace_store.values(channel.name), channel.label)
     ######################################
 
-    if simulated_or_real['no2'] == 'simulated':
-        no2_clock_x += 1
-        return no2_clock_y, \
-               str(no2_clock_y) + " " + labeldict['NO2'].split(' ')[1]
+    #simulated data is shown on the bar as is, real data as a percentage of the channel's bar range
+    if simulated:
+        latest_bar_outputs[channel.name] = (value, str(value) + " " + labeldict[channel.label].split(' ')[1])
     else:
-        return (redisdata['NO2'] - minimumvalue) / (maximumvalue - minimumvalue) * 100, \
-            str(redisdata['NO2']) + " " + labeldict['NO2'].split(' ')[1]
-
-@app.callback([Output('NO-bar', 'value'),
-               Output('NO-bar-text', 'children')],
-              Input('daq-interval', 'n_intervals'))
-def get_no_data(n):
-    #expected min and max for graduated bars
-    minimumvalue = 0
-    maximumvalue = 200
-
-    #connect to redis
-    conn = redis.Redis('localhost')
-
-    #pull data from redis
-    redisdata = json.loads(conn.get('no'))
-
-    #prevent update if we grabbed duplicate data, otherwise we carry on
-    if redisdata['time6'] == no_trace_x[-1]:
-        raise dash.exceptions.PreventUpdate
-    else:
-        #simulated data
-        global simulated_or_real
-        if simulated_or_real['no'] == 'simulated':
-            global simulated_data_filenames
-            global no_clock_x
-            global no_clock_y
-
-            # grab simulated data
-            if simulated_data_filetypes['no'] == 'csv':
-                no_clock_y = no_sim_csv[no_clock_x-1]
-                no_clock_y = round(no_clock_y, 2)
-                no_trace_y.append(no_clock_y)
-            else:
-                xlsx_file = Path('SimData', simulated_data_filenames['no'])
-                wb_obj = openpyxl.load_workbook(xlsx_file)
-                sheet = wb_obj.active
-                no_clock_y = sheet["B" + str(no_clock_x)].value
-                no_clock_y = round(no_clock_y, 2)
-                no_trace_y.append(no_clock_y)
-        else:
-            no_trace_y.append(round(redisdata['NO'],2))
-
-        no_trace_x.append(redisdata['time6'])
-
-        #create dictionary for new value to be plotted then append to container
-        newvalue = dict(x=no_trace_x, y=no_trace_y)
-        no_trace_container.append(newvalue)
-
-        #call our algorithms
-        A1ap(no_trace_y, "no")
-        AQap(no_trace_y, "no")
-
-        if enable_autoscale_dict['NO'] and len(no_trace_y) > 3:
-            global y_range_dict
-            new_interval = compute_interval(no_trace_y, 'NO')
-            y_range_dict['NO'] = new_interval
-
-
-        #return either real data or our simulated data
-        if simulated_or_real['no'] == 'simulated':
-            no_clock_x += 1
-            return no_clock_y, \
-                   str(no_clock_y) + " " + labeldict['NO'].split(' ')[1]
-        else:
-            return (redisdata['NO'] - minimumvalue) / (maximumvalue - minimumvalue) * 100, \
-                str(redisdata['NO']) + " " + labeldict['NO'].split(' ')[1]
-
-@app.callback([Output('WCPC-bar', 'value'),
-               Output('WCPC-bar-text', 'children')],
-              Input('daq-interval', 'n_intervals'))
-def get_wcpc_data(n):
-    #expected min and max for graduated bars
-    minimumvalue = 1000
-    maximumvalue = 20000
-
-    #connect to redis
-    conn = redis.Redis('localhost')
-
-    #grab data from redis
-    redisdata = json.loads(conn.get('wcpc'))
-
-    #check if data is duplicate, otherwise carry on
-    if redisdata['time2'] == wcpc_trace_x[-1]:
-        raise dash.exceptions.PreventUpdate
-    else:
-        #simulated data
-        global simulated_or_real
-        if simulated_or_real['wcpc'] == 'simulated':
-            global simulated_data_filenames
-            global wcpc_clock_x
-            global wcpc_clock_y
-
-            #grabbing our simulated data
-            if simulated_data_filetypes['wcpc'] == 'csv':
-                wcpc_clock_y = wcpc_sim_csv[wcpc_clock_x-1]
-                wcpc_clock_y = int(wcpc_clock_y)
-                wcpc_trace_y.append(wcpc_clock_y)
-            else:
-                xlsx_file = Path('SimData', simulated_data_filenames['wcpc'])
-                wb_obj = openpyxl.load_workbook(xlsx_file)
-                sheet = wb_obj.active
-                wcpc_clock_y = sheet["B" + str(wcpc_clock_x)].value
-                wcpc_clock_y = int(wcpc_clock_y)
-                wcpc_trace_y.append(wcpc_clock_y)
-        else:
-            wcpc_trace_y.append(int(redisdata['concentration']))
-
-        wcpc_trace_x.append(redisdata['time2'])
-
-        #create our new value dictionary, add to container, you know the drill at this point
-        newvalue = dict(x=wcpc_trace_x, y=wcpc_trace_y)
-        wcpc_trace_container.append(newvalue)
-
-        #calling our algorithms
-        A1ap(wcpc_trace_y, "wcpc")
-        AQap(wcpc_trace_y, "wcpc")
-
-        if enable_autoscale_dict['WCPC'] and len(wcpc_trace_y) > 3:
-            global y_range_dict
-            new_interval = compute_interval(wcpc_trace_y, 'WCPC')
-            y_range_dict['WCPC'] = new_interval
-
-        #return simulated data or real data
-        if simulated_or_real['wcpc'] == 'simulated':
-            wcpc_clock_x += 1
-            return wcpc_clock_y, \
-                   str(wcpc_clock_y) + " " + labeldict['WCPC'].split(' ')[1]
-        else:
-            return (redisdata['concentration'] - minimumvalue) / (maximumvalue - minimumvalue) * 100, \
-                str(redisdata['concentration']) + " " + labeldict['WCPC'].split(' ')[1]
-
-@app.callback([Output('O3-bar', 'value'),
-               Output('O3-bar-text', 'children')],
-              Input('daq-interval', 'n_intervals'))
-def get_2b_data(n):
-    #expected min and max for the graduated bar
-    minimumvalue = 0
-    maximumvalue = 100
-
-    #connect to redis
-    conn = redis.Redis('localhost')
-
-    #grab data from redis
-    redisdata = json.loads(conn.get('ozone'))
-
-    #prevent update if we grabbed duplicate data, otherwise we carry on
-    if redisdata['time3'] == o3_trace_x[-1]:
-        raise dash.exceptions.PreventUpdate
-    else:
-        #simulated data
-        global simulated_or_real
-        if simulated_or_real['o3'] == 'simulated':
-            global simulated_data_filenames
-            global o3_clock_x
-            global o3_clock_y
-
-
-            if simulated_data_filetypes['o3'] == 'csv':
-                o3_clock_y = o3_sim_csv[o3_clock_x-1]
-                o3_clock_y = round(o3_clock_y, 2)
-                o3_trace_y.append(o3_clock_y)
+        minimumvalue, maximumvalue = channel.bar_range
+        latest_bar_outputs[channel.name] = ((raw_value - minimumvalue) / (maximumvalue - minimumvalue) * 100, str(raw_value) + " " + labeldict[channel.label].split(' ')[1])
+    return True
+
+#decodes a frame record, the single JSON value a DAQ script publishes per acquisition cycle (see
+#redis_connection.publish_frame_record): its sequence number, time stamp ("time", local ISO 8601 time to the
+#microsecond) and every channel's value keyed by redis key. Returns the sequence number and a (raw value, time stamp)
+#pair per channel in registry order, None for channels the frame doesn't have
+def decode_frame_record(raw_frame):
+    with metrics.time('stage_duration_seconds', 'stage', 'json_decode'):
+        record = json.loads(raw_frame)
+    timestamp = iso_time_to_ns(record['time'])
+    values = record['values']
+    return record['seq'], [None if values.get(channel.redis_key) is None else (values[channel.redis_key], timestamp)
+                           for channel in channel_registry]
+
+#decodes a frame of per channel JSON records (the strings older DAQ scripts store under each channel's redis key, in
+#registry order, None if missing), each with its value and "HH:MM:SS" time stamp in the channel's "value_field" and
+#"time_field"
+def decode_channel_records(raw_values):
+    samples = []
+    with metrics.time('stage_duration_seconds', 'stage', 'json_decode'):
+        for channel, raw_value in zip(channel_registry, raw_values):
+            if raw_value is None:
+                samples.append(None)
+                continue
+            redisdata = json.loads(raw_value)
+            samples.append((redisdata[channel.value_field], time_of_day_to_ns(redisdata[channel.time_field])))
+    return samples
+
+#ingests one frame of samples (a (raw value, time stamp) pair per channel in registry order, None if missing) and
+#writes a row to the sensor transcript if anything new arrived. The auto event algorithms run once the whole frame is
+#in. stream_id is the frame's id in the redis stream, if it came from one
+@metrics.timed('stage_duration_seconds', 'stage', 'ingest_frame')
+def ingest_frame(samples, check_duplicates, stream_id=None):
+    global latest_message, ingest_stream_id
+    with trace_lock:
+        if stream_id is not None:
+            ingest_stream_id = stream_id
+
+        new_pollutants = []
+        for channel, sample in zip(channel_registry, samples):
+            #skip channels the DAQ script hasn't written yet
+            if sample is None:
+                continue
+            if ingest_channel_data(channel, sample[0], sample[1], check_duplicates):
+                new_pollutants.append(channel.name)
+
+        if new_pollutants:
+            for pollutant in new_pollutants:
+                history_store.append(pollutant, trace_store.last(pollutant), trace_store.last_timestamp(pollutant))
+            #the frame's time is its newest sample's time stamp
+            now = log_time(max([trace_store.last_timestamp(pollutant) for pollutant in new_pollutants]))
+            run_auto_event_algorithms(new_pollutants, now)
+            sensor_dump(now)
+
+            #publish the frame for the other server processes and the browsers
+            latest_message = latest_values_message()
+            record = dict(samples=[[pollutant, trace_store.last(pollutant), trace_store.last_timestamp(pollutant)]
+                                   for pollutant in new_pollutants],
+                          message=latest_message, y_ranges=y_range_dict, autoscale=enable_autoscale_dict)
+            publish_record(record)
+            if push_broadcaster is not None:
+                push_broadcaster.publish(latest_message)
+
+#the auto event algorithm state and the settings the commands change, as published with every frame so a new ingest
+#leader can carry on where the last one stopped. Per pollutant values are keyed by name. trace_lock must be held
+def algorithm_state():
+    names = channel_registry.names()
+    return dict(index_clock=index_clock, stream_id=ingest_stream_id,
+                A1_n=dict(zip(names, A1_n.tolist())),
+                A1_auto_event_count=dict(zip(names, A1_auto_event_count.tolist())),
+                AQ_auto_event_count=dict(zip(names, AQ_auto_event_count.tolist())),
+                AQ_over=dict(zip(names, AQ_over.tolist())),
+                A1_coeff=dict(zip(names, A1_coeff.tolist())),
+                A1_percentile=dict(zip(names, A1_percentile.tolist())),
+                AQ_thresh=dict(zip(names, AQ_thresh.tolist())),
+                A1=A1, AQ=AQ, enable_wind_direction_alert=enable_wind_direction_alert,
+                wind_direction_alert_range=wind_direction_alert_range,
+                y_ranges=y_range_dict, autoscale=enable_autoscale_dict)
+
+#carries on from a published algorithm state (None if nothing was published yet). Pollutants that aren't in the
+#registry anymore are skipped. trace_lock must be held
+def restore_algorithm_state(state):
+    global index_clock, ingest_stream_id, A1, AQ, enable_wind_direction_alert, wind_direction_alert_range
+    if state is None:
+        return
+    index_clock = state['index_clock']
+    ingest_stream_id = state['stream_id']
+    for name, array in [('A1_n', A1_n), ('A1_auto_event_count', A1_auto_event_count),
+                        ('AQ_auto_event_count', AQ_auto_event_count), ('AQ_over', AQ_over), ('A1_coeff', A1_coeff),
+                        ('A1_percentile', A1_percentile), ('AQ_thresh', AQ_thresh)]:
+        for pollutant, value in state[name].items():
+            if pollutant in channel_registry.index:
+                array[channel_registry.index[pollutant]] = value
+    A1 = state['A1']
+    AQ = state['AQ']
+    enable_wind_direction_alert = state['enable_wind_direction_alert']
+    wind_direction_alert_range = state['wind_direction_alert_range']
+    y_range_dict.update((label, y_range) for label, y_range in state['y_ranges'].items() if label in y_range_dict)
+    enable_autoscale_dict.update((label, on) for label, on in state['autoscale'].items() if label in enable_autoscale_dict)
+
+#publishes an ingested frame and the algorithm state to the state backend. If another process has taken over as the
+#ingest leader, this one steps down. trace_lock must be held
+def publish_record(record):
+    global is_ingest_leader
+    if not state_backend.publish(record, algorithm_state()):
+        print("Another server process has taken over the ingest engine")
+        is_ingest_leader = False
+
+#replays frames published by the ingest leader into this process's trace and history stores, so it can serve the
+#plots. The trace store version follows the leader's, so the versions the browsers see don't depend on which process
+#answers them
+def replay_records(records):
+    global latest_message
+    if not records:
+        return
+    with trace_lock:
+        for record in records:
+            for pollutant, value, timestamp in record['samples']:
+                if pollutant in trace_store.index:
+                    trace_store.append(pollutant, value, timestamp)
+                    history_store.append(pollutant, value, timestamp)
+            y_range_dict.update((label, y_range) for label, y_range in record['y_ranges'].items() if label in y_range_dict)
+            enable_autoscale_dict.update((label, on) for label, on in record['autoscale'].items() if label in enable_autoscale_dict)
+            latest_message = record['message']
+            trace_store.version = latest_message['version']
+    if push_broadcaster is not None:
+        push_broadcaster.publish(latest_message)
+
+#polling ingest, pulls the last value of every pollutant from redis in a single MGET. Duplicates are detected with the
+#time stamps, so samples written faster than we poll are lost (used when the DAQ script doesn't write a stream)
+def ingest_tick(conn):
+    global last_frame_seq
+    with metrics.time('stage_duration_seconds', 'stage', 'redis_fetch'):
+        raw_values = conn.mget([frame_key] + [channel.redis_key for channel in channel_registry])
+    #a frame record is only new if its sequence number changed, per channel records are checked by their time stamps
+    if raw_values[0] is not None:
+        seq, samples = decode_frame_record(raw_values[0])
+        if seq != last_frame_seq:
+            last_frame_seq = seq
+            ingest_frame(samples, False)
+        return
+    ingest_frame(decode_channel_records(raw_values[1:]), True)
+
+#stream ingest, reads every frame the DAQ script added to the redis stream since last_id, in order, blocking for up to
+#one ingest interval if there are none yet. Every stream entry is a new sample so there's no duplicate check. Returns
+#the id of the last frame read. The XREAD isn't timed as a redis fetch, it's mostly waiting for frames
+def ingest_stream(conn, last_id):
+    streams = conn.xread({stream_key: last_id}, count=stream_batch_size, block=int(ingest_interval_s * 1000))
+    for stream_name, entries in streams:
+        for entry_id, fields in entries:
+            if b'frame' in fields:
+                samples = decode_frame_record(fields[b'frame'])[1]
             else:
-                xlsx_file = Path('SimData', simulated_data_filenames['o3'])
-                wb_obj = openpyxl.load_workbook(xlsx_file)
-                sheet = wb_obj.active
-                o3_clock_y = sheet["B" + str(o3_clock_x)].value
-                o3_clock_y = round(o3_clock_y, 2)
-                o3_trace_y.append(o3_clock_y)
-        else:
-            o3_trace_y.append(round(redisdata['Ozone'],2))
-
-
-        o3_trace_x.append(redisdata['time3'])
-
-
-        newvalue = dict(x=o3_trace_x, y=o3_trace_y)
-        o3_trace_container.append(newvalue)
-
-        A1ap(o3_trace_y, "o3")
-        AQap(o3_trace_y, "o3")
-
-        if enable_autoscale_dict['O3'] and len(o3_trace_y) > 3:
-            global y_range_dict
-            new_interval = compute_interval(o3_trace_y, 'O3')
-            y_range_dict['O3'] = new_interval
-
-
-        if simulated_or_real['o3'] == 'simulated':
-            o3_clock_x += 1
-            return o3_clock_y, \
-                   str(o3_clock_y) + " " + labeldict['O3'].split(' ')[1]
-        else:
-            return (redisdata['Ozone'] - minimumvalue) / (maximumvalue - minimumvalue) * 100, \
-                str(redisdata['Ozone']) + " " + labeldict['O3'].split(' ')[1]
-
-@app.callback([Output('CO-bar', 'value'),
-               Output('CO-bar-text', 'children')],
-              Input('daq-interval', 'n_intervals'))
-def get_teledyne_CO_data(n):
-    #min and max for graduated bar
-    minimumvalue = 0
-    maximumvalue = 20
-
-    #connect to redis
-    conn = redis.Redis('localhost')
-
-    #pull data from redis
-    redisdata = json.loads(conn.get('teledyne'))
-
-    #check for duplicate
-    if redisdata['time4'] == co_trace_x[-1]:
-        raise dash.exceptions.PreventUpdate
-    else:
-        #simulated data
-        global simulated_or_real
-        if simulated_or_real['co'] == 'simulated':
-            global simulated_data_filenames
-            global co_clock_x
-            global co_clock_y
-
-            if simulated_data_filetypes['co'] == 'csv':
-                co_clock_y = co_sim_csv[co_clock_x-1]
-                co_clock_y = round(co_clock_y, 2)
-                co_trace_y.append(co_clock_y)
-            else:
-                xlsx_file = Path('SimData', simulated_data_filenames['co'])
-                wb_obj = openpyxl.load_workbook(xlsx_file)
-                sheet = wb_obj.active
-                co_clock_y = sheet["B" + str(co_clock_x)].value
-                co_clock_y = round(co_clock_y, 2)
-                co_trace_y.append(co_clock_y)
-        else:
-            co_trace_y.append(round(redisdata['CO'],2))
-
-        co_trace_x.append(redisdata['time4'])
-
-        newvalue = dict(x=co_trace_x, y=co_trace_y)
-        co_trace_container.append(newvalue)
-
-        A1ap(co_trace_y, "co")
-        AQap(co_trace_y, "co")
-
-        if enable_autoscale_dict['CO'] and len(co_trace_y) > 3:
-            global y_range_dict
-            new_interval = compute_interval(co_trace_y, 'CO')
-            y_range_dict['CO'] = new_interval
-
-        if simulated_or_real['co'] == 'simulated':
-            co_clock_x += 1
-            return co_clock_y, \
-                   str(co_clock_y) + " " + labeldict['CO'].split(' ')[1]
-        else:
-            return (redisdata['CO'] - minimumvalue) / (maximumvalue - minimumvalue) * 100, \
-               str(redisdata['CO']) + " " + labeldict['CO'].split(' ')[1]
-
-@app.callback([Output('CO2-bar', 'value'),
-               Output('CO2-bar-text', 'children')],
-              Input('daq-interval', 'n_intervals'))
-def get_licor_data(n):
-    #expected min and max for graduated bar
-    minimumvalue = 0
-    maximumvalue = 1000
-
-    #connect to redis and pull data
-    conn = redis.Redis('localhost')
-    redisdata = json.loads(conn.get('licor'))
-
-    #check for duplicates
-    if redisdata['time5'] == co2_trace_x[-1]:
+                samples = decode_channel_records([fields.get(channel.redis_key.encode()) for channel in channel_registry])
+            ingest_frame(samples, False, entry_id.decode())
+            last_id = entry_id
+    return last_id
+
+#ingest engine loop, runs no matter how many browser tabs are open (including none). With streams it consumes frames
+#as they arrive, otherwise it polls at a fixed rate. When the dashboard is served by several processes, only the one
+#holding the state backend's lease ingests (and writes the event markers the others hand it), the others replay the
+#frames it publishes until the lease is free
+def ingest_engine():
+    global is_ingest_leader
+    conn = get_redis_connection()
+    #'$' means only frames added from now on, older frames in the stream are from a previous session
+    last_stream_id = '$'
+    next_tick = time.monotonic()
+    while True:
+        try:
+            if not state_backend.acquire_ingest_lease():
+                is_ingest_leader = False
+                replay_records(state_backend.read_records(block_ms=int(ingest_interval_s * 1000)))
+                continue
+            if not is_ingest_leader:
+                #just became the leader, catch up with the last one (a batch at a time) and carry on from its
+                #algorithm state
+                records = state_backend.read_records()
+                while records:
+                    replay_records(records)
+                    records = state_backend.read_records()
+                with trace_lock:
+                    restore_algorithm_state(state_backend.load_state())
+                is_ingest_leader = True
+                #carry on from the last stream frame the previous leader ingested, so none are lost in the handover
+                last_stream_id = '$' if ingest_stream_id is None else ingest_stream_id
+
+            for eventtag, now in state_backend.take_events():
+                with trace_lock:
+                    write_event_marker(eventtag, now)
+
+            if use_redis_streams:
+                last_stream_id = ingest_stream(conn, last_stream_id)
+                continue
+            ingest_tick(conn)
+        except (redis.exceptions.RedisError, TypeError, ValueError, KeyError) as e:
+            #KeyError/ValueError happen when the DAQ script writes something we don't recognise
+            print("Ingest engine error: " + str(e))
+
+        #sleep until the next tick, resyncing if we fell more than a tick behind
+        next_tick += ingest_interval_s
+        sleep_time = next_tick - time.monotonic()
+        if sleep_time < 0:
+            next_tick = time.monotonic()
+            sleep_time = 0
+        time.sleep(sleep_time)
+
+#DAQ script simple start launches, set by initialize if [simple_start] is on
+simple_start_daq_script = None
+
+#starts the simple start DAQ script. It runs its acquisition loop forever, so it gets its own process, which is stopped
+#with the dashboard
+def start_daq_script():
+    daq_process = subprocess.Popen([sys.executable, simple_start_daq_script])
+    atexit.register(daq_process.terminate)
+    return daq_process
+
+#starts the ingest engine as a daemon thread so it stops with the server
+def start_ingest_engine():
+    ingest_thread = threading.Thread(target=ingest_engine, name='ingest-engine', daemon=True)
+    ingest_thread.start()
+    return ingest_thread
+
+#order of the graduated bars (by channel name) in the latest-values store and the outputs of the update_bars clientside
+#callback
+bar_order = channel_registry.names()
+
+#the latest value and text of every graduated bar (None until the ingest engine has data for it) and the latest wind
+#speed and direction, as one small message. The bars and the wind direction plot are drawn from it in the browser (see
+#assets/clientside.js). trace_lock must be held
+def latest_values_message():
+    return dict(version=trace_store.version,
+                bars=[latest_bar_outputs[pollutant] for pollutant in bar_order],
+                ws=trace_store.last('ws') if 'ws' in trace_store.index else 0.0,
+                wd=trace_store.last('wd') if 'wd' in trace_store.index else 0.0)
+
+#latest values message of the last ingested (or replayed) frame, None until there is one
+latest_message = None
+
+#id of the last redis stream frame ingested, by this process or (once restored) by the previous ingest leader
+ingest_stream_id = None
+
+#sequence number of the last frame record the polling ingest took, a frame is only ingested once
+last_frame_seq = None
+
+#polled latest values, only sent again once the trace store version changes
+@app.callback(Output('latest-values', 'data'),
+              Input('daq-interval', 'n_intervals'),
+              State('latest-values', 'data'))
+@metrics.timed('callback_duration_seconds', 'callback', 'get_daq_data', dash.exceptions.PreventUpdate, 'prevent_update_total')
+def get_daq_data(n, latest_values):
+    message = latest_message
+    if (message is None) or ((latest_values is not None) and (latest_values['version'] == message['version'])):
         raise dash.exceptions.PreventUpdate
-    else:
-        #simulated data
-        global simulated_or_real
-        if simulated_or_real['co2'] == 'simulated':
-            global simulated_data_filenames
-            global co2_clock_x
-            global co2_clock_y
-
-            if simulated_data_filetypes['co2'] == 'csv':
-                co2_clock_y = co2_sim_csv[co2_clock_x-1]
-                co2_clock_y = round(co2_clock_y, 2)
-                co2_trace_y.append(co2_clock_y)
-            else:
-                xlsx_file = Path('SimData', simulated_data_filenames['co2'])
-                wb_obj = openpyxl.load_workbook(xlsx_file)
-                sheet = wb_obj.active
-                co2_clock_y = sheet["B" + str(co2_clock_x)].value
-                co2_clock_y = round(co2_clock_y, 2)
-                co2_trace_y.append(co2_clock_y)
-        else:
-            co2_trace_y.append(round(redisdata['CO2'],2))
-
-        co2_trace_x.append(redisdata['time5'])
-
-        newvalue = dict(x=co2_trace_x, y=co2_trace_y)
-        co2_trace_container.append(newvalue)
-
-        A1ap(co2_trace_y, "co2")
-        AQap(co2_trace_y, "co2")
-
-        if enable_autoscale_dict['CO2'] and len(co2_trace_y) > 3:
-            global y_range_dict
-            new_interval = compute_interval(co2_trace_y, 'CO2')
-            y_range_dict['CO2'] = new_interval
+    return message
+
+#pushed latest values (see assets/push.js), the polling timers are switched off while the WebSocket is open
+app.clientside_callback(
+    ClientsideFunction(namespace='plume', function_name='read_push'),
+    [Output('push-values', 'data'),
+     Output('daq-interval', 'disabled'),
+     Output('figure-interval', 'disabled'),
+     Output('push-interval', 'disabled')],
+    Input('push-interval', 'n_intervals'),
+    [State('push-values', 'data'),
+     State('daq-interval', 'disabled')]
+)
 
+app.clientside_callback(
+    ClientsideFunction(namespace='plume', function_name='update_bars'),
+    [Output(pollutant + '-bar', 'value') for pollutant in bar_order] +
+    [Output(pollutant + '-bar-text', 'children') for pollutant in bar_order],
+    [Input('latest-values', 'data'),
+     Input('push-values', 'data')]
+)
 
+app.clientside_callback(
+    ClientsideFunction(namespace='plume', function_name='update_wind_direction'),
+    Output('wind-direction', 'figure'),
+    [Input('latest-values', 'data'),
+     Input('push-values', 'data')],
+    State('app-colors', 'data')
+)
 
-        if simulated_or_real['co2'] == 'simulated':
-            co2_clock_x += 1
-            return co2_clock_y, \
-                   str(co2_clock_y) + " " + labeldict['CO2'].split(' ')[1]
-        else:
-            return (redisdata['CO2'] - minimumvalue) / (maximumvalue - minimumvalue) * 100, \
-               str(redisdata['CO2']) + " " + labeldict['CO2'].split(' ')[1]
-
-@app.callback([Output('WS-bar', 'value'),
-               Output('WS-bar-text', 'children')],
-              Input('daq-interval', 'n_intervals'))
-def get_wind_speed_data(n):
-    #expected min and max for graduated bar
-    minimumvalue = 0
-    maximumvalue = 20
-
-    #connect to redis and pull data
-    conn = redis.Redis('localhost')
-    redisdata = json.loads(conn.get('ws'))
-
-    #check for duplicates
-    if redisdata['time7'] == ws_trace_x[-1]:
+#x axis values of the live plot, the trace store's time stamps as datetimes
+def liveplot_times(timestamps):
+    return timestamps.view('datetime64[ns]').astype('datetime64[ms]')
+
+#the live plot shows the last 'graph-zoom' seconds of the history store. While that's few enough raw samples to draw
+#them all, only the samples the browser hasn't got yet are sent with extendData, and the figure is only rebuilt when
+#the selected pollutants, the zoom or their y axis ranges change. Longer ranges are drawn from bucket means and/or
+#downsampled to graph_max_points, so they're rebuilt whenever a sample arrives, at a constant size. liveplot-state
+#remembers, per browser, what the figure holds and the trace store version it was drawn from, so ticks without new
+#samples are skipped straight away. With push, a pushed message triggers it instead of the timer
+@app.callback([Output('liveplot', 'figure'),
+               Output('liveplot', 'extendData'),
+               Output('liveplot-state', 'data')],
+              [Input('figure-interval', 'n_intervals'),
+               Input('push-values', 'data'),
+               Input('graph-dropdown', 'value'),
+               Input('graph-zoom', 'value')],
+              State('liveplot-state', 'data'))
+@metrics.timed('callback_duration_seconds', 'callback', 'update_graph_scatter', dash.exceptions.PreventUpdate,
+               'prevent_update_total')
+def update_graph_scatter(n_intervals, push_values, dropdown_value, zoom, plot_state):
+    # Only update the figure if the user has selected a dropdown window
+    if not dropdown_value:
         raise dash.exceptions.PreventUpdate
-    else:
-        #simulated data
-        global simulated_or_real
-        if simulated_or_real['ws'] == 'simulated':
-            global simulated_data_filenames
-            global ws_clock_x
-            global ws_clock_y
-
-            if simulated_data_filetypes['ws'] == 'csv':
-                ws_clock_y = ws_sim_csv[ws_clock_x-1]
-                ws_clock_y = round(ws_clock_y, 2)
-                ws_trace_y.append(ws_clock_y)
-            else:
-                xlsx_file = Path('SimData', simulated_data_filenames['ws'])
-                wb_obj = openpyxl.load_workbook(xlsx_file)
-                sheet = wb_obj.active
-                ws_clock_y = sheet["B" + str(ws_clock_x)].value
-                ws_clock_y = round(ws_clock_y, 2)
-                ws_trace_y.append(ws_clock_y)
-        else:
-            ws_trace_y.append(round(redisdata['WS'],2))
-
-
-        ws_trace_x.append(redisdata['time7'])
-
-        newvalue = dict(x=ws_trace_x, y=ws_trace_y)
-        ws_trace_container.append(newvalue)
-
-        A1ap(ws_trace_y, "ws")
-        AQap(ws_trace_y, "ws")
 
-        if enable_autoscale_dict['WS'] and len(ws_trace_y) > 3:
-            global y_range_dict
-            new_interval = compute_interval(ws_trace_y, 'WS')
-            y_range_dict['WS'] = new_interval
-
-        if simulated_or_real['ws'] == 'simulated':
-            ws_clock_x += 1
-            return ws_clock_y, \
-                   str(ws_clock_y) + " " + labeldict['WS'].split(' ')[1]
-        else:
-            return (redisdata['WS'] - minimumvalue) / (maximumvalue - minimumvalue) * 100, \
-               str(redisdata['WS']) + " " + labeldict['WS'].split(' ')[1]
-
-@app.callback([Output('WD-bar', 'value'),
-               Output('WD-bar-text', 'children')],
-              Input('daq-interval', 'n_intervals'))
-def get_wind_direction_data(n):
-    #expected min and max for graduated bar
-    minimumvalue = 0
-    maximumvalue = 360
-
-    #connect to redis and pull data
-    conn = redis.Redis('localhost')
-    redisdata = json.loads(conn.get('wd'))
-
-    #check for duplicates
-    if redisdata['time8'] == wd_trace_x[-1]:
+    # Nothing to do if no samples have arrived since this browser's figure was drawn
+    if ((plot_state is not None) and (plot_state['pollutants'] == list(dropdown_value)) and (plot_state['zoom'] == zoom)
+            and (plot_state['version'] == trace_store.version)):
         raise dash.exceptions.PreventUpdate
-    else:
-        #simulated data
-        global simulated_or_real
-        if simulated_or_real['wd'] == 'simulated':
-            global simulated_data_filenames
-            global wd_clock_x
-            global wd_clock_y
-
-            if simulated_data_filetypes['wd'] == 'csv':
-                wd_clock_y = wd_sim_csv[wd_clock_x-1]
-                wd_clock_y = round(wd_clock_y, 2)
-                wd_trace_y.append(wd_clock_y)
-            else:
-                xlsx_file = Path('SimData', simulated_data_filenames['wd'])
-                wb_obj = openpyxl.load_workbook(xlsx_file)
-                sheet = wb_obj.active
-                wd_clock_y = sheet["B" + str(wd_clock_x)].value
-                wd_clock_y = round(wd_clock_y, 2)
-                wd_trace_y.append(wd_clock_y)
-        else:
-            wd_trace_y.append(round(redisdata['WD'],2))
-
-        wd_trace_x.append(redisdata['time8'])
 
-        newvalue = dict(x=wd_trace_x, y=wd_trace_y)
-        wd_trace_container.append(newvalue)
-
-        A1ap(wd_trace_y, "wd")
-        #AQap(wd_trace_y, "wd")
-        wind_direction_alert(wd_trace_y, "wd")
-
-        if enable_autoscale_dict['WD'] and len(wd_trace_y) > 3:
-            global y_range_dict
-            new_interval = compute_interval(wd_trace_y, 'WD')
-            y_range_dict['WD'] = new_interval
-
-
-        if simulated_or_real['wd'] == 'simulated':
-            wd_clock_x += 1
-            return wd_clock_y, \
-                  str(wd_clock_y) + " " + labeldict['WD'].split(' ')[1]
-        else:
-            return (redisdata['WD'] - minimumvalue) / (maximumvalue - minimumvalue) * 100, \
-            str(redisdata['WD']) + " " + labeldict['WD'].split(' ')[1]
-
-@app.callback(Output('liveplot', 'figure'),
-              Input('figure-interval', 'n_intervals'),
-              State('graph-dropdown', 'value'))
-def update_graph_scatter(n_intervals, dropdown_value):
-    # Wrap the individual instrument dictionary containers into a dictionary with their corresponding keys.
-    trace_dict = {
-        'NO2': no2_trace_container[0],
-        'WCPC': wcpc_trace_container[0],
-        'O3': o3_trace_container[0],
-        'CO': co_trace_container[0],
-        'CO2': co2_trace_container[0],
-        'NO': no_trace_container[0],
-        'WS': ws_trace_container[0],
-        'WD': wd_trace_container[0]
-    }
-
-    # Only update the figure if the user has selected a dropdown window
-    if dropdown_value:
+    start = local_now_ns() - int(zoom * 1e9)
+    with trace_lock:
+        channels = [channel_registry.by_label[pollutant].name for pollutant in dropdown_value]
+        sequences = [history_store.sequence(channel) for channel in channels]
+        y_ranges = [y_range_dict[pollutant] for pollutant in dropdown_value]
+        new_state = dict(pollutants=list(dropdown_value), zoom=zoom, sequences=sequences, y_ranges=y_ranges,
+                         version=trace_store.version, raw=False, server=server_instance_id)
+
+        # A figure of raw samples can be extended if it's the same figure, drawn by this server process (the sequence
+        # numbers are per process), and the samples it's missing are still in the history store, with each trace
+        # trimmed to the raw samples now in range (if that's within the budget)
+        if ((plot_state is not None) and plot_state['raw'] and (plot_state.get('server') == server_instance_id)
+                and (plot_state['pollutants'] == new_state['pollutants']) and (plot_state['zoom'] == zoom)
+                and (plot_state['y_ranges'] == y_ranges)):
+            raw_level = history_store.levels[0]
+            new_samples = [sequence - old_sequence for sequence, old_sequence in zip(sequences, plot_state['sequences'])]
+            in_range = [raw_level.count(channel) - int(np.searchsorted(raw_level.timestamps(channel), start))
+                        for channel in channels]
+            if all((0 <= n <= raw_level.count(channel)) and (points <= graph_max_points)
+                   for n, points, channel in zip(new_samples, in_range, channels)):
+                new_state['raw'] = True
+
+                # Traces are in the figure in dropdown order
+                trace_indexes = [i for i, n in enumerate(new_samples) if n > 0]
+                if not trace_indexes:
+                    raise dash.exceptions.PreventUpdate
+                new_points = dict(x=[liveplot_times(raw_level.timestamps(channels[i])[-new_samples[i]:]) for i in trace_indexes],
+                                  y=[raw_level.values(channels[i])[-new_samples[i]:].tolist() for i in trace_indexes])
+                max_points = [max(1, in_range[i]) for i in trace_indexes]
+                return dash.no_update, (new_points, trace_indexes, dict(x=max_points, y=max_points)), new_state
+
+        # Rebuild the figure from each trace's window of the history store, autoscaling the y axis to what's drawn if
+        # it's more than the last trace_length samples
+        trace_dict = {}
+        raw = len(channels) <= 4
+        for pollutant, channel, y_range in zip(dropdown_value, channels, y_ranges):
+            timestamps, values, raw_samples = history_store.window(channel, start, graph_max_points)
+            raw = raw and raw_samples
+            if enable_autoscale_dict[pollutant] and (len(values) > trace_length):
+                y_range = compute_interval(values, pollutant)
+            trace_dict[pollutant] = dict(x=liveplot_times(timestamps), y=values, y_range=y_range)
+        new_state['raw'] = raw
         fig = update_liveplot_helper(trace_dict, dropdown_value)
-        return fig
-    else:
-        raise dash.exceptions.PreventUpdate
-
-@app.callback(Output("wind-direction", "figure"),
-               Input("wind-interval", "n_intervals"))
-def gen_wind_direction(n):
-#     """Generate the wind direction plot""
-
-     # Get the current time and total time.
-     now = dt.datetime.now()
-     total_time = (now.hour * 3600) + (now.minute * 60) + now.second
-
-     # Use the dataframe contained in the db folder.
-     #df = get_wind_data_by_id(total_time)
-     #val = df["Speed"].iloc[-1]
-     #direction = [0, (df["Direction"][0] - 20), (df["Direction"][0] + 20), 0]
-
-     conn = redis.Redis('localhost')
-     redisdata = json.loads(conn.get('ws'))
-     val = redisdata['WS']
-
-     if simulated_or_real['ws'] == 'simulated':
-         global ws_trace_y
-         val = ws_trace_y[-1]
-
-     redisdata = json.loads(conn.get('wd'))
-     direction = [0,redisdata['WD']-20,redisdata['WD']+20,0]
-
-
-     if simulated_or_real['wd'] == 'simulated':
-         global wd_trace_y
-         direction = [0,wd_trace_y[-1]-20,wd_trace_y[-1]+20,0]
-
-
-     #direction = redisdata['WD']
-     # Create polar traces.
-     traces_scatterpolar = [
-         {"r": [0, val, val, 0], "fillcolor": app_color['red']},
-         {"r": [0, val * 0.65, val * 0.65, 0], "fillcolor": app_color['yellow']},
-         {"r": [0, val * 0.3, val * 0.3, 0], "fillcolor": app_color['green']},
-     ]
-
-     # Create the data dictionary that will get passed onto the polar figure.
-     data = [
-         dict(
-             type="scatterpolar",
-             r=traces["r"],
-             theta=direction,
-             mode="lines",
-             fill="toself",
-             fillcolor=traces["fillcolor"],
-             line={"color": "rgba(32, 32, 32, .6)", "width": 1},
-         )
-         for traces in traces_scatterpolar
-     ]
-
-     # Create the layout that styles the polar figure.
-     layout = dict(
-         margin=dict(t=10, b=10, l=10, r=10),
-         responsive=True,
-         font={"color": "black"},
-         polar={
-             "bgcolor": app_color["graph_bg"],
-             #range = wind speed range
-             "radialaxis": {"range": [0, 5], "angle": 45, "dtick": 2},
-             "angularaxis": {"direction": "clockwise", "showline": True, "tickcolor": "black"},
-         },
-         showlegend=False,
-     )
-
-     # Return the data and layout to the polar figure.
-     return dict(data=data, layout=layout)
+        return fig, dash.no_update, new_state
+
+#shared redis connection pool stats, used to keep an eye on connection churn
+@server.route('/redis-pool-stats')
+def get_redis_pool_stats():
+    return jsonify(redis_pool_stats())
+
+#transcript writer queue depth and dropped/spilled row counters
+@server.route('/transcript-queue-stats')
+def get_transcript_queue_stats():
+    return jsonify(transcript_queue.stats())
+
+#push channel clients and message counters
+@server.route('/push-stats')
+def get_push_stats():
+    if push_broadcaster is None:
+        return jsonify(dict(enabled=False))
+    return jsonify(dict(enabled=True, **push_broadcaster.stats()))
+
+#callback and ingest stage latency histograms and counters, in the Prometheus text format
+@server.route('/metrics')
+def get_metrics():
+    return Response(metrics.prometheus_text(), mimetype='text/plain; version=0.0.4')
+
+#production serving tweaks: compresses responses (the callback JSON above all) with brotli or gzip, whichever the
+#browser accepts, and lets browsers cache the assets for asset_max_age_s seconds (dash adds the file's modification
+#time to asset urls, so edited assets are still picked up)
+def configure_production_server(compress, asset_max_age_s):
+    server.config['SEND_FILE_MAX_AGE_DEFAULT'] = asset_max_age_s
+    if not compress:
+        return
+    try:
+        from flask_compress import Compress
+    except ImportError:
+        print("[server] compress is on but flask-compress is not installed (pip install flask-compress brotli), serving uncompressed")
+        return
+    server.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    server.config['COMPRESS_MIMETYPES'] = ['text/html', 'text/css', 'text/javascript', 'application/javascript',
+                                           'application/json']
+    #small responses (e.g. a callback that changed nothing) aren't worth compressing
+    server.config['COMPRESS_MIN_SIZE'] = 500
+    Compress(server)
 
 # If the program is called as 'main' (e.g. not imported and ran from within another python script), do the following.
 
@@ -1771,7 +1512,19 @@ avs =0
 '''#########################################
 ## SECTION 6. Settings and initialization ##
 #########################################'''
-if __name__ == '__main__':
+#reads the settings and sets up the global state, the log files and the state backend. Called before serving, by
+#__main__ below or by wsgi.py when the dashboard is served by a WSGI server. production overrides the [server] "mode"
+#setting (and the --production / --debug command line flags)
+def initialize(production=None):
+    global A1_n, A1_auto_event_count, AQ_auto_event_count, AQ_over, A2_n, A2_auto_event_count
+    global is_valid_command, toggle_type, index_clock
+    global y_range_dict, y_range_dict_original, enable_autoscale_dict, autoscale_padding_dict
+    global transcript_queue, binary_transcript, command_character
+    global A1, A2, AQ, enable_wind_direction_alert, wind_direction_alert_range
+    global A1_coeff, A1_percentile, A1_startup_bypass, A1_thresh_bump_percentile
+    global A2_slope_thresh, A2_hits_to_sink, A2_interval, AQ_thresh
+    global sim_sources, use_redis_streams, stream_key, frame_key, push_broadcaster, state_backend
+    global production_mode, server_host, server_port, server_threads, metrics_csv_writer, simple_start_daq_script
 
     if exists('user_defined_settings.ini') == False:
         sys.exit("ERROR: \"user_defined_settings.ini\" config file not found, please run \"create_default_config.py\"")
@@ -1781,69 +1534,18 @@ if __name__ == '__main__':
     #config
     parser = ConfigParser(allow_no_value=True)
     parser.read('user_defined_settings.ini')
-    #global counters, ONLY change when adding new pollutants, otherwise DON'T touch these
+    #global counters, one entry per channel in registry order (see channel_registry.py)
     avs =0
-    A1_n = {
-        "no2": 0,
-        "wcpc": 0,
-        "o3": 0,
-        "co": 0,
-        "co2": 0,
-        "no": 0,
-        "ws": 0,
-        "wd": 0}
-    A1_auto_event_count = {
-        "no2": 1,
-        "wcpc": 1,
-        "o3": 1,
-        "co": 1,
-        "co2": 1,
-        "no": 1,
-        "ws": 1,
-        "wd": 1
-    }
-    left_zero_popped = False
+    num_channels = len(channel_registry)
+    A1_n = np.zeros(num_channels, dtype=np.int64)
+    A1_auto_event_count = np.ones(num_channels, dtype=np.int64)
     is_valid_command = False
     toggle_type=''
     index_clock = 0
-    AQ_auto_event_count = {
-        "no2": 1,
-        "wcpc": 1,
-        "o3": 1,
-        "co": 1,
-        "co2": 1,
-        "no": 1,
-        "ws": 1,
-        "wd": 1
-    }
-    AQ_over = {
-    "no2": False,
-    "wcpc": False,
-    "o3": False,
-    "co": False,
-    "co2": False,
-    "no": False,
-    "ws": False,
-    "wd": False}
-    A2_n = {
-        "no2": 0,
-        "wcpc": 0,
-        "o3": 0,
-        "co": 0,
-        "co2": 0,
-        "no": 0,
-        "ws": 0,
-        "wd": 0}
-    A2_auto_event_count = {
-        "no2": 1,
-        "wcpc": 1,
-        "o3": 1,
-        "co": 1,
-        "co2": 1,
-        "no": 1,
-        "ws": 1,
-        "wd": 1
-    }
+    AQ_auto_event_count = np.ones(num_channels, dtype=np.int64)
+    AQ_over = np.zeros(num_channels, dtype=bool)
+    A2_n = {channel.name: 0 for channel in channel_registry}
+    A2_auto_event_count = {channel.name: 1 for channel in channel_registry}
     avs =0
 
     ############################
@@ -1859,64 +1561,16 @@ if __name__ == '__main__':
         os.system('cd '+redis_directory)
         os.system('start redis-server.exe')
         os.system('start redis-cli.exe')
-        daq_script_name = parser.get('simple_start','DAQ_script_name')
-        exec(open(daq_script_name).read())
+        #the DAQ script is started by __main__ (see start_daq_script), only once and never by the wsgi.py workers
+        simple_start_daq_script = parser.get('simple_start','DAQ_script_name')
 
     #graph y axes ranges
-    y_range_dict = {
-        "NO2": string_to_list_interval(parser.get('y-ranges','NO2')),
-        "WCPC": string_to_list_interval(parser.get('y-ranges','WCPC')),
-        "O3": string_to_list_interval(parser.get('y-ranges','O3')),
-        "CO": string_to_list_interval(parser.get('y-ranges','CO')),
-        "CO2": string_to_list_interval(parser.get('y-ranges','CO2')),
-        "NO": string_to_list_interval(parser.get('y-ranges', 'NO')),
-        "WS": string_to_list_interval(parser.get('y-ranges', 'WS')),
-        "WD": string_to_list_interval(parser.get('y-ranges', 'WD'))
-    }
-    y_range_dict_original = {
-        "NO2": string_to_list_interval(parser.get('y-ranges','NO2')),
-        "WCPC": string_to_list_interval(parser.get('y-ranges','WCPC')),
-        "O3": string_to_list_interval(parser.get('y-ranges','O3')),
-        "CO": string_to_list_interval(parser.get('y-ranges','CO')),
-        "CO2": string_to_list_interval(parser.get('y-ranges','CO2')),
-        "NO": string_to_list_interval(parser.get('y-ranges', 'NO')),
-        "WS": string_to_list_interval(parser.get('y-ranges', 'WS')),
-        "WD": string_to_list_interval(parser.get('y-ranges', 'WD'))
-    }
-    enable_autoscale_dict = {
-        "NO2": parser.getboolean('y-ranges','as_NO2'),
-        "WCPC": parser.getboolean('y-ranges','as_WCPC'),
-        "O3": parser.getboolean('y-ranges','as_O3'),
-        "CO": parser.getboolean('y-ranges','as_CO'),
-        "CO2": parser.getboolean('y-ranges','as_CO2'),
-        "NO": parser.getboolean('y-ranges', 'as_NO'),
-        "WS": parser.getboolean('y-ranges', 'as_WS'),
-        "WD": parser.getboolean('y-ranges', 'as_WD')
-    }
-
-    #not using these settings, they're just unnecessary and confusing
-    '''
-    autoscale_padding_dict = {
-        "NO2": parser.getint('y-ranges','autoscale_padding_percentage_NO2'),
-        "WCPC": parser.getint('y-ranges','autoscale_padding_percentage_WCPC'),
-        "O3": parser.getint('y-ranges','autoscale_padding_percentage_O3'),
-        "CO": parser.getint('y-ranges','autoscale_padding_percentage_CO'),
-        "CO2": parser.getint('y-ranges','autoscale_padding_percentage_CO2'),
-        "NO": parser.getint('y-ranges', 'autoscale_padding_percentage_NO'),
-        "WS": parser.getint('y-ranges', 'autoscale_padding_percentage_WS'),
-        "WD": parser.getint('y-ranges', 'autoscale_padding_percentage_WD')
-    }
-    '''
-    autoscale_padding_dict = {
-        "NO2": 10,
-        "WCPC": 10,
-        "O3": 10,
-        "CO": 10,
-        "CO2": 10,
-        "NO": 10,
-        "WS": 10,
-        "WD": 10
-    }
+    y_range_dict = {channel.label: list(channel.y_range) for channel in channel_registry}
+    y_range_dict_original = {channel.label: list(channel.y_range) for channel in channel_registry}
+    enable_autoscale_dict = {channel.label: channel.autoscale for channel in channel_registry}
+
+    #not using per pollutant padding settings, they're just unnecessary and confusing
+    autoscale_padding_dict = {channel.label: 10 for channel in channel_registry}
 
     #log folder path
     log_folder_path = parser.get('log_directory','log_files_path')
@@ -1927,6 +1581,43 @@ if __name__ == '__main__':
     if log_folder_path.endswith('/'):
         log_folder_path.removesuffix('/')
 
+    #log file flush policy. Sensor transcript rows are batched and written out every "flush_rows" rows or
+    #"flush_interval_s" seconds, whichever comes first. Event markers are always written straight away
+    transcript_flush_rows = parser.getint('log_directory', 'flush_rows', fallback=10)
+    transcript_flush_interval_s = parser.getfloat('log_directory', 'flush_interval_s', fallback=5)
+    transcript_fsync = parser.getboolean('log_directory', 'fsync', fallback=True)
+
+    sensor_transcript_writer = TranscriptWriter(log_folder_path, 'Sensor Transcript', 'Sensor Transcript Backup',
+                                                sensor_transcript_fields, flush_rows=transcript_flush_rows,
+                                                flush_interval_s=transcript_flush_interval_s, fsync=transcript_fsync)
+    event_marker_writer = TranscriptWriter(log_folder_path, 'Event Markers', 'Event Markers Backup',
+                                           event_marker_fields, flush_rows=1, fsync=transcript_fsync)
+    transcript_writers = {'sensor_transcript': sensor_transcript_writer, 'event_markers': event_marker_writer}
+
+    #optionally also write the sensor transcript in the binary format (see binary_transcript.py), which the
+    #post-processing scripts can read much faster than the csv
+    binary_transcript = parser.getboolean('log_directory', 'binary_transcript', fallback=False)
+    if binary_transcript:
+        transcript_writers['sensor_transcript_binary'] = BinaryTranscriptWriter(
+            log_folder_path, 'Sensor Transcript', sensor_transcript_fields, flush_rows=transcript_flush_rows,
+            flush_interval_s=transcript_flush_interval_s, fsync=transcript_fsync)
+
+    #log rows are written by a background thread fed through a bounded queue. "queue_overflow" decides what happens when
+    #the queue is full: "block" waits for room, "drop_oldest" drops the oldest queued row, "spill" writes rows to a
+    #temporary file until the writer thread catches up
+    transcript_queue_size = parser.getint('log_directory', 'queue_size', fallback=1000)
+    transcript_queue_overflow = parser.get('log_directory', 'queue_overflow', fallback='block').lower()
+    if transcript_queue_overflow not in overflow_policies:
+        sys.exit("ERROR: [log_directory] \"queue_overflow\" must be one of: " + ", ".join(overflow_policies))
+    transcript_queue = TranscriptQueue(transcript_writers, maxsize=transcript_queue_size,
+                                       overflow=transcript_queue_overflow,
+                                       observe_write=lambda seconds: metrics.observe('stage_duration_seconds', 'stage',
+                                                                                     'disk_write', seconds))
+
+    #write out any buffered rows on shutdown (gunicorn workers also do it from the worker_exit hook, see
+    #gunicorn.conf.py)
+    atexit.register(close_transcript_writers)
+
     #command character
     #command_character = parser.get('command_char','command_character')
     command_character = "*" #manual override
@@ -1942,88 +1633,22 @@ if __name__ == '__main__':
     wind_direction_alert_range = string_to_list_interval(parser.get('wind_direction_range_warning','range'))
 
     #A1 settings
-    A1_coeff = {
-    "no2": parser.getint('A1_coeff','NO2'),
-    "wcpc": parser.getint('A1_coeff','WCPC'),
-    "o3": parser.getint('A1_coeff','O3'),
-    "co": parser.getint('A1_coeff','CO'),
-    "co2": parser.getint('A1_coeff','CO2'),
-    "no": parser.getint('A1_coeff','NO'),
-    "ws": parser.getint('A1_coeff','WS'),
-    "wd": parser.getint('A1_coeff','WD') }
-    A1_percentile = {
-    "no2": parser.getint('A1_percentile','NO2'),
-    "wcpc": parser.getint('A1_percentile','WCPC'),
-    "o3": parser.getint('A1_percentile','O3'),
-    "co": parser.getint('A1_percentile','CO'),
-    "co2": parser.getint('A1_percentile','CO2'),
-    "no": parser.getint('A1_percentile','NO'),
-    "ws": parser.getint('A1_percentile','WS'),
-    "wd": parser.getint('A1_percentile','WD')}
+    A1_coeff = np.array([channel.A1_coeff for channel in channel_registry], dtype=np.float64)
+    A1_percentile = np.array([channel.A1_percentile for channel in channel_registry], dtype=np.float64)
     A1_startup_bypass = parser.getint('A1_misc','startup_bypass')
-    A1_thresh_bump_percentile = {
-    "no2": parser.getint('A1_thresh_bump_percentile', 'NO2'),
-    "wcpc": parser.getint('A1_thresh_bump_percentile', 'WCPC'),
-    "o3": parser.getint('A1_thresh_bump_percentile', 'O3'),
-    "co": parser.getint('A1_thresh_bump_percentile', 'CO'),
-    "co2": parser.getint('A1_thresh_bump_percentile', 'CO2'),
-    "no": parser.getint('A1_thresh_bump_percentile', 'NO'),
-    "ws": parser.getint('A1_thresh_bump_percentile', 'WS'),
-    "wd": parser.getint('A1_thresh_bump_percentile', 'WD')}
+    A1_thresh_bump_percentile = np.array([channel.A1_thresh_bump_percentile for channel in channel_registry], dtype=np.float64)
 
     #A2 settings
-    A2_slope_thresh = {
-    "no2": 0.4,
-    "wcpc": 0.4,
-    "o3": 0.4,
-    "co": 0.4,
-    "co2": 0.4,
-    "no": 0.4,
-    "ws": 0.4,
-    "wd": 0.4
-    }
-    A2_hits_to_sink = {
-    "no2": 3,
-    "wcpc": 3,
-    "o3": 3,
-    "co": 3,
-    "co2": 3,
-    'no': 3,
-    "ws": 3,
-    "wd": 3
-    }
-    A2_interval = {
-        "no2": deque([], maxlen=3),
-        "wcpc": deque([], maxlen=3),
-        "o3": deque([], maxlen=3),
-        "co": deque([], maxlen=3),
-        "co2": deque([], maxlen=3),
-        "no": deque([], maxlen=3),
-        "ws": deque([], maxlen=3),
-        "wd": deque([], maxlen=3)
-    }
-
-    #AQ setting
-    AQ_thresh = {
-    "no2": parser.getint('AQ_thresh','NO2'),
-    "wcpc": parser.getint('AQ_thresh','WCPC'),
-    "o3": parser.getint('AQ_thresh','O3'),
-    "co": parser.getint('AQ_thresh','CO'),
-    "co2": parser.getint('AQ_thresh','CO2'),
-    "no": parser.getint('AQ_thresh','NO'),
-    "ws": parser.getint('AQ_thresh','WS')}
+    A2_slope_thresh = {channel.name: 0.4 for channel in channel_registry}
+    A2_hits_to_sink = {channel.name: 3 for channel in channel_registry}
+    A2_interval = {channel.name: deque([], maxlen=3) for channel in channel_registry}
+
+    #AQ setting, nan for pollutants without a threshold
+    AQ_thresh = np.array([np.nan if channel.AQ_thresh is None else channel.AQ_thresh for channel in channel_registry],
+                         dtype=np.float64)
 
     #simulated or real switch
-    simulated_or_real = {
-        "no2": parser.get('real_or_simulated', 'NO2'),
-        "wcpc": parser.get('real_or_simulated', 'WCPC'),
-        "o3": parser.get('real_or_simulated', 'O3'),
-        "co": parser.get('real_or_simulated', 'CO'),
-        "co2": parser.get('real_or_simulated', 'CO2'),
-        "no": parser.get('real_or_simulated', 'NO'),
-        "ws": parser.get('real_or_simulated', 'WS'),
-        "wd": parser.get('real_or_simulated', 'WD')
-    }
+    simulated_or_real = {channel.name: channel.source for channel in channel_registry}
 
     #check if using all real data
     all_real = True
@@ -2046,34 +1671,12 @@ if __name__ == '__main__':
     if '\\' in simulated_data_path:
         simulated_data_path.replace("\\", "/")
 
-    if (simulated_data_path[-1] != '/'):
+    if (simulated_data_path != '') and (simulated_data_path[-1] != '/'):
         simulated_data_path += '/'
-    simulated_data_filenames = {
-            "no2": '',
-            "wcpc": '',
-            "o3": '',
-            "co": '',
-            "co2": '',
-            "no": '',
-            "ws": '',
-            "wd": ''
-        }
-    if simulated_or_real['no2'] == 'simulated':
-        simulated_data_filenames['no2'] = simulated_data_path + parser.get('real_or_simulated','sim_NO2_filename')
-    if simulated_or_real['wcpc'] == 'simulated':
-        simulated_data_filenames['wcpc'] = simulated_data_path + parser.get('real_or_simulated','sim_WCPC_filename')
-    if simulated_or_real['o3'] == 'simulated':
-        simulated_data_filenames['o3'] = simulated_data_path + parser.get('real_or_simulated','sim_O3_filename')
-    if simulated_or_real['co'] == 'simulated':
-        simulated_data_filenames['co'] = simulated_data_path + parser.get('real_or_simulated','sim_CO_filename')
-    if simulated_or_real['co2'] == 'simulated':
-        simulated_data_filenames['co2'] = simulated_data_path + parser.get('real_or_simulated','sim_CO2_filename')
-    if simulated_or_real['no'] == 'simulated':
-        simulated_data_filenames['no'] = simulated_data_path + parser.get('real_or_simulated','sim_NO_filename')
-    if simulated_or_real['ws'] == 'simulated':
-        simulated_data_filenames['ws'] = simulated_data_path + parser.get('real_or_simulated','sim_WS_filename')
-    if simulated_or_real['wd'] == 'simulated':
-        simulated_data_filenames['wd'] = simulated_data_path + parser.get('real_or_simulated','sim_WD_filename')
+    simulated_data_filenames = {channel.name: '' for channel in channel_registry}
+    for channel in channel_registry:
+        if channel.source == 'simulated':
+            simulated_data_filenames[channel.name] = simulated_data_path + channel.sim_filename
 
     for i in simulated_or_real:
         if simulated_or_real[i] == 'simulated':
@@ -2081,73 +1684,100 @@ if __name__ == '__main__':
                 sys.exit("ERROR: \""+simulated_data_filenames[i]+'\" file not found, please check [real_or_simlated] \"sim_'+i+'_filename\" setting')
 
     #simulated data file types
-    simulated_data_filetypes = {
-        "no2": '',
-        "wcpc": '',
-        "o3": '',
-        "co": '',
-        "co2": '',
-        "no": '',
-        "ws": '',
-        "wd": ''
-    }
-
-    def get_extension(filename):
-        last_dot_index = 0
-        for i in range(0, len(filename)):
-            if filename[i] == '.':
-                last_dot_index = i
-        return filename[(last_dot_index+1):len(filename)]
-
-    for i in simulated_data_filetypes:
-        simulated_data_filetypes[i] = get_extension(simulated_data_filenames[i])
-        if ((simulated_data_filetypes[i] != 'xlsx') and (simulated_data_filetypes[i] != 'csv')) and (simulated_or_real[i] == False):
-            sys.exit('ERROR: the simulated data file for ' + i + ' must be either a \".xlsx\" or \".csv\" file')
-
-    #simulated data CSV handling
-    if simulated_or_real['no2'] and simulated_data_filetypes['no2'] == 'csv':
-        no2_sim_csv_df = pd.read_csv(simulated_data_filenames['no2'], names=['index','value'])
-        no2_sim_csv = no2_sim_csv_df["value"].to_list()
-    if simulated_or_real['wcpc'] and simulated_data_filetypes['wcpc'] == 'csv':
-        wcpc_sim_csv_df = pd.read_csv(simulated_data_filenames['wcpc'], names=['index','value'])
-        wcpc_sim_csv = wcpc_sim_csv_df["value"].to_list()
-    if simulated_or_real['o3'] and simulated_data_filetypes['o3'] == 'csv':
-        o3_sim_csv_df = pd.read_csv(simulated_data_filenames['o3'], names=['index','value'])
-        o3_sim_csv = o3_sim_csv_df["value"].to_list()
-    if simulated_or_real['co'] and simulated_data_filetypes['co'] == 'csv':
-        co_sim_csv_df = pd.read_csv(simulated_data_filenames['co'], names=['index','value'])
-        co_sim_csv = co_sim_csv_df["value"].to_list()
-    if simulated_or_real['co2'] and simulated_data_filetypes['co2'] == 'csv':
-        co2_sim_csv_df = pd.read_csv(simulated_data_filenames['co2'], names=['index','value'])
-        co2_sim_csv = co2_sim_csv_df["value"].to_list()
-    if simulated_or_real['no'] and simulated_data_filetypes['no'] == 'csv':
-        no_sim_csv_df = pd.read_csv(simulated_data_filenames['no'], names=['index','value'])
-        no_sim_csv = no_sim_csv_df["value"].to_list()
-    if simulated_or_real['ws'] and simulated_data_filetypes['ws'] == 'csv':
-        ws_sim_csv_df = pd.read_csv(simulated_data_filenames['ws'], names=['index','value'])
-        ws_sim_csv = ws_sim_csv_df["value"].to_list()
-    if simulated_or_real['wd'] and simulated_data_filetypes['wd'] == 'csv':
-        wd_sim_csv_df = pd.read_csv(simulated_data_filenames['wd'], names=['index','value'])
-        wd_sim_csv = wd_sim_csv_df["value"].to_list()
-
-
-    #clock variables used for simulated data
-    no2_clock_x = 1
-    no2_clock_y = 0
-    wcpc_clock_x = 1
-    wcpc_clock_y = 0
-    o3_clock_x = 1
-    o3_clock_y = 0
-    co_clock_x = 1
-    co_clock_y = 0
-    co2_clock_x = 1
-    co2_clock_y = 0
-    no_clock_x = 1
-    no_clock_y = 0
-    ws_clock_x = 1
-    ws_clock_y = 0
-    wd_clock_x = 1
-    wd_clock_y = 0
+    for i in simulated_or_real:
+        if (simulated_or_real[i] == 'simulated') and (get_extension(simulated_data_filenames[i]) not in simulated_data_extensions):
+            sys.exit('ERROR: the simulated data file for ' + i + ' must be a \".xlsx\", \".csv\" or \".parquet\" file')
+
+    #what to do at the end of a simulated data file, start again from the top ('wrap') or stop ('stop')
+    sim_end_behaviour = parser.get('real_or_simulated', 'sim_end_behaviour', fallback='wrap')
+    if (sim_end_behaviour != 'wrap') and (sim_end_behaviour != 'stop'):
+        sys.exit('ERROR: the [real_or_simulated] \"sim_end_behaviour\" setting must be set to either \"wrap\" or \"stop\"')
+
+    #load every simulated data file once, the ingest engine then grabs one value per sample from memory
+    sim_sources = {}
+    for i in simulated_or_real:
+        if simulated_or_real[i] == 'simulated':
+            sim_sources[i] = SimulatedSource(simulated_data_filenames[i], end_behaviour=sim_end_behaviour)
+
+    #redis stream settings, the ingest engine falls back to polling the last-value keys if streams are disabled
+    redis_settings = load_redis_settings()
+    use_redis_streams = redis_settings['use_streams']
+    stream_key = redis_settings['stream_key']
+    frame_key = redis_settings['frame_key']
+
+    #optionally dump a summary of the metrics (see /metrics) to a daily "Dashboard Metrics" csv in the log folder every
+    #"csv_interval_s" seconds, keeping "keep_days" days of files
+    if parser.getboolean('metrics', 'csv_dump', fallback=False):
+        metrics_csv_writer = MetricsCSVWriter(metrics, log_folder_path,
+                                              interval_s=parser.getfloat('metrics', 'csv_interval_s', fallback=60),
+                                              keep_days=parser.getint('metrics', 'keep_days', fallback=7))
+        atexit.register(metrics_csv_writer.close)
+
+    #where the live state is kept. "local" keeps it in this process, which is all app.run_server needs. "redis" shares it
+    #through redis so the dashboard can be served by several processes (see wsgi.py and state_backend.py)
+    state_backend_type = parser.get('state', 'backend', fallback='local').lower()
+    if state_backend_type == 'redis':
+        state_backend = RedisStateBackend(get_redis_connection,
+                                          key_prefix=parser.get('state', 'key_prefix', fallback='plume_state'),
+                                          lease_s=parser.getfloat('state', 'lease_s', fallback=5),
+                                          record_maxlen=parser.getint('state', 'record_maxlen', fallback=100000))
+    elif state_backend_type != 'local':
+        sys.exit('ERROR: the [state] \"backend\" setting must be set to either \"local\" or \"redis\"')
+
+    #server settings. "debug" runs dash's development server (reloader, file watching and dev tools), "production" a
+    #waitress server with "threads" request threads and none of the debug tooling
+    server_mode = parser.get('server', 'mode', fallback='debug').lower()
+    if '--production' in sys.argv:
+        server_mode = 'production'
+    elif '--debug' in sys.argv:
+        server_mode = 'debug'
+    if (server_mode != 'debug') and (server_mode != 'production'):
+        sys.exit('ERROR: the [server] \"mode\" setting must be set to either \"debug\" or \"production\"')
+    production_mode = (server_mode == 'production') if production is None else production
+    server_host = parser.get('server', 'host', fallback='127.0.0.1')
+    server_port = parser.getint('server', 'port', fallback=8090)
+    server_threads = parser.getint('server', 'threads', fallback=4)
+    if production_mode:
+        configure_production_server(parser.getboolean('server', 'compress', fallback=True),
+                                    parser.getint('server', 'asset_max_age_s', fallback=86400))
+
+    #optional WebSocket push channel, the browsers fall back to polling without it. waitress (the "production" mode when
+    #main.py is run directly, wsgi.py passes production in) can't hand the socket over to flask-sock, so push is left off
+    enable_push = parser.getboolean('push', 'enable_push', fallback=False)
+    if enable_push and production_mode and (production is None):
+        print("[push] enable_push is on but waitress can't serve WebSockets, falling back to polling (serve the dashboard "
+              "with gunicorn and wsgi.py to use push)")
+    elif enable_push:
+        push_broadcaster = PushBroadcaster()
+        try:
+            register_push_route(server, push_broadcaster)
+        except ImportError:
+            print("[push] enable_push is on but flask-sock is not installed (pip install flask-sock), falling back to polling")
+            push_broadcaster = None
+
+if __name__ == '__main__':
+    initialize()
+
+    #SIGTERM (e.g. from a service manager) is turned into a normal exit so the atexit handlers still run. Only here, a
+    #WSGI server (see wsgi.py) has its own graceful SIGTERM handling
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    #start the DAQ script (with simple start) and the headless ingest engine. With debug on, the werkzeug reloader runs
+    #this script twice (a file watcher process and the actual server process), so we only start them in the server
+    #process
+    debug_mode = not production_mode
+    if (not debug_mode) or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if simple_start_daq_script is not None:
+            start_daq_script()
+        start_ingest_engine()
 
     #run our server
-    app.run_server(debug=True, dev_tools_ui=True, port=8090)
+    if production_mode:
+        try:
+            from waitress import serve
+        except ImportError:
+            sys.exit('ERROR: [server] \"mode\" is \"production\" but waitress is not installed (pip install waitress)')
+        print("Serving the dashboard on http://" + server_host + ":" + str(server_port) + " with " + str(server_threads) + " threads")
+        serve(server, host=server_host, port=server_port, threads=server_threads)
+    else:
+        app.run_server(debug=debug_mode, dev_tools_ui=True, host=server_host, port=server_port)
@@ -16,6 +16,7 @@ from configparser import ConfigParser
 import os
 import sys
 from os.path import exists
+from binary_transcript import read_transcript
 
 if exists('user_defined_settings.ini') == False:
   sys.exit("ERROR: \"user_defined_settings.ini\" config file not found, please run \"create_default_config.py\"")
@@ -134,7 +135,7 @@ new_GL770 = pd.read_csv('aux_files\\new_GL770.csv') #Edited/Inserted 29-6-22
 new_GL770['time'] = pd.to_datetime(new_GL770['time'], errors = 'coerce')
 
 ############### Import dashboard data ###############
-data_table = pd.read_csv(CSVinput) #Edited/Inserted 29-6-22
+data_table = read_transcript(CSVinput) #Edited/Inserted 29-6-22
 data_table.rename(columns={'Time': 'time'}, inplace=True) # Edited/Inserted 29-6-22
 data_table['time'] = pd.to_datetime(data_table['time'], errors = 'coerce')
 
@@ -0,0 +1,231 @@
+"""
+Latency histograms and counters for the dashboard (main.py).
+
+Metrics keeps a histogram of durations (in seconds) per callback and per stage of the ingest engine (redis fetch, JSON
+decode, auto event algorithms, sensor transcript, disk writes, figure builds) and a few counters (PreventUpdate skips
+per callback, duplicate samples per channel). Recording a duration is a bisect and a couple of additions under a lock,
+so the instrumentation can stay on all the time.
+
+prometheus_text() renders everything in the Prometheus text exposition format, which main.py serves at /metrics.
+MetricsCSVWriter optionally also appends a summary row per histogram and counter to a daily 'Dashboard Metrics
+<date>.csv' in the log folder every interval_s seconds (count, mean and approximate percentiles over the interval) and
+deletes the files older than keep_days days.
+"""
+
+import os
+import csv
+import glob
+import time
+import bisect
+import functools
+import threading
+import datetime as dt
+
+#histogram bucket upper bounds in seconds, from half a millisecond to 5 s
+default_buckets = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        #one count per bucket plus one for everything above the last bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+#approximate percentile of a list of per bucket counts: the upper bound of the bucket the percentile falls in (the
+#last bound for the overflow bucket)
+def bucket_percentile(buckets, counts, percentile):
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = total * percentile / 100
+    cumulative = 0
+    for bound, count in zip(buckets + [buckets[-1]], counts):
+        cumulative += count
+        if cumulative >= rank:
+            return bound
+    return buckets[-1]
+
+class Metrics:
+    #histogram and counter names are prefixed with prefix, each has one label (e.g. callback="update_graph_scatter")
+    def __init__(self, prefix='plume', buckets=None):
+        self.prefix = prefix
+        self.buckets = list(default_buckets if buckets is None else buckets)
+        self.lock = threading.Lock()
+        #(name, label name, label value): Histogram or count
+        self.histograms = {}
+        self.counters = {}
+        self.descriptions = {}
+
+    #sets the HELP text of a metric
+    def describe(self, name, description):
+        self.descriptions[name] = description
+
+    def observe(self, name, label, value, seconds):
+        key = (name, label, value)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def count(self, name, label, value, amount=1):
+        key = (name, label, value)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    #context manager timing a block of code into a histogram
+    def time(self, name, label, value):
+        return Timer(self, name, label, value)
+
+    #decorator timing every call of a function into a histogram. Calls ending in skip_exception (e.g. dash's
+    #PreventUpdate) aren't timed but counted in the skip_counter counter instead
+    def timed(self, name, label, value, skip_exception=None, skip_counter=None):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = function(*args, **kwargs)
+                except Exception as e:
+                    if (skip_exception is not None) and isinstance(e, skip_exception):
+                        self.count(skip_counter, label, value)
+                    raise
+                self.observe(name, label, value, time.perf_counter() - start)
+                return result
+            return wrapper
+        return decorator
+
+    #copies of the histograms (name, label, value, buckets counts, count, sum) and counters (name, label, value, count)
+    def snapshot(self):
+        with self.lock:
+            histograms = [(name, label, value, list(histogram.counts), histogram.count, histogram.sum)
+                          for (name, label, value), histogram in self.histograms.items()]
+            counters = [(name, label, value, count) for (name, label, value), count in self.counters.items()]
+        return sorted(histograms), sorted(counters)
+
+    #everything in the Prometheus text exposition format
+    def prometheus_text(self):
+        histograms, counters = self.snapshot()
+        lines = []
+        described = set()
+
+        def header(name, metric_type):
+            if name not in described:
+                described.add(name)
+                if name in self.descriptions:
+                    lines.append('# HELP ' + self.prefix + '_' + name + ' ' + self.descriptions[name])
+                lines.append('# TYPE ' + self.prefix + '_' + name + ' ' + metric_type)
+
+        for name, label, value, counts, count, total in histograms:
+            header(name, 'histogram')
+            metric = self.prefix + '_' + name
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(metric + '_bucket{' + label + '="' + value + '",le="' + str(bound) + '"} ' + str(cumulative))
+            lines.append(metric + '_sum{' + label + '="' + value + '"} ' + repr(total))
+            lines.append(metric + '_count{' + label + '="' + value + '"} ' + str(count))
+
+        for name, label, value, count in counters:
+            header(name, 'counter')
+            lines.append(self.prefix + '_' + name + '{' + label + '="' + value + '"} ' + str(count))
+
+        return '\n'.join(lines) + '\n'
+
+class Timer:
+    def __init__(self, metrics, name, label, value):
+        self.metrics = metrics
+        self.key = (name, label, value)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(*self.key, time.perf_counter() - self.start)
+        return False
+
+#background thread appending a summary of every metric to a daily csv every interval_s seconds
+class MetricsCSVWriter:
+    fieldnames = ['Time', 'Metric', 'Label', 'Count', 'Mean (ms)', 'P50 (ms)', 'P95 (ms)', 'P99 (ms)']
+
+    def __init__(self, metrics, folder_path, interval_s=60, keep_days=7, name='Dashboard Metrics'):
+        self.metrics = metrics
+        self.folder_path = folder_path
+        self.interval_s = interval_s
+        self.keep_days = keep_days
+        self.name = name
+
+        #histogram bucket counts and counter values at the last dump, so each row covers one interval
+        self.last_histograms = {}
+        self.last_counters = {}
+
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='metrics-csv-writer', daemon=True)
+        self.thread.start()
+
+    def filename(self, day):
+        return self.folder_path + "/" + self.name + " " + str(day) + ".csv"
+
+    #summary rows of what happened since the last dump
+    def rows(self, now):
+        histograms, counters = self.metrics.snapshot()
+        rows = []
+        for name, label, value, counts, count, total in histograms:
+            last_counts, last_count, last_total = self.last_histograms.get((name, value), ([0] * len(counts), 0, 0.0))
+            self.last_histograms[(name, value)] = (counts, count, total)
+            interval_counts = [bucket_count - last for bucket_count, last in zip(counts, last_counts)]
+            interval_count = count - last_count
+            if interval_count == 0:
+                continue
+            percentiles = [bucket_percentile(self.metrics.buckets, interval_counts, p) * 1000 for p in [50, 95, 99]]
+            rows.append([now, name, value, interval_count, round((total - last_total) / interval_count * 1000, 3)] + percentiles)
+        for name, label, value, count in counters:
+            interval_count = count - self.last_counters.get((name, value), 0)
+            self.last_counters[(name, value)] = count
+            if interval_count != 0:
+                rows.append([now, name, value, interval_count, '', '', '', ''])
+        return rows
+
+    def dump(self):
+        now = dt.datetime.now()
+        rows = self.rows(now.strftime("%Y-%m-%d %H:%M:%S"))
+        if rows:
+            filename = self.filename(now.date())
+            file_exists = os.path.isfile(filename) and os.path.getsize(filename) > 0
+            with open(filename, 'a', newline='\n') as f:
+                writer = csv.writer(f, delimiter=',')
+                if not file_exists:
+                    writer.writerow(self.fieldnames)
+                writer.writerows(rows)
+        self.remove_old_files(now.date())
+
+    #deletes the daily files older than keep_days days
+    def remove_old_files(self, today):
+        oldest = str(today - dt.timedelta(days=self.keep_days - 1))
+        for filename in glob.glob(glob.escape(self.folder_path + "/" + self.name + " ") + "*.csv"):
+            day = os.path.basename(filename)[len(self.name) + 1:-len(".csv")]
+            if day < oldest:
+                os.remove(filename)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval_s):
+            try:
+                self.dump()
+            except OSError as e:
+                print("Error writing dashboard metrics: " + str(e))
+
+    #writes a last summary and stops the thread
+    def close(self):
+        self.stop_event.set()
+        self.thread.join()
+        try:
+            self.dump()
+        except OSError as e:
+            print("Error writing dashboard metrics: " + str(e))
@@ -9,141 +9,84 @@ redis-server.exe (AS ADMIN), and then run redis-cli.exe (again, AS ADMIN). Addit
 """
 
 import redis
-import threading
 import random
 #import pyuac
-import datetime
 import json
 import openpyxl
 from pathlib import Path
 import os
 import sys
 from pyModbusTCP.client import ModbusClient
-from pymodbus.payload import BinaryPayloadDecoder
-from pymodbus.constants import Endian
 import csv
 import redis
 import json
 from collections import deque
 import redis
-import threading
 import random
-import datetime
 import json
 from configparser import ConfigParser
 from os.path import exists
+from redis_connection import get_redis_connection, load_redis_settings, publish_frame_record, frame_record
+from modbus_blocks import plan_block_reads
+from register_decoder import RegisterDecoder, load_register_format
+from daq_scheduler import FixedRateScheduler
 
 if exists('user_defined_settings.ini') == False:
     sys.exit("ERROR: \"user_defined_settings.ini\" config file not found, please run \"create_default_config.py\"")
 
-#function for testing
-def gen_fake_data():
-    threading.Timer(1.0, gen_fake_data).start() #normally 1.0
-    dataset1 = dict(NO2=random.randint(0, 1), time1=(datetime.datetime.now()).strftime("%H:%M:%S"))
-    dataset2 = dict(concentration=random.randint(0, 1), time2=(datetime.datetime.now()).strftime("%H:%M:%S"))
-    dataset3 = dict(Ozone=random.randint(0, 1), time3=(datetime.datetime.now()).strftime("%H:%M:%S"))
-    dataset4 = dict(CO=random.randint(0, 1), time4=(datetime.datetime.now()).strftime("%H:%M:%S"))
-    dataset5 = dict(CO2=random.randint(0, 1), time5=(datetime.datetime.now()).strftime("%H:%M:%S"))
-    dataset6 = dict(NO=random.randint(0, 1), time6=(datetime.datetime.now()).strftime("%H:%M:%S"))
-    dataset7 = dict(WS=random.randint(0, 1), time7=(datetime.datetime.now()).strftime("%H:%M:%S"))
-    dataset8 = dict(WD=random.randint(0, 1), time8=(datetime.datetime.now()).strftime("%H:%M:%S"))
-
-    conn.set('no2', json.dumps(dataset1))
-    conn.set('wcpc', json.dumps(dataset2))
-    conn.set('ozone', json.dumps(dataset3))
-    conn.set('teledyne', json.dumps(dataset4))
-    conn.set('licor', json.dumps(dataset5))
-    conn.set('no', json.dumps(dataset6))
-    conn.set('ws', json.dumps(dataset7))
-    conn.set('wd', json.dumps(dataset8))
-
-#main DAQ functions
-def get_modbus_data(ip, port, enable_pollutant, holding_regs, disabled_behaviour):
+#prints the scheduler's tick, overrun and skipped tick counters about every report_interval_s seconds
+def report_scheduler_stats(scheduler, report_interval_s=60):
+    if scheduler.ticks % max(1, int(report_interval_s * scheduler.rate_hz)) == 0:
+        print('DAQ scheduler: ' + str(scheduler.stats()))
+
+#function for testing, publishes a frame of random data every scheduler tick
+def gen_fake_data(scheduler):
+    sequence = 0
+    while True:
+        scheduler.wait()
+        values = {key: random.randint(0, 1) for key in ['no2', 'wcpc', 'ozone', 'teledyne', 'licor', 'no', 'ws', 'wd']}
+
+        #the whole frame goes to redis in one MULTI, as the latest frame and (with streams) onto the stream
+        publish_frame_record(conn, frame_record(sequence, scheduler.tick_time(), values), frame_key, stream_key, stream_maxlen, use_streams)
+        sequence += 1
+        report_scheduler_stats(scheduler)
+
+#redis key of each pollutant in the frame records
+pollutant_redis_keys = dict(no2='no2', wcpc='wcpc', o3='ozone', co='teledyne', co2='licor', no='no', ws='ws', wd='wd')
+
+#main DAQ functions. The enabled pollutants' holding registers are read in as few block reads as possible (see
+#modbus_blocks.py), with up to max_gap unused registers read between two pollutants to save a round trip, and decoded
+#with their register formats (see register_decoder.py)
+def get_modbus_data(ip, port, enable_pollutant, holding_regs, register_formats, disabled_behaviour, scheduler, max_gap=0):
     cr1000x = ModbusClient(host=ip, port=port)
     cr1000x.open()
 
+    blocks = plan_block_reads({pollutant: holding_regs[pollutant] for pollutant in holding_regs if enable_pollutant[pollutant]},
+                              max_gap)
+    for block in blocks:
+        print('block read: holding registers ' + str(block.start) + '-' + str(block.end() - 1) + ' (' +
+              ", ".join([name for name, offset, length in block.members]) + ')')
+    register_decoder = RegisterDecoder(blocks, register_formats)
+
+    sequence = 0
     while True:
+        scheduler.wait()
+        decoded = register_decoder.read(cr1000x.read_holding_registers)
+        values = {}
+        for pollutant, key in pollutant_redis_keys.items():
+            if enable_pollutant[pollutant]:
+                #None if its block read failed, the dashboard skips it
+                values[key] = decoded.get(pollutant)
+            elif disabled_behaviour == 'random':
+                values[key] = random.randint(0, 1)
+            else:
+                values[key] = 0
 
-        print('i')
-        if enable_pollutant['o3']:
-            ozone_regs = cr1000x.read_holding_registers(holding_regs['o3'][0], holding_regs['o3'][1])  # o3 is 0,2
-            ozone_decoder = BinaryPayloadDecoder.fromRegisters(ozone_regs, Endian.Big, wordorder=Endian.Big)
-            ozone_data = dict(Ozone=round(ozone_decoder.decode_32bit_float(),2), time3=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        elif disabled_behaviour == 'random':
-            ozone_data = dict(Ozone=random.randint(0, 1), time3=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        else:
-            ozone_data = dict(Ozone=0, time3=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        conn.set('ozone', json.dumps(ozone_data))
-
-        if enable_pollutant['no']:
-            no_regs = cr1000x.read_holding_registers(holding_regs['no'][0], holding_regs['no'][1])  # no is 3,2
-            no_decoder = BinaryPayloadDecoder.fromRegisters(no_regs, Endian.Big, wordorder=Endian.Big)
-            no_data = dict(NO=round(no_decoder.decode_32bit_float(),2), time6=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        elif disabled_behaviour == 'random':
-            no_data = dict(NO=random.randint(0, 1), time6=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        else:
-            no_data = dict(NO=0, time6=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        conn.set('no', json.dumps(no_data))
-
-        if enable_pollutant['no2']:
-            no2_regs = cr1000x.read_holding_registers(holding_regs['no2'][0], holding_regs['no2'][1])  # no2 is 5,2
-            no2_decoder = BinaryPayloadDecoder.fromRegisters(no2_regs, Endian.Big, wordorder=Endian.Big)
-            no2_data = dict(NO2=round(no2_decoder.decode_32bit_float(),2), time1=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        elif disabled_behaviour == 'random':
-            no2_data = dict(NO2=random.randint(0, 1), time1=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        else:
-            no2_data = dict(NO2=0, time1=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        conn.set('no2', json.dumps(no2_data))
-
-        if enable_pollutant['wcpc']:
-            wcpc_regs = cr1000x.read_holding_registers(holding_regs['wcpc'][0], holding_regs['wcpc'][1])
-            wcpc_decoder = BinaryPayloadDecoder.fromRegisters(wcpc_regs, Endian.Big, wordorder=Endian.Big)
-            wcpc_data = dict(concentration=round(wcpc_decoder.decode_32bit_float(),2), time2=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        elif disabled_behaviour == 'random':
-            wcpc_data = dict(concentration=random.randint(0, 1), time2=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        else:
-            wcpc_data = dict(concentration=0, time2=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        conn.set('wcpc', json.dumps(wcpc_data))
-
-        if enable_pollutant['co2']:
-            co2_regs = cr1000x.read_holding_registers(holding_regs['co2'][0], holding_regs['co2'][1])
-            co2_decoder = BinaryPayloadDecoder.fromRegisters(co2_regs, Endian.Big, wordorder=Endian.Big)
-            co2_data = dict(CO2=round(co2_decoder.decode_32bit_float(),2), time5=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        elif disabled_behaviour == 'random':
-            co2_data = dict(CO2=random.randint(0, 1), time5=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        else:
-            co2_data = dict(CO2=0, time5=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        conn.set('licor', json.dumps(co2_data))
-
-        if enable_pollutant['co']:
-            co_regs = cr1000x.read_holding_registers(holding_regs['co'][0], holding_regs['co'][1])
-            co_decoder = BinaryPayloadDecoder.fromRegisters(co_regs, Endian.Big, wordorder=Endian.Big)
-            co_data = dict(CO=round(co_decoder.decode_32bit_float(),2), time4=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        elif disabled_behaviour == 'random':
-            co_data = dict(CO=random.randint(0, 1), time4=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        else:
-            co_data = dict(CO=0, time4=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        conn.set('teledyne', json.dumps(co_data))
-
-        if enable_pollutant['ws']:
-            ws_regs = cr1000x.read_holding_registers(holding_regs['ws'][0], holding_regs['ws'][1])
-            ws_decoder = BinaryPayloadDecoder.fromRegisters(ws_regs, Endian.Big, wordorder=Endian.Big)
-            ws_data = dict(WS=round(ws_decoder.decode_32bit_float(),2), time7=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        elif disabled_behaviour == 'random':
-            ws_data = dict(WS=random.randint(0, 1), time7=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        else:
-            ws_data = dict(WS=0, time7=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        conn.set('ws', json.dumps(ws_data))
-
-        if enable_pollutant['wd']:
-            wd_regs = cr1000x.read_holding_registers(holding_regs['wd'][0], holding_regs['wd'][1])
-            wd_decoder = BinaryPayloadDecoder.fromRegisters(wd_regs, Endian.Big, wordorder=Endian.Big)
-            wd_data = dict(WD=round(wd_decoder.decode_32bit_float(),2), time8=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        elif disabled_behaviour == 'random':
-            wd_data = dict(WD=random.randint(0, 1), time8=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        else:
-            wd_data = dict(WD=0, time8=(datetime.datetime.now()).strftime("%H:%M:%S"))
-        conn.set('wd', json.dumps(wd_data))
+        #the whole frame goes to redis in one MULTI, as the latest frame and (with streams) onto the stream
+        publish_frame_record(conn, frame_record(sequence, scheduler.tick_time(), values), frame_key, stream_key, stream_maxlen, use_streams)
+        sequence += 1
+
+        report_scheduler_stats(scheduler)
 
 
 
@@ -194,6 +137,23 @@ if __name__ == "__main__":
             holding_regs_setting[pollutant][0] = parser.getint('modbus-tcp', (pollutant + '_modbus_hr'))
             holding_regs_setting[pollutant][1] = parser.getint('modbus-tcp', (pollutant + '_hr_length'))
 
+    #data type, byte and word order, scale and offset of each enabled pollutant's registers
+    register_formats_setting = {}
+    for pollutant in enable_pollutant_setting:
+        if enable_pollutant_setting[pollutant]:
+            try:
+                register_formats_setting[pollutant] = load_register_format(parser, 'modbus-tcp', pollutant)
+            except ValueError as e:
+                sys.exit('ERROR: [modbus-tcp] ' + pollutant + ': ' + str(e))
+
+    #max no. of unused registers read between two pollutants to merge their reads into one block read
+    max_gap_setting = parser.getint('modbus-tcp', 'max_gap', fallback=10)
+
+    #samples per second, every pollutant is read once per sample and the samples are evenly spaced
+    sample_rate_setting = parser.getfloat('modbus-tcp', 'sample_rate_hz', fallback=1)
+    if sample_rate_setting <= 0:
+        sys.exit("ERROR: the [modbus-tcp] \"sample_rate_hz\" setting must be more than 0")
+
     #disabled_behaviour_setting = parser.get('modbus-tcp', 'random_or_flat_if_disabled')
     disabled_behaviour_setting = 'flat' #manual override
     disabled_behaviour_setting = 'random'
@@ -201,8 +161,15 @@ if __name__ == "__main__":
         if not (enable_pollutant_setting['no2'] and enable_pollutant_setting['wcpc'] and enable_pollutant_setting['o3'] and enable_pollutant_setting['co'] and enable_pollutant_setting['co2'] and enable_pollutant_setting['no'] and enable_pollutant_setting['ws'] and enable_pollutant_setting['wd']):
             sys.exit('ERROR: the setting \'random_or_flat_if_disabled\' must be set to either \'random\' or \'flat\'')
 
-    #establish redis connection
-    conn = redis.Redis(host='localhost')
+    #establish redis connection, using the shared pool configured in the [redis] settings
+    conn = get_redis_connection()
+
+    #redis frame settings, every frame is written as the latest frame and appended to a bounded stream
+    redis_settings = load_redis_settings()
+    use_streams = redis_settings['use_streams']
+    stream_key = redis_settings['stream_key']
+    stream_maxlen = redis_settings['stream_maxlen']
+    frame_key = redis_settings['frame_key']
 
     #printing information
     '''
@@ -223,7 +190,9 @@ if __name__ == "__main__":
             all_disabled = False
             break
 
+    scheduler = FixedRateScheduler(sample_rate_setting)
     if all_disabled:
-        gen_fake_data()
+        gen_fake_data(scheduler)
     else:
-        get_modbus_data(ip_setting, port_setting, enable_pollutant_setting, holding_regs_setting, disabled_behaviour_setting)
\ No newline at end of file
+        get_modbus_data(ip_setting, port_setting, enable_pollutant_setting, holding_regs_setting, register_formats_setting,
+                        disabled_behaviour_setting, scheduler, max_gap_setting)
\ No newline at end of file
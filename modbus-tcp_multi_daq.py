@@ -0,0 +1,178 @@
+"""
+Functions as a DAQ script for the dashboard by polling several modbus-tcp devices at once (e.g. the CR1000X data logger
+plus standalone analyzers on their own ip addresses)
+
+Every sample, all the devices are polled concurrently: each device is read by its own thread, driven from an asyncio
+loop that waits at most the device's "timeout_s" for it. The values of every device that answered in time are merged
+into one frame record, stamped with the sample's time, and published like modbus-tcp_daq.py does (see
+redis_connection.py). A slow or dead device only leaves its own channels out of the frame: the others are still
+published on time, and the slow device isn't asked again until its last read has finished.
+
+The devices are listed in the [modbus-devices] "names" setting, each with a [modbus-device.<name>] section, e.g.
+
+    [modbus-devices]
+    names = cr1000x, no2_analyzer
+
+    [modbus-device.cr1000x]
+    ip_address = 192.168.1.10
+    channels = o3, no, wcpc, co2, co, ws, wd
+    o3_modbus_hr = 0
+    ...
+
+    [modbus-device.no2_analyzer]
+    ip_address = 192.168.1.11
+    timeout_s = 0.3
+    channels = no2
+    no2_modbus_hr = 0
+
+Channels are the dashboard's channel names (see channel_registry.py), each read from "<channel>_modbus_hr" and
+"<channel>_hr_length" (2 by default) holding registers and decoded with its "<channel>_data_type" etc. settings (see
+register_decoder.py), like the [modbus-tcp] settings. A device section can also set "port" (502), "unit_id" (1),
+"timeout_s" (0.5), "max_gap" (the [modbus-tcp] one) and the "byte_order" and "word_order" of its registers. Without a
+[modbus-devices] list the enabled pollutants of the [modbus-tcp] settings are polled as a single device. The sample
+rate is the [modbus-tcp] "sample_rate_hz" setting.
+
+Redis must first be running WITH admin privileges in order for this script to work.
+"""
+
+import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from os.path import exists
+from pyModbusTCP.client import ModbusClient
+from redis_connection import get_redis_connection, load_redis_settings, publish_frame_record, frame_record
+from modbus_blocks import plan_block_reads
+from register_decoder import RegisterDecoder, load_register_format
+from daq_scheduler import FixedRateScheduler
+from channel_registry import load_channel_registry
+
+if exists('user_defined_settings.ini') == False:
+    sys.exit("ERROR: \"user_defined_settings.ini\" config file not found, please run \"create_default_config.py\"")
+
+class ModbusDevice:
+    #registers is a dict of redis key: [start register, number of registers], formats one of redis key: RegisterFormat
+    def __init__(self, name, ip, port, registers, formats, unit_id=1, timeout_s=0.5, max_gap=0):
+        self.name = name
+        self.timeout_s = timeout_s
+        self.blocks = plan_block_reads(registers, max_gap)
+        self.decoder = RegisterDecoder(self.blocks, formats)
+        self.client = ModbusClient(host=ip, port=port, unit_id=unit_id, timeout=timeout_s, auto_open=True)
+        #one thread per device, so a device that hangs only holds up itself
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='modbus-' + name)
+        self.pending = None
+
+        self.reads = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.busy = 0
+
+    #reads every block of the device and decodes its channels (runs in the device's thread). Channels whose block read
+    #failed are left out
+    def read(self):
+        return self.decoder.read(self.client.read_holding_registers)
+
+    def stats(self):
+        return dict(reads=self.reads, timeouts=self.timeouts, errors=self.errors, busy=self.busy)
+
+#polls one device, waiting at most its timeout. Returns its values by redis key, or nothing if it didn't answer in time
+#(or is still busy with a read that timed out earlier)
+async def poll_device(device):
+    if (device.pending is not None) and not device.pending.done():
+        device.busy += 1
+        return {}
+    device.pending = asyncio.get_running_loop().run_in_executor(device.executor, device.read)
+    try:
+        #shielded, so a timeout leaves the read running (and pending) instead of cancelling it
+        values = await asyncio.wait_for(asyncio.shield(device.pending), device.timeout_s)
+    except asyncio.TimeoutError:
+        device.timeouts += 1
+        return {}
+    except (OSError, ValueError) as e:
+        device.errors += 1
+        print("Error reading modbus device " + device.name + ": " + str(e))
+        return {}
+    device.reads += 1
+    return values
+
+#polls every device once per scheduler tick and publishes the merged frame
+async def run_daq(devices, scheduler, conn, redis_settings, report_interval_s=60):
+    sequence = 0
+    while True:
+        await scheduler.wait_async()
+        values = {}
+        for device_values in await asyncio.gather(*[poll_device(device) for device in devices]):
+            values.update(device_values)
+
+        #the whole frame goes to redis in one MULTI, as the latest frame and (with streams) onto the stream
+        publish_frame_record(conn, frame_record(sequence, scheduler.tick_time(), values), redis_settings['frame_key'],
+                             redis_settings['stream_key'], redis_settings['stream_maxlen'], redis_settings['use_streams'])
+        sequence += 1
+
+        if scheduler.ticks % max(1, int(report_interval_s * scheduler.rate_hz)) == 0:
+            print('DAQ scheduler: ' + str(scheduler.stats()))
+            for device in devices:
+                print('  ' + device.name + ': ' + str(device.stats()))
+
+#builds the devices from the [modbus-devices] "names" list, or a single device from the [modbus-tcp] settings
+def load_devices(parser, channel_registry):
+    max_gap = parser.getint('modbus-tcp', 'max_gap', fallback=10)
+    names = [name.strip() for name in parser.get('modbus-devices', 'names', fallback='').split(',') if name.strip() != '']
+    if not names:
+        channels = [channel.name for channel in channel_registry
+                    if parser.getboolean('modbus-tcp', 'enable_' + channel.name, fallback=False)]
+        sections = [('modbus-tcp', 'modbus-tcp', channels)]
+    else:
+        sections = []
+        for name in names:
+            section = 'modbus-device.' + name
+            if not parser.has_section(section):
+                sys.exit('ERROR: modbus device "' + name + '" has no [' + section + '] section')
+            channels = [channel.strip().lower() for channel in parser.get(section, 'channels', fallback='').split(',')
+                        if channel.strip() != '']
+            sections.append((name, section, channels))
+
+    devices = []
+    for name, section, channels in sections:
+        ip = parser.get(section, 'ip_address', fallback='')
+        if ip == '':
+            sys.exit('ERROR: please input an ip address for the [' + section + '] "ip_address" setting')
+        registers = {}
+        formats = {}
+        for channel in channels:
+            if channel not in channel_registry.index:
+                sys.exit('ERROR: [' + section + '] reads channel "' + channel + '", which is not in [channels] "names"')
+            registers[channel_registry[channel].redis_key] = [parser.getint(section, channel + '_modbus_hr'),
+                                                              parser.getint(section, channel + '_hr_length', fallback=2)]
+            try:
+                formats[channel_registry[channel].redis_key] = load_register_format(parser, section, channel)
+            except ValueError as e:
+                sys.exit('ERROR: [' + section + '] ' + channel + ': ' + str(e))
+        devices.append(ModbusDevice(name, ip, parser.getint(section, 'port', fallback=502), registers, formats,
+                                    unit_id=parser.getint(section, 'unit_id', fallback=1),
+                                    timeout_s=parser.getfloat(section, 'timeout_s', fallback=0.5),
+                                    max_gap=parser.getint(section, 'max_gap', fallback=max_gap)))
+    return devices
+
+if __name__ == "__main__":
+
+    #setup config parser
+    parser = ConfigParser(allow_no_value=True)
+    parser.read('user_defined_settings.ini')
+
+    devices = load_devices(parser, load_channel_registry(parser))
+    if not devices:
+        sys.exit('ERROR: no modbus devices to poll, list them in the [modbus-devices] "names" setting')
+    for device in devices:
+        for block in device.blocks:
+            print(device.name + ' block read: holding registers ' + str(block.start) + '-' + str(block.end() - 1) + ' (' +
+                  ", ".join([name for name, offset, length in block.members]) + ')')
+
+    sample_rate_setting = parser.getfloat('modbus-tcp', 'sample_rate_hz', fallback=1)
+    if sample_rate_setting <= 0:
+        sys.exit("ERROR: the [modbus-tcp] \"sample_rate_hz\" setting must be more than 0")
+
+    #establish redis connection, using the shared pool configured in the [redis] settings
+    conn = get_redis_connection()
+
+    asyncio.run(run_daq(devices, FixedRateScheduler(sample_rate_setting), conn, load_redis_settings()))
@@ -0,0 +1,48 @@
+"""
+Block read planner for the modbus-tcp DAQ script (modbus-tcp_daq.py).
+
+Reading each pollutant's holding registers with its own read_holding_registers() call costs a round trip to the data
+logger per pollutant, every frame. The CR1000X's register map is usually (nearly) contiguous, so plan_block_reads()
+merges the configured register ranges into as few block reads as possible: ranges are sorted by start address and a
+range joins the current block if the registers between it and the block (which are read and thrown away) number no
+more than max_gap and the block stays within max_block registers (125 is the most a Modbus read can return).
+read_block() issues a block's read, and register_decoder.py decodes every pollutant's value out of the returned registers.
+"""
+
+#most holding registers a single Modbus read can return
+modbus_max_registers = 125
+
+class BlockRead:
+    def __init__(self, start, count):
+        self.start = start
+        self.count = count
+        #(name, offset into the block, length) of every range read by this block
+        self.members = []
+
+    def end(self):
+        return self.start + self.count
+
+#plans the block reads of ranges, a dict of name: [start register, number of registers]. Returns a list of BlockReads
+#in address order. Overlapping ranges are fine, they just share registers
+def plan_block_reads(ranges, max_gap=0, max_block=modbus_max_registers):
+    blocks = []
+    for name, (start, length) in sorted(ranges.items(), key=lambda item: (item[1][0], item[1][1])):
+        if length > max_block:
+            raise ValueError(name + ' reads ' + str(length) + ' registers, more than the ' + str(max_block) +
+                             ' a single Modbus read can return')
+        block = blocks[-1] if blocks else None
+        if (block is None) or (start - block.end() > max_gap) or (max(block.end(), start + length) - block.start > max_block):
+            block = BlockRead(start, length)
+            blocks.append(block)
+        else:
+            block.count = max(block.end(), start + length) - block.start
+        block.members.append((name, start - block.start, length))
+    return blocks
+
+#reads a block with read_registers(start, count) (e.g. a pyModbusTCP client's read_holding_registers) and returns its
+#registers, or None if the read failed (read_registers returned None or too few registers)
+def read_block(read_registers, block):
+    registers = read_registers(block.start, block.count)
+    if (registers is None) or (len(registers) < block.count):
+        return None
+    return registers
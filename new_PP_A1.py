@@ -9,12 +9,12 @@ All of the settings related to A1 in 'user_defined_settings.ini' must be specifi
 import math
 import csv
 import pandas as pd
-from collections import deque
-import statistics
 from configparser import ConfigParser
 import numpy as np
 import sys
 from os.path import exists
+from binary_transcript import read_transcript
+from sliding_window import SlidingWindow
 
 #used for grabbing bulk processing settings, will also keep the asterisk if there is one
 def full_string_to_int_list(string_in):
@@ -307,14 +307,14 @@ settings_in_output = {
 
 #defining traces
 traces = dict(
-    no2=deque([], maxlen=trace_length),
-    wcpc=deque([], maxlen=trace_length),
-    o3=deque([], maxlen=trace_length),
-    co=deque([], maxlen=trace_length),
-    co2=deque([], maxlen=trace_length),
-    no=deque([], maxlen=trace_length),
-    ws=deque([], maxlen=trace_length),
-    wd=deque([], maxlen=trace_length)
+    no2=SlidingWindow(maxlen=trace_length),
+    wcpc=SlidingWindow(maxlen=trace_length),
+    o3=SlidingWindow(maxlen=trace_length),
+    co=SlidingWindow(maxlen=trace_length),
+    co2=SlidingWindow(maxlen=trace_length),
+    no=SlidingWindow(maxlen=trace_length),
+    ws=SlidingWindow(maxlen=trace_length),
+    wd=SlidingWindow(maxlen=trace_length)
 )
 
 #global counting variables
@@ -344,21 +344,16 @@ def ispeak(pollutant):
     global A1_thresh_bump_percentile
     global traces
 
-    #compute list of points below our percentile, return 0 if there's an issue
-    m = np.percentile(traces[pollutant], A1_percentile[pollutant])
-    below_m = []
-    for x in traces[pollutant]:
-        if x<m:
-            below_m.append(x)
-    if len(below_m)<2:
+    #stdev of the points below our percentile, return 0 if there's an issue
+    below_m_count, below_m_mean, sd = traces[pollutant].below_percentile_stats(A1_percentile[pollutant])
+    if below_m_count<2:
         A1_n[pollutant] = 0
         return 0
 
     #calculating thresh
-    sd = statistics.stdev(below_m)  # stdev will do sample sd and pstdev will do population sd
-    thresh = A1_coeff[pollutant] * sd
+    thresh = A1_coeff[pollutant] * sd  # sd is the sample sd, like statistics.stdev
     if A1_thresh_bump_percentile[pollutant] != 0:
-        thresh += np.percentile(traces[pollutant], A1_thresh_bump_percentile[pollutant])
+        thresh += traces[pollutant].percentile(A1_thresh_bump_percentile[pollutant])
 
     #checking appropriate condition
     if traces[pollutant][-1] > thresh:
@@ -385,21 +380,16 @@ def ispeakAndThresh(pollutant):
     global traces
     global base_thresh_only
 
-    #compute list of points below our percentile, return 0 if there's an issue
-    m = np.percentile(traces[pollutant], A1_percentile[pollutant])
-    below_m = []
-    for x in traces[pollutant]:
-        if x<m:
-            below_m.append(x)
-    if len(below_m)<2:
+    #stdev of the points below our percentile, return 0 if there's an issue
+    below_m_count, below_m_mean, sd = traces[pollutant].below_percentile_stats(A1_percentile[pollutant])
+    if below_m_count<2:
         A1_n[pollutant] = 0
         return [0, 0]
 
     #calculating thresh
-    sd = statistics.stdev(below_m)  # stdev will do sample sd and pstdev will do population sd
-    thresh = A1_coeff[pollutant] * sd
+    thresh = A1_coeff[pollutant] * sd  # sd is the sample sd, like statistics.stdev
     if A1_thresh_bump_percentile[pollutant] != 0:
-        thresh += np.percentile(traces[pollutant], A1_thresh_bump_percentile[pollutant])
+        thresh += traces[pollutant].percentile(A1_thresh_bump_percentile[pollutant])
 
     #checking appropriate condition
     if traces[pollutant][-1] > thresh:
@@ -452,7 +442,7 @@ def compute_peak_list(input_list, pollutant):
 if bulk_processing == False:
     while True:
         # read in the current chunk
-        data = pd.read_csv(filename, names=col_names, skiprows=(1 + current_chunk * queue_size), nrows=queue_size)
+        data = read_transcript(filename, names=col_names, start=current_chunk * queue_size, stop=(current_chunk + 1) * queue_size)
 
         # convert current chunk to lists
         no2_list = data["NO2 (ppb)"].to_list()
@@ -591,14 +581,14 @@ else:
 
         #reseting all counters
         traces = dict(
-            no2=deque([], maxlen=trace_length),
-            wcpc=deque([], maxlen=trace_length),
-            o3=deque([], maxlen=trace_length),
-            co=deque([], maxlen=trace_length),
-            co2=deque([], maxlen=trace_length),
-            no=deque([], maxlen=trace_length),
-            ws=deque([], maxlen=trace_length),
-            wd=deque([], maxlen=trace_length)
+            no2=SlidingWindow(maxlen=trace_length),
+            wcpc=SlidingWindow(maxlen=trace_length),
+            o3=SlidingWindow(maxlen=trace_length),
+            co=SlidingWindow(maxlen=trace_length),
+            co2=SlidingWindow(maxlen=trace_length),
+            no=SlidingWindow(maxlen=trace_length),
+            ws=SlidingWindow(maxlen=trace_length),
+            wd=SlidingWindow(maxlen=trace_length)
         )
         A1_n = {
             "no2": 0,
@@ -651,7 +641,7 @@ else:
 
         while True:
             # read in the current chunk
-            data = pd.read_csv(filename, names=col_names, skiprows=(1 + current_chunk * queue_size), nrows=queue_size)
+            data = read_transcript(filename, names=col_names, start=current_chunk * queue_size, stop=(current_chunk + 1) * queue_size)
 
             # convert current chunk to lists
             no2_list = data["NO2 (ppb)"].to_list()
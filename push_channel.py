@@ -0,0 +1,91 @@
+"""
+Optional WebSocket push channel for the dashboard (main.py).
+
+Without it every browser polls the server on a timer for the bars, the wind direction and the live plot, whether or not
+anything changed. With [push] "enable_push" set, the ingest engine publishes a small JSON message to a PushBroadcaster
+as soon as a frame has been ingested and a WebSocket route (/push, served by flask-sock) sends it straight on to every
+connected browser. assets/push.js turns the messages into widget updates and switches the polling timers off while the
+socket is open; if it closes, or the server doesn't offer it, the timers take over again.
+
+Each client gets its own bounded queue of messages so one slow browser can't hold up the ingest engine or the other
+clients: when a client's queue is full its oldest message is dropped (every message carries the latest values, so only
+the newest one matters). flask-sock is only needed when push is enabled.
+"""
+
+import json
+import queue
+import threading
+
+class PushBroadcaster:
+    def __init__(self, client_queue_size=10):
+        self.client_queue_size = client_queue_size
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.latest_message = None
+        self.published_messages = 0
+        self.dropped_messages = 0
+
+    #adds a client and returns its queue, primed with the latest message so it can draw straight away
+    def register(self):
+        client = queue.Queue(maxsize=self.client_queue_size)
+        with self.lock:
+            if self.latest_message is not None:
+                client.put_nowait(self.latest_message)
+            self.clients.add(client)
+        return client
+
+    def unregister(self, client):
+        with self.lock:
+            self.clients.discard(client)
+
+    #serializes a message once and queues it for every client, dropping a client's oldest message if its queue is full
+    def publish(self, message):
+        text = json.dumps(message)
+        with self.lock:
+            self.latest_message = text
+            self.published_messages += 1
+            for client in self.clients:
+                while True:
+                    try:
+                        client.put_nowait(text)
+                        break
+                    except queue.Full:
+                        try:
+                            client.get_nowait()
+                            self.dropped_messages += 1
+                        except queue.Empty:
+                            pass
+
+    def stats(self):
+        with self.lock:
+            return dict(
+                clients=len(self.clients),
+                published_messages=self.published_messages,
+                dropped_messages=self.dropped_messages
+            )
+
+#adds the WebSocket route to the Flask server. Raises ImportError if flask-sock isn't installed
+def register_push_route(server, broadcaster, path='/push', ping_interval_s=25):
+    from flask_sock import Sock
+    from simple_websocket import ConnectionClosed
+
+    server.config['SOCK_SERVER_OPTIONS'] = {'ping_interval': ping_interval_s}
+    sock = Sock(server)
+
+    @sock.route(path)
+    def push(ws):
+        client = broadcaster.register()
+        try:
+            #wake up every second to notice closed sockets even when nothing is being sent
+            while ws.connected:
+                try:
+                    message = client.get(timeout=1)
+                except queue.Empty:
+                    continue
+                ws.send(message)
+        except ConnectionClosed:
+            pass
+        finally:
+            broadcaster.unregister(client)
+
+    return sock
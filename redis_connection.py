@@ -0,0 +1,150 @@
+"""
+Shared Redis connection pool for the dashboard (main.py) and the DAQ scripts (e.g. modbus-tcp_daq.py).
+
+Every Redis client handed out by get_redis_connection() shares one module-level connection pool, so callbacks and DAQ
+loops reuse open TCP connections instead of connecting on every call. The connection settings are read from the
+'[redis]' section of 'user_defined_settings.ini'. If that section (or a setting in it) is missing, the defaults below
+are used, which point at a local redis server on the default port.
+
+The DAQ script publishes every frame it acquires as one frame record, a JSON value holding a sequence number, the
+frame's time stamp (local ISO 8601 time to the microsecond) and every channel's value keyed by the channel's redis key:
+
+    {"seq": 1234, "time": "2022-06-01T13:45:10.250000", "values": {"no2": 12.5, "wcpc": 5012, ...}}
+
+publish_frame_record() stores it under the 'frame_key' key and appends it to a Redis Stream (see the 'use_streams',
+'stream_key' and 'stream_maxlen' settings) in a single MULTI, so every channel of a frame arrives together in one
+round trip and the dashboard can consume every frame in order with XREAD instead of polling the latest frame. The
+dashboard still reads DAQ scripts that write one JSON record per channel key (and append those to the stream with
+publish_frame()).
+"""
+
+import json
+import threading
+import redis
+from configparser import ConfigParser
+
+#defaults used when a setting is missing from the [redis] section
+default_redis_settings = {
+    'host': 'localhost',
+    'port': '6379',
+    'db': '0',
+    'socket_timeout': '5',
+    'socket_connect_timeout': '5',
+    'max_connections': '20',
+    'use_streams': 'false',
+    'stream_key': 'plume_frames',
+    'stream_maxlen': '10000',
+    'frame_key': 'plume_frame'
+}
+
+#connection pool that keeps track of how many connections it has created and how many are currently checked out
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    def __init__(self, *args, **kwargs):
+        #the stats have to exist before the parent constructor calls reset()
+        self.stats_lock = threading.Lock()
+        self.created_connections = 0
+        self.in_use_connections = 0
+        super().__init__(*args, **kwargs)
+
+    def reset(self):
+        super().reset()
+        #after a reset (e.g. in a forked process) none of our connections are checked out anymore
+        with self.stats_lock:
+            self.in_use_connections = 0
+
+    def make_connection(self):
+        connection = super().make_connection()
+        with self.stats_lock:
+            self.created_connections += 1
+        return connection
+
+    def get_connection(self, *args, **kwargs):
+        connection = super().get_connection(*args, **kwargs)
+        with self.stats_lock:
+            self.in_use_connections += 1
+        return connection
+
+    def release(self, connection):
+        super().release(connection)
+        with self.stats_lock:
+            self.in_use_connections = max(0, self.in_use_connections - 1)
+
+#module-level pool, created on first use by get_redis_pool()
+redis_pool = None
+redis_pool_lock = threading.Lock()
+
+#reads the [redis] settings, filling in defaults for anything that is missing
+def load_redis_settings(settings_filename='user_defined_settings.ini'):
+    parser = ConfigParser(allow_no_value=True)
+    parser.read(settings_filename)
+
+    settings = {}
+    for setting in default_redis_settings:
+        value = parser.get('redis', setting, fallback='')
+        if (value is None) or (value == ''):
+            value = default_redis_settings[setting]
+        settings[setting] = value
+
+    return dict(
+        host=settings['host'],
+        port=int(settings['port']),
+        db=int(settings['db']),
+        socket_timeout=float(settings['socket_timeout']),
+        socket_connect_timeout=float(settings['socket_connect_timeout']),
+        max_connections=int(settings['max_connections']),
+        use_streams=parser.BOOLEAN_STATES[settings['use_streams'].lower()],
+        stream_key=settings['stream_key'],
+        stream_maxlen=int(settings['stream_maxlen']),
+        frame_key=settings['frame_key']
+    )
+
+#returns the shared connection pool, creating it from the settings file the first time it's needed
+def get_redis_pool():
+    global redis_pool
+    with redis_pool_lock:
+        if redis_pool is None:
+            settings = load_redis_settings()
+            redis_pool = InstrumentedConnectionPool(
+                host=settings['host'],
+                port=settings['port'],
+                db=settings['db'],
+                socket_timeout=settings['socket_timeout'],
+                socket_connect_timeout=settings['socket_connect_timeout'],
+                max_connections=settings['max_connections'],
+                #wait up to the socket timeout for a free connection instead of failing straight away
+                timeout=settings['socket_timeout']
+            )
+        return redis_pool
+
+#appends one DAQ frame (a dict of redis key: JSON string) to the stream, trimming the stream to roughly stream_maxlen
+#entries so it can't grow without bound
+def publish_frame(conn, frame, stream_key, stream_maxlen):
+    return conn.xadd(stream_key, frame, maxlen=stream_maxlen, approximate=True)
+
+#builds a frame record (see above) from a sequence number, the frame's time (a datetime) and its values by redis key
+def frame_record(sequence, time, values):
+    return dict(seq=sequence, time=time.isoformat(timespec='microseconds'), values=values)
+
+#publishes one DAQ frame record (see above) as the latest frame and, if use_streams, appends it to the stream, in one
+#MULTI so readers never see half a frame
+def publish_frame_record(conn, record, frame_key, stream_key, stream_maxlen, use_streams=True):
+    encoded = json.dumps(record)
+    pipeline = conn.pipeline(transaction=True)
+    pipeline.set(frame_key, encoded)
+    if use_streams:
+        pipeline.xadd(stream_key, {'frame': encoded}, maxlen=stream_maxlen, approximate=True)
+    return pipeline.execute()
+
+#returns a redis client backed by the shared pool. Clients are cheap, the connections are what gets reused
+def get_redis_connection():
+    return redis.Redis(connection_pool=get_redis_pool())
+
+#returns the pool stats, useful for spotting connection churn (created_connections should level off quickly)
+def redis_pool_stats():
+    pool = get_redis_pool()
+    with pool.stats_lock:
+        return dict(
+            created_connections=pool.created_connections,
+            in_use_connections=pool.in_use_connections,
+            max_connections=pool.max_connections
+        )
@@ -0,0 +1,76 @@
+"""
+Simulated data sources for the dashboard.
+
+A simulated data file is loaded once, when the dashboard starts, into a compact NumPy array so that the ingest engine
+can hand out the next simulated value in O(1) instead of re-reading the file on every tick. Files have no header row,
+the first column is an index (row number, time, etc.) and every following column is one channel of simulated values,
+which is the same layout the dashboard has always used for '.csv' and '.xlsx' simulated data. '.parquet' files are
+also supported if pyarrow (or fastparquet) is installed, in which case the column names are ignored.
+"""
+
+import numpy as np
+import pandas as pd
+
+#file types a simulated source can be loaded from
+simulated_data_extensions = ['csv', 'xlsx', 'parquet']
+
+#returns the extension of filename in lowercase, without the dot
+def get_extension(filename):
+    if '.' not in filename:
+        return ''
+    return filename.rsplit('.', 1)[1].lower()
+
+#loads a simulated data file into a (rows x channels) float64 array, dropping the index column
+def load_simulated_data(filename):
+    extension = get_extension(filename)
+    if extension == 'csv':
+        data = pd.read_csv(filename, header=None)
+    elif extension == 'xlsx':
+        data = pd.read_excel(filename, header=None, engine='openpyxl')
+    elif extension == 'parquet':
+        data = pd.read_parquet(filename)
+    else:
+        raise ValueError('simulated data files must be one of: ' + ', '.join(simulated_data_extensions))
+
+    if data.shape[1] < 2:
+        raise ValueError('"' + filename + '" must have an index column followed by at least one column of values')
+
+    return np.ascontiguousarray(data.iloc[:, 1:].to_numpy(dtype=np.float64))
+
+#a simulated data file that hands out one row of values per call. When the end of the file is reached it either wraps
+#around to the first row ('wrap') or stops handing out values ('stop')
+class SimulatedSource:
+    def __init__(self, filename, end_behaviour='wrap'):
+        if end_behaviour not in ('wrap', 'stop'):
+            raise ValueError('end_behaviour must be either "wrap" or "stop"')
+
+        self.filename = filename
+        self.end_behaviour = end_behaviour
+        self.values = load_simulated_data(filename)
+        self.channels = self.values.shape[1]
+        self.index = 0
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    #returns the next row (one value per channel), or None if the source has stopped
+    def next_row(self):
+        if self.index >= self.values.shape[0]:
+            if self.end_behaviour == 'stop' or self.values.shape[0] == 0:
+                return None
+            self.index = 0
+
+        row = self.values[self.index]
+        self.index += 1
+        return row
+
+    #returns the next value of a single channel, or None if the source has stopped
+    def next_value(self, channel=0):
+        row = self.next_row()
+        if row is None:
+            return None
+        return float(row[channel])
+
+    #goes back to the first row
+    def rewind(self):
+        self.index = 0
@@ -0,0 +1,276 @@
+"""
+Sliding-window order statistics for the A1 peak detection algorithm of the post processing script (new_PP_A1.py).
+
+A1 needs, for the last trace_length values of a pollutant, a percentile of the window (numpy's default 'linear'
+percentile) and the sample standard deviation of the values strictly below that percentile. Recomputing those from
+scratch costs O(n log n) per sample, so SlidingWindow keeps them up to date as values enter and leave the window.
+
+Each percentile is tracked by a SlidingPercentile: two heaps split the window so that the 'lower' max-heap holds the
+floor(p/100*(n-1))+1 smallest values and the 'upper' min-heap holds the rest. The percentile is then interpolated from
+the two heap tops, and the values below it are the lower heap, minus any copies of its top if the percentile lands
+exactly on it. The count, sum and sum of squares of the lower heap are kept as values move between heaps. Values
+leaving the window are deleted lazily (they're only popped once they reach the top of their heap), so every update is
+O(log n). Every resync_interval updates the sums are recomputed exactly and the heaps are compacted, which stops
+floating point error and lazily deleted values from building up.
+
+NaNs (e.g. blank cells in a transcript) can't go in the heaps, NaN never compares equal to itself so it could never be
+found again to delete it. SlidingWindow keeps them out of the trackers and counts them instead, and while the window
+holds any NaN its percentiles are NaN and no value is below them, which is what np.percentile gave the A1 algorithm.
+"""
+
+import math
+import heapq
+from collections import deque
+
+def is_nan(x):
+    return x != x
+
+#tracks one percentile of a multiset of values, see the module docstring
+class SlidingPercentile:
+    def __init__(self, percentile, values=(), resync_interval=1024):
+        if not 0 <= percentile <= 100:
+            raise ValueError('percentile must be between 0 and 100')
+        self.percentile = percentile
+        self.resync_interval = resync_interval
+        self.reset(values)
+
+    #rebuilds the heaps from scratch
+    def reset(self, values=()):
+        values = sorted(values)
+        k = self.lower_target(len(values))
+
+        #lower is a max-heap (stored negated), upper a min-heap
+        self.lower = [-x for x in values[:k]]
+        self.upper = list(values[k:])
+        heapq.heapify(self.lower)
+        heapq.heapify(self.upper)
+        self.lower_size = k
+        self.upper_size = len(values) - k
+
+        #values waiting to be popped from each heap, and how many times each value is in the lower heap
+        self.lower_delayed = {}
+        self.upper_delayed = {}
+        self.lower_counts = {}
+        for x in values[:k]:
+            self.lower_counts[x] = self.lower_counts.get(x, 0) + 1
+
+        self.resync()
+
+    #recomputes the lower heap sums exactly and drops lazily deleted values from both heaps
+    def resync(self):
+        lower_values = []
+        for x, count in self.lower_counts.items():
+            lower_values += [x] * count
+        upper_counts = {}
+        for x in self.upper:
+            upper_counts[x] = upper_counts.get(x, 0) + 1
+        for x, count in self.upper_delayed.items():
+            if count:
+                upper_counts[x] -= count
+        upper_values = []
+        for x, count in upper_counts.items():
+            upper_values += [x] * count
+
+        self.lower = [-x for x in lower_values]
+        self.upper = upper_values
+        heapq.heapify(self.lower)
+        heapq.heapify(self.upper)
+        self.lower_delayed = {}
+        self.upper_delayed = {}
+
+        #the sums are of (x - shift), shifting by a typical value keeps the sum of squares well conditioned
+        self.shift = -self.lower[0] if self.lower else 0.0
+        self.lower_sum = math.fsum([x - self.shift for x in lower_values])
+        self.lower_sumsq = math.fsum([(x - self.shift) ** 2 for x in lower_values])
+        self.updates = 0
+
+    #number of values that belong in the lower heap when the window holds n values
+    def lower_target(self, n):
+        if n == 0:
+            return 0
+        return math.floor((self.percentile / 100) * (n - 1)) + 1
+
+    def __len__(self):
+        return self.lower_size + self.upper_size
+
+    #pops lazily deleted values off the heap tops
+    def prune(self):
+        while self.lower and self.lower_delayed.get(-self.lower[0], 0):
+            x = -heapq.heappop(self.lower)
+            self.lower_delayed[x] -= 1
+        while self.upper and self.upper_delayed.get(self.upper[0], 0):
+            x = heapq.heappop(self.upper)
+            self.upper_delayed[x] -= 1
+
+    def lower_add(self, x):
+        heapq.heappush(self.lower, -x)
+        self.lower_size += 1
+        self.lower_counts[x] = self.lower_counts.get(x, 0) + 1
+        self.lower_sum += x - self.shift
+        self.lower_sumsq += (x - self.shift) ** 2
+
+    def lower_discard(self, x):
+        self.lower_size -= 1
+        self.lower_counts[x] -= 1
+        if self.lower_counts[x] == 0:
+            del self.lower_counts[x]
+        self.lower_sum -= x - self.shift
+        self.lower_sumsq -= (x - self.shift) ** 2
+
+    #moves heap tops across until the lower heap has the right number of values
+    def rebalance(self):
+        k = self.lower_target(len(self))
+        while self.lower_size > k:
+            self.prune()
+            x = -heapq.heappop(self.lower)
+            self.lower_discard(x)
+            heapq.heappush(self.upper, x)
+            self.upper_size += 1
+        while self.lower_size < k:
+            self.prune()
+            x = heapq.heappop(self.upper)
+            self.upper_size -= 1
+            self.lower_add(x)
+        self.prune()
+
+        self.updates += 1
+        if self.updates >= self.resync_interval:
+            self.resync()
+
+    def add(self, x):
+        self.prune()
+        if self.lower and x <= -self.lower[0]:
+            self.lower_add(x)
+        else:
+            heapq.heappush(self.upper, x)
+            self.upper_size += 1
+        self.rebalance()
+
+    #removes one copy of x, which must be in the multiset
+    def remove(self, x):
+        self.prune()
+        #every value in the upper heap is >= the lower heap's top, so anything <= the top can be taken from the lower heap
+        if self.lower and x <= -self.lower[0]:
+            self.lower_discard(x)
+            self.lower_delayed[x] = self.lower_delayed.get(x, 0) + 1
+        else:
+            self.upper_size -= 1
+            self.upper_delayed[x] = self.upper_delayed.get(x, 0) + 1
+        self.rebalance()
+
+    #the percentile, interpolated the same way as np.percentile, or None if there are no values
+    def value(self):
+        if self.lower_size == 0:
+            return None
+        below = -self.lower[0]
+        virtual_index = (self.percentile / 100) * (len(self) - 1)
+        fraction = virtual_index - math.floor(virtual_index)
+        if (fraction == 0) or (self.upper_size == 0):
+            return below
+        above = self.upper[0]
+        difference = above - below
+        if fraction >= 0.5:
+            return above - difference * (1 - fraction)
+        return below + difference * fraction
+
+    #returns (count, sum, sum of squares) of the values strictly below the percentile, sums are of (x - shift)
+    def below_sums(self):
+        if self.lower_size == 0:
+            return 0, 0.0, 0.0
+        top = -self.lower[0]
+        if self.value() > top:
+            return self.lower_size, self.lower_sum, self.lower_sumsq
+
+        #the percentile landed on the lower heap's top, so leave out every copy of it
+        ties = self.lower_counts[top]
+        return (self.lower_size - ties, self.lower_sum - ties * (top - self.shift),
+                self.lower_sumsq - ties * (top - self.shift) ** 2)
+
+    #returns (count, mean, sample standard deviation) of the values strictly below the percentile. mean is None if there
+    #are no such values and the standard deviation is None if there are fewer than two
+    def below_stats(self):
+        count, total, total_sq = self.below_sums()
+        if count == 0:
+            return 0, None, None
+        mean = total / count
+        if count < 2:
+            return count, mean + self.shift, None
+        #anything below the rounding error the running sums can build up between resyncs is treated as zero
+        squared_deviations = total_sq - total * mean
+        if squared_deviations <= 1e-12 * total_sq:
+            squared_deviations = 0.0
+        variance = squared_deviations / (count - 1)
+        return count, mean + self.shift, math.sqrt(variance)
+
+#a window over the last maxlen values (or every value if maxlen is None) that keeps any number of percentiles up to
+#date. It can be read like a deque (len, indexing, iteration). A percentile starts being tracked the first time it's
+#asked for
+class SlidingWindow:
+    def __init__(self, values=(), maxlen=None, resync_interval=1024):
+        self.values = deque(values, maxlen=maxlen)
+        self.maxlen = maxlen
+        self.resync_interval = resync_interval
+        self.trackers = {}
+        self.nan_count = sum([1 for x in self.values if is_nan(x)])
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def tracker(self, percentile):
+        if percentile not in self.trackers:
+            self.trackers[percentile] = SlidingPercentile(percentile, self.numbers(), self.resync_interval)
+        return self.trackers[percentile]
+
+    #the values that aren't NaN, which are the ones the trackers hold
+    def numbers(self):
+        return [x for x in self.values if not is_nan(x)]
+
+    #adds a value, dropping the oldest one if the window is full
+    def append(self, x):
+        if (self.maxlen is not None) and (len(self.values) == self.maxlen):
+            self.popleft()
+        self.values.append(x)
+        if is_nan(x):
+            self.nan_count += 1
+            return
+        for tracker in self.trackers.values():
+            tracker.add(x)
+
+    #drops the oldest value
+    def popleft(self):
+        x = self.values.popleft()
+        if is_nan(x):
+            self.nan_count -= 1
+            return x
+        for tracker in self.trackers.values():
+            tracker.remove(x)
+        return x
+
+    #replaces the window's values
+    def reset(self, values=()):
+        self.values = deque(values, maxlen=self.maxlen)
+        self.nan_count = sum([1 for x in self.values if is_nan(x)])
+        numbers = self.numbers()
+        for tracker in self.trackers.values():
+            tracker.reset(numbers)
+
+    #stops tracking a percentile that's no longer needed
+    def forget(self, percentile):
+        self.trackers.pop(percentile, None)
+
+    def percentile(self, percentile):
+        if self.nan_count:
+            return math.nan
+        return self.tracker(percentile).value()
+
+    #(count, mean, sample standard deviation) of the values strictly below a percentile, see SlidingPercentile.below_stats
+    def below_percentile_stats(self, percentile):
+        if self.nan_count:
+            return 0, None, None
+        return self.tracker(percentile).below_stats()
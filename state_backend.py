@@ -0,0 +1,149 @@
+"""
+Live state backends for the dashboard (main.py).
+
+The traces, the auto event algorithm state (A1_n, AQ_over, the event counters, index_clock) and the settings the
+commands change are owned by whichever process runs the ingest engine. With the dashboard served by a single process
+(app.run_server) that's the only process there is, which is what LocalStateBackend is for: it keeps everything in
+memory and doesn't share anything.
+
+To serve the dashboard from several processes (e.g. gunicorn with a few workers, see wsgi.py) use RedisStateBackend.
+The processes then elect one ingest leader through a lease in redis, and only the leader pulls DAQ frames, runs the
+algorithms and writes the log files. Every frame it ingests is published, together with the latest values message and
+a snapshot of the algorithm state, in one Lua script that first checks the leader still holds the lease, so a leader
+that has been replaced can't publish anymore. The other processes (followers) replay the published frames into their
+own trace and history stores to serve plots, and hand the event markers and commands their browsers send to the
+leader through a queue. If the leader goes away its lease expires and a follower takes over, starting from the last
+published algorithm state.
+
+Both backends have the same methods:
+    acquire_ingest_lease()  - True if this process is (now) the ingest leader
+    publish(record, state)  - publishes an ingested frame record and the algorithm state, False if no longer leader
+    read_records(block_ms)  - the next batch of frame records published by the leader since the last call (or since
+                              startup), empty once caught up
+    load_state()            - the last published algorithm state, or None
+    submit_event(event)     - queues an event (anything json can encode, e.g. an event tag and its time) for the leader
+    take_events()           - takes every queued event, in order
+"""
+
+import os
+import json
+import uuid
+import socket
+import threading
+from collections import deque
+
+class LocalStateBackend:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = None
+        self.events = deque()
+
+    #a single process is always the leader
+    def acquire_ingest_lease(self):
+        return True
+
+    def publish(self, record, state):
+        with self.lock:
+            self.state = state
+        return True
+
+    #there's no other process to replay frames from
+    def read_records(self, block_ms=None):
+        return []
+
+    def load_state(self):
+        with self.lock:
+            return self.state
+
+    def submit_event(self, event):
+        self.events.append(event)
+
+    def take_events(self):
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+        return events
+
+#sets the lease if it's free or already ours, returns 1 if we hold it
+acquire_lease_script = """
+local owner = redis.call('get', KEYS[1])
+if (owner == false) or (owner == ARGV[1]) then
+    redis.call('set', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+#publishes a frame record and the algorithm state, only if we still hold the lease
+publish_script = """
+if redis.call('get', KEYS[1]) ~= ARGV[1] then
+    return false
+end
+local id = redis.call('xadd', KEYS[2], 'MAXLEN', '~', ARGV[2], '*', 'record', ARGV[3])
+redis.call('set', KEYS[3], ARGV[4])
+return id
+"""
+
+class RedisStateBackend:
+    #get_connection returns a redis client (e.g. redis_connection.get_redis_connection). lease_s is how long the leader
+    #can go without renewing its lease before another process takes over, record_maxlen roughly how many published
+    #frames are kept for followers to replay and record_batch_size how many read_records returns at most, so a new
+    #follower replays the backlog in batches instead of one huge reply
+    def __init__(self, get_connection, key_prefix='plume_state', lease_s=5, record_maxlen=100000, record_batch_size=1000):
+        self.get_connection = get_connection
+        self.lease_key = key_prefix + ':ingest_lease'
+        self.record_key = key_prefix + ':records'
+        self.state_key = key_prefix + ':algorithm_state'
+        self.event_key = key_prefix + ':events'
+        self.lease_ms = int(lease_s * 1000)
+        self.record_maxlen = record_maxlen
+        self.record_batch_size = record_batch_size
+        self.owner = socket.gethostname() + ':' + str(os.getpid()) + ':' + uuid.uuid4().hex
+
+        #id of the last record this process published or replayed, followers replay everything still in the stream
+        self.last_record_id = '0'
+
+        conn = self.get_connection()
+        self.acquire_lease = conn.register_script(acquire_lease_script)
+        self.publish_record = conn.register_script(publish_script)
+
+    def acquire_ingest_lease(self):
+        return bool(self.acquire_lease(keys=[self.lease_key], args=[self.owner, self.lease_ms],
+                                       client=self.get_connection()))
+
+    def publish(self, record, state):
+        record_id = self.publish_record(keys=[self.lease_key, self.record_key, self.state_key],
+                                        args=[self.owner, self.record_maxlen, json.dumps(record), json.dumps(state)],
+                                        client=self.get_connection())
+        if record_id is None:
+            return False
+        #our own records don't need replaying if we become a follower
+        self.last_record_id = record_id
+        return True
+
+    def read_records(self, block_ms=None):
+        streams = self.get_connection().xread({self.record_key: self.last_record_id}, count=self.record_batch_size,
+                                              block=block_ms)
+        records = []
+        for stream_name, entries in streams:
+            for record_id, fields in entries:
+                records.append(json.loads(fields[b'record']))
+                self.last_record_id = record_id
+        return records
+
+    def load_state(self):
+        state = self.get_connection().get(self.state_key)
+        if state is None:
+            return None
+        return json.loads(state)
+
+    def submit_event(self, event):
+        self.get_connection().rpush(self.event_key, json.dumps(event))
+
+    #takes the whole queue in one MULTI so no event is taken twice or lost
+    def take_events(self):
+        pipeline = self.get_connection().pipeline(transaction=True)
+        pipeline.lrange(self.event_key, 0, -1)
+        pipeline.delete(self.event_key)
+        events, deleted = pipeline.execute()
+        return [json.loads(event) for event in events]
@@ -0,0 +1,81 @@
+"""
+Checks that a Sensor Transcript written with BinaryTranscriptWriter reads back with read_transcript like its csv does,
+including row ranges, renamed and selected columns, and a record left half written by a power cut.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from transcript_writer import TranscriptWriter
+from binary_transcript import BinaryTranscriptWriter, read_transcript, read_header, binary_transcript_length
+
+fieldnames = ['Row', 'Time', 'no2', 'co2']
+
+def make_rows(count, first_row=0):
+    rows = []
+    for row in range(first_row, first_row + count):
+        time = '2022-06-01 12:%02d:%02d' % (row // 60, row % 60)
+        rows.append(([row, time, row * 0.5, 400.0 + row], str(row) + "\n"))
+    return rows
+
+#writes rows to both a binary and a csv Sensor Transcript, returns their file names
+def write_transcripts(folder, rows):
+    binary_writer = BinaryTranscriptWriter(folder, 'Sensor Transcript', fieldnames)
+    csv_writer = TranscriptWriter(folder, 'Sensor Transcript', 'Sensor Transcript Backup', fieldnames)
+    for csv_row, txt_line in rows:
+        binary_writer.write_row(csv_row, txt_line)
+        csv_writer.write_row(csv_row, txt_line)
+    binary_writer.close()
+    csv_writer.close()
+    return folder + '/Sensor Transcript 2022-06-01.plume', folder + '/Sensor Transcript 2022-06-01.csv'
+
+def test_round_trip_matches_the_csv(tmp_path):
+    binary_filename, csv_filename = write_transcripts(str(tmp_path), make_rows(100))
+    binary = read_transcript(binary_filename)
+    text = read_transcript(csv_filename)
+
+    assert list(binary.columns) == fieldnames
+    assert binary['Row'].tolist() == text['Row'].tolist() == list(range(100))
+    assert np.array_equal(binary['Time'].values, pd.to_datetime(text['Time']).values)
+    assert np.array_equal(binary['no2'].values, text['no2'].values)
+    assert np.array_equal(binary['co2'].values, text['co2'].values)
+
+def test_row_ranges_and_columns(tmp_path):
+    binary_filename, csv_filename = write_transcripts(str(tmp_path), make_rows(100))
+    names = ['Row', 'Time', 'NO2', 'CO2']
+    for filename in (binary_filename, csv_filename):
+        data = read_transcript(filename, names=names, columns=['Row', 'CO2'], start=10, stop=15)
+        assert list(data.columns) == ['Row', 'CO2']
+        assert data['Row'].tolist() == list(range(10, 15))
+        assert data['CO2'].tolist() == [410.0, 411.0, 412.0, 413.0, 414.0]
+
+    assert len(read_transcript(binary_filename, start=100)) == 0
+    with pytest.raises(ValueError):
+        read_transcript(binary_filename, names=['Row', 'Time'])
+
+def test_half_written_record_is_ignored_then_overwritten(tmp_path):
+    binary_filename, csv_filename = write_transcripts(str(tmp_path), make_rows(10))
+    with open(binary_filename, 'ab') as file:
+        file.write(b'\x01' * 7)
+    assert binary_transcript_length(binary_filename) == 10
+    assert read_transcript(binary_filename)['Row'].tolist() == list(range(10))
+
+    writer = BinaryTranscriptWriter(str(tmp_path), 'Sensor Transcript', fieldnames)
+    for csv_row, txt_line in make_rows(5, first_row=10):
+        writer.write_row(csv_row, txt_line)
+    writer.close()
+    dtype, header_length = read_header(binary_filename)
+    assert os.path.getsize(binary_filename) == header_length + 15 * dtype.itemsize
+    assert read_transcript(binary_filename)['Row'].tolist() == list(range(15))
+
+def test_other_columns_and_other_files_are_rejected(tmp_path):
+    binary_filename, csv_filename = write_transcripts(str(tmp_path), make_rows(1))
+    writer = BinaryTranscriptWriter(str(tmp_path), 'Sensor Transcript', ['Row', 'Time', 'no2'])
+    with pytest.raises(IOError):
+        writer.write_row(*make_rows(1)[0])
+    with pytest.raises(ValueError):
+        read_header(csv_filename)
@@ -0,0 +1,77 @@
+"""
+Checks the vectorized A1 statistics of channel_algorithms.py against the per channel np.percentile / statistics.stdev
+code A1 used before, over trace stores with partly filled windows, ties and NaNs, and the AQ crossings.
+"""
+
+import os
+import sys
+import math
+import random
+import statistics
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from trace_store import TraceStore
+from channel_algorithms import A1_window_stats, evaluate_A1, evaluate_AQ
+
+#(no. of values below the percentile, their sample sd or None, the thresh bump percentile) like A1 computed them
+def A1_reference(trace, percentile, thresh_bump_percentile):
+    m = np.percentile(trace, percentile)
+    below_m = [x for x in trace if x < m]
+    sd = statistics.stdev(below_m) if len(below_m) >= 2 else None
+    thresh_bump = np.percentile(trace, thresh_bump_percentile) if thresh_bump_percentile != 0 else 0.0
+    return len(below_m), sd, thresh_bump
+
+def check_store(sample, channels=6, capacity=40, samples=300, seed=0):
+    rng = random.Random(seed)
+    names = ['c' + str(i) for i in range(channels)]
+    store = TraceStore(names, capacity)
+    percentiles = np.array([rng.choice([5, 10, 50, 75, 95]) for name in names])
+    thresh_bump_percentiles = np.array([rng.choice([0, 1, 25]) for name in names])
+    for i in range(samples):
+        for name in names:
+            if rng.random() < 0.8:
+                store.append(name, sample(rng), i)
+        rows = np.arange(channels)
+        windows, counts = store.windows(rows)
+        below_counts, sd, thresh_bump = A1_window_stats(windows, counts, percentiles, thresh_bump_percentiles)
+        for row, name in enumerate(names):
+            if store.count(name) == 0:
+                continue
+            trace = store.values(name).tolist()
+            count, reference_sd, reference_bump = A1_reference(trace, percentiles[row], thresh_bump_percentiles[row])
+            assert below_counts[row] == count
+            if reference_sd is None:
+                assert math.isnan(sd[row])
+            else:
+                assert math.isclose(sd[row], reference_sd, rel_tol=1e-9, abs_tol=1e-12)
+            if math.isnan(reference_bump):
+                assert math.isnan(thresh_bump[row])
+            else:
+                assert math.isclose(thresh_bump[row], reference_bump, rel_tol=1e-12, abs_tol=1e-12)
+
+def test_matches_reference():
+    check_store(lambda rng: rng.gauss(20, 5))
+
+def test_matches_reference_with_ties():
+    check_store(lambda rng: float(rng.randint(0, 4)), seed=1)
+
+def test_matches_reference_with_nans():
+    check_store(lambda rng: math.nan if rng.random() < 0.02 else rng.expovariate(0.1), seed=2)
+
+def test_consecutive_peaks_raise_the_threshold():
+    below_counts = np.array([10, 10, 1])
+    sd = np.array([1.0, 1.0, np.nan])
+    thresh_bump = np.zeros(3)
+    peaks, A1_n = evaluate_A1(below_counts, sd, thresh_bump, np.array([16.0, 16.0, 100.0]), np.array([15, 15, 15]),
+                              np.array([0, 2, 4]))
+    #16 >= 15 for a first peak, but not >= 15 + sqrt(2) for a third. Too few values below the percentile leaves A1_n
+    assert peaks.tolist() == [True, False, False]
+    assert A1_n.tolist() == [1, 0, 4]
+
+def test_AQ_crossings():
+    went_over, went_under, over = evaluate_AQ(np.array([5.0, 5.0, 1.0, 1.0]), np.array([2.0, 2.0, 2.0, np.nan]),
+                                              np.array([False, True, True, False]))
+    assert went_over.tolist() == [True, False, False, False]
+    assert went_under.tolist() == [False, False, True, False]
+    assert over.tolist() == [True, True, False, False]
@@ -0,0 +1,64 @@
+"""
+Checks lttb downsampling (point count, kept end points and peaks) and HistoryStore's level choice, bucket means and
+downsampled windows.
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from history_store import HistoryStore, lttb
+
+second_ns = 1000000000
+
+def test_lttb_keeps_the_ends_and_the_peaks():
+    x = np.arange(1000, dtype=np.int64)
+    y = np.sin(x / 50.0)
+    y[123] = 40.0
+    y[777] = -40.0
+    sampled_x, sampled_y = lttb(x, y, 50)
+
+    assert len(sampled_x) == len(sampled_y) == 50
+    assert sampled_x[0] == 0 and sampled_x[-1] == 999
+    assert np.all(np.diff(sampled_x) > 0)
+    assert np.array_equal(sampled_y, y[sampled_x])
+    assert 123 in sampled_x and 777 in sampled_x
+
+def test_lttb_leaves_short_traces_alone():
+    x = np.arange(10)
+    y = np.arange(10) * 2.0
+    for n_out in (10, 20, 2):
+        sampled_x, sampled_y = lttb(x, y, n_out)
+        assert np.array_equal(sampled_x, x) and np.array_equal(sampled_y, y)
+
+#a store with the raw samples of the last 100 s and 10 s means of the last 1000 s, fed one sample a second
+def make_store(seconds):
+    store = HistoryStore(['no2'], [(0, 100), (10, 100)])
+    for t in range(seconds):
+        store.append('no2', float(t), t * second_ns)
+    return store
+
+def test_recent_windows_come_from_the_raw_samples():
+    store = make_store(500)
+    timestamps, values, raw = store.window('no2', 450 * second_ns, 1000)
+    assert raw
+    assert np.array_equal(timestamps, np.arange(450, 500) * second_ns)
+    assert np.array_equal(values, np.arange(450, 500, dtype=np.float64))
+    assert store.sequence('no2') == 500
+
+def test_older_windows_come_from_bucket_means():
+    store = make_store(505)
+    timestamps, values, raw = store.window('no2', 100 * second_ns, 1000)
+    assert not raw
+    #the 10 s buckets from 100 s on, then the one still filling up with 500 to 504
+    assert np.array_equal(timestamps, np.arange(100, 510, 10) * second_ns)
+    assert np.array_equal(values, np.append(np.arange(100, 500, 10) + 4.5, 502.0))
+
+def test_windows_beyond_the_budget_are_downsampled():
+    store = make_store(100)
+    timestamps, values, raw = store.window('no2', 0, 20)
+    assert not raw
+    assert len(timestamps) == 20
+    assert timestamps[0] == 0 and timestamps[-1] == 99 * second_ns
+    assert np.array_equal(values, timestamps / second_ns)
@@ -0,0 +1,48 @@
+"""
+Checks how plan_block_reads merges register ranges into block reads (max_gap, max_block, overlaps) and read_block's
+handling of failed reads.
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modbus_blocks import plan_block_reads, read_block, modbus_max_registers
+
+#(start, count, members) of every planned block
+def plan(ranges, **kwargs):
+    return [(block.start, block.count, block.members) for block in plan_block_reads(ranges, **kwargs)]
+
+def test_contiguous_ranges_make_one_block_in_address_order():
+    ranges = {'co2': [4, 2], 'no2': [0, 2], 'wcpc': [2, 2]}
+    assert plan(ranges) == [(0, 6, [('no2', 0, 2), ('wcpc', 2, 2), ('co2', 4, 2)])]
+
+def test_gaps_up_to_max_gap_are_read_through():
+    ranges = {'no2': [0, 2], 'co2': [5, 2], 'o3': [20, 2]}
+    assert plan(ranges) == [(0, 2, [('no2', 0, 2)]), (5, 2, [('co2', 0, 2)]), (20, 2, [('o3', 0, 2)])]
+    assert plan(ranges, max_gap=3) == [(0, 7, [('no2', 0, 2), ('co2', 5, 2)]), (20, 2, [('o3', 0, 2)])]
+    assert plan(ranges, max_gap=13) == [(0, 22, [('no2', 0, 2), ('co2', 5, 2), ('o3', 20, 2)])]
+
+def test_blocks_stay_within_max_block():
+    ranges = {'pollutant_' + str(i): [2 * i, 2] for i in range(100)}
+    blocks = plan_block_reads(ranges)
+    assert [(block.start, block.count) for block in blocks] == [(0, 124), (124, 76)]
+    assert all(block.count <= modbus_max_registers for block in blocks)
+    assert sum([len(block.members) for block in blocks]) == 100
+
+    assert [(start, count) for start, count, members in plan(ranges, max_block=10)][:2] == [(0, 10), (10, 10)]
+
+def test_overlapping_ranges_share_registers():
+    ranges = {'wind': [10, 4], 'wind_speed': [10, 2], 'wind_direction': [12, 2]}
+    assert plan(ranges) == [(10, 4, [('wind_speed', 0, 2), ('wind', 0, 4), ('wind_direction', 2, 2)])]
+
+def test_range_longer_than_max_block_is_rejected():
+    with pytest.raises(ValueError):
+        plan_block_reads({'no2': [0, 10]}, max_block=8)
+
+def test_read_block_returns_none_on_failed_or_short_reads():
+    block = plan_block_reads({'no2': [10, 4]})[0]
+    assert read_block(lambda start, count: list(range(start, start + count)), block) == [10, 11, 12, 13]
+    assert read_block(lambda start, count: None, block) is None
+    assert read_block(lambda start, count: [0, 0], block) is None
@@ -0,0 +1,83 @@
+"""
+Checks that RegisterDecoder decodes every data type in all four byte / word order combinations, with scaling, and that
+it leaves out the pollutants of a block whose read failed.
+"""
+
+import os
+import sys
+import struct
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modbus_blocks import plan_block_reads
+from register_decoder import RegisterFormat, RegisterDecoder, register_types
+
+struct_formats = {'int16': '>h', 'uint16': '>H', 'int32': '>i', 'uint32': '>I', 'float32': '>f', 'float64': '>d'}
+
+#the registers a device would send for value, the way the CR1000X and other data loggers lay it out
+def encode_registers(value, data_type, byte_order, word_order):
+    raw = struct.pack(struct_formats[data_type], value)
+    words = [raw[i:i + 2] for i in range(0, len(raw), 2)]
+    if word_order == 'little':
+        words.reverse()
+    if byte_order == 'little':
+        words = [word[::-1] for word in words]
+    return [int.from_bytes(word, 'big') for word in words]
+
+#a register map with the values back to back from register 0 and a read_registers function serving it
+def register_map(values, formats):
+    registers = []
+    ranges = {}
+    for name, value in values.items():
+        register_format = formats[name]
+        ranges[name] = [len(registers), register_format.words]
+        registers.extend(encode_registers(value, register_format.data_type, register_format.byte_order,
+                                          register_format.word_order))
+    return ranges, lambda start, count: registers[start:start + count]
+
+sample_values = {'int16': -1234, 'uint16': 54321, 'int32': -123456789, 'uint32': 3123456789, 'float32': 12.5,
+                 'float64': -4012.25}
+
+@pytest.mark.parametrize('byte_order', ['big', 'little'])
+@pytest.mark.parametrize('word_order', ['big', 'little'])
+def test_every_type_and_order_round_trips(byte_order, word_order):
+    formats = {data_type: RegisterFormat(data_type, byte_order, word_order) for data_type in register_types}
+    ranges, read_registers = register_map(sample_values, formats)
+    decoder = RegisterDecoder(plan_block_reads(ranges), formats)
+    assert decoder.read(read_registers) == sample_values
+
+def test_mixed_orders_in_one_block():
+    formats = {
+        'no2': RegisterFormat('float32', 'big', 'big'),
+        'co2': RegisterFormat('float32', 'little', 'big'),
+        'wcpc': RegisterFormat('uint32', 'big', 'little'),
+        'rh': RegisterFormat('int16', 'little', 'little')
+    }
+    values = {'no2': 21.75, 'co2': 415.5, 'wcpc': 70000, 'rh': -40}
+    ranges, read_registers = register_map(values, formats)
+    blocks = plan_block_reads(ranges)
+    assert len(blocks) == 1
+    assert RegisterDecoder(blocks, formats).read(read_registers) == values
+
+def test_scale_offset_and_rounding():
+    formats = {'temp': RegisterFormat('int16', scale=0.1, offset=-40), 'o3': RegisterFormat('float32', decimals=1)}
+    ranges, read_registers = register_map({'temp': 653, 'o3': 31.26}, formats)
+    assert RegisterDecoder(plan_block_reads(ranges), formats).read(read_registers) == {'temp': 25.3, 'o3': 31.3}
+
+def test_failed_block_is_left_out():
+    formats = {'no2': RegisterFormat(), 'co2': RegisterFormat()}
+    registers = encode_registers(21.5, 'float32', 'big', 'big')
+    ranges = {'no2': [0, 2], 'co2': [100, 2]}
+    read_registers = lambda start, count: registers if start == 0 else None
+    decoder = RegisterDecoder(plan_block_reads(ranges), formats)
+    assert decoder.read(read_registers) == {'no2': 21.5}
+
+def test_too_few_registers_for_the_type():
+    with pytest.raises(ValueError):
+        RegisterDecoder(plan_block_reads({'no2': [0, 1]}), {'no2': RegisterFormat('float32')})
+
+def test_bad_format_is_rejected():
+    with pytest.raises(ValueError):
+        RegisterFormat('float16')
+    with pytest.raises(ValueError):
+        RegisterFormat(byte_order='middle')
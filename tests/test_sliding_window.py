@@ -0,0 +1,68 @@
+"""
+Checks SlidingWindow against the np.percentile / statistics.stdev code new_PP_A1.py's A1 algorithm used before it
+(see below_m_reference), over sliding windows with ties and NaNs. Run with "python -m pytest tests" from the repo root.
+"""
+
+import os
+import sys
+import math
+import random
+import statistics
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sliding_window import SlidingWindow
+
+#what ispeak computed from the trace before SlidingWindow: (no. of points below the percentile, their sample sd, the
+#percentile)
+def below_m_reference(trace, percentile):
+    m = np.percentile(trace, percentile)
+    below_m = []
+    for x in trace:
+        if x<m:
+            below_m.append(x)
+    sd = statistics.stdev(below_m) if len(below_m) >= 2 else None
+    return len(below_m), sd, m
+
+def check_window(samples, maxlen, percentiles, resync_interval=1024):
+    window = SlidingWindow(maxlen=maxlen, resync_interval=resync_interval)
+    for x in samples:
+        window.append(x)
+        for percentile in percentiles:
+            count, sd, m = below_m_reference(list(window), percentile)
+            window_count, window_mean, window_sd = window.below_percentile_stats(percentile)
+            window_m = window.percentile(percentile)
+            assert window_count == count
+            if math.isnan(m):
+                assert math.isnan(window_m)
+            else:
+                assert math.isclose(window_m, m, rel_tol=1e-9, abs_tol=1e-9)
+            if sd is not None:
+                assert math.isclose(window_sd, sd, rel_tol=1e-6, abs_tol=1e-9)
+
+def test_matches_reference():
+    rng = random.Random(0)
+    samples = [rng.gauss(20, 5) for i in range(600)]
+    check_window(samples, 50, [5, 50, 95])
+
+def test_matches_reference_with_ties():
+    rng = random.Random(1)
+    samples = [float(rng.randint(0, 6)) for i in range(600)]
+    check_window(samples, 40, [10, 50, 90], resync_interval=64)
+
+def test_matches_reference_with_nans():
+    rng = random.Random(2)
+    samples = [math.nan if rng.random() < 0.05 else rng.gauss(20, 5) for i in range(600)]
+    check_window(samples, 30, [5, 50])
+
+def test_nan_only_window():
+    window = SlidingWindow([math.nan, math.nan], maxlen=3)
+    assert window.below_percentile_stats(5) == (0, None, None)
+    assert math.isnan(window.percentile(50))
+    for x in [1.0, 2.0, 3.0]:
+        window.append(x)
+    assert window.nan_count == 0
+    assert window.percentile(50) == 2.0
+    window.reset([4.0, math.nan])
+    assert window.nan_count == 1
+    assert math.isnan(window.percentile(50))
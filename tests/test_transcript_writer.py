@@ -0,0 +1,146 @@
+"""
+Checks TranscriptWriter's batching, per-row day routing and retry/max_pending_rows handling of a failing disk, and
+TranscriptQueue's 'block', 'drop_oldest' and 'spill' overflow policies.
+"""
+
+import os
+import sys
+import csv
+import threading
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from transcript_writer import TranscriptWriter, TranscriptQueue
+
+fieldnames = ['Row', 'Time', 'no2']
+
+def make_row(row, time):
+    return [row, time, float(row)], str(row) + "," + time + "\n"
+
+def read_csv(filename):
+    with open(filename, newline='') as file:
+        return list(csv.reader(file))
+
+#writer whose disk can be made to fail
+class FailingWriter(TranscriptWriter):
+    failing = False
+
+    def write_rows(self, day, rows):
+        if self.failing:
+            raise IOError('disk full')
+        super().write_rows(day, rows)
+
+#stand-in writer that records the rows it's given, and can hold the queue's writer thread in write_row until released
+class RecordingWriter:
+    def __init__(self):
+        self.flush_interval_s = 0
+        self.pending_rows = []
+        self.dropped_rows = 0
+        self.rows = []
+        self.writing = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def write_row(self, csv_row, txt_line):
+        self.writing.set()
+        self.release.wait()
+        self.rows.append(csv_row[0])
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_rows_go_to_the_files_of_their_own_day(tmp_path):
+    writer = TranscriptWriter(str(tmp_path), 'Sensor Transcript', 'Sensor Transcript Backup', fieldnames)
+    for row, time in enumerate(['2022-06-01 23:59:58', '2022-06-01 23:59:59', '2022-06-02 00:00:00',
+                                '2022-06-01 23:59:59', '2022-06-02 00:00:01']):
+        writer.write_row(*make_row(row, time))
+    writer.close()
+
+    first_day = read_csv(str(tmp_path / 'Sensor Transcript 2022-06-01.csv'))
+    second_day = read_csv(str(tmp_path / 'Sensor Transcript 2022-06-02.csv'))
+    assert first_day[0] == fieldnames and second_day[0] == fieldnames
+    assert [line[0] for line in first_day[1:]] == ['0', '1', '3']
+    assert [line[0] for line in second_day[1:]] == ['2', '4']
+    with open(str(tmp_path / 'Sensor Transcript Backup 2022-06-02.txt')) as file:
+        assert file.read() == "2,2022-06-02 00:00:00\n4,2022-06-02 00:00:01\n"
+
+def test_rows_are_batched_until_flush_rows(tmp_path):
+    writer = TranscriptWriter(str(tmp_path), 'Sensor Transcript', 'Sensor Transcript Backup', fieldnames, flush_rows=3,
+                              flush_interval_s=3600)
+    filename = str(tmp_path / 'Sensor Transcript 2022-06-01.csv')
+    writer.write_row(*make_row(0, '2022-06-01 12:00:00'))
+    writer.write_row(*make_row(1, '2022-06-01 12:00:01'))
+    assert not os.path.exists(filename)
+    writer.write_row(*make_row(2, '2022-06-01 12:00:02'))
+    assert len(read_csv(filename)) == 4
+    writer.close()
+
+def test_failed_flush_keeps_the_newest_rows_and_waits_before_retrying(tmp_path):
+    writer = FailingWriter(str(tmp_path), 'Sensor Transcript', 'Sensor Transcript Backup', fieldnames,
+                           max_pending_rows=3, retry_interval_s=3600)
+    writer.failing = True
+    with pytest.raises(IOError):
+        writer.write_row(*make_row(0, '2022-06-01 12:00:00'))
+
+    #within the retry interval the rows are only queued, past max_pending_rows the oldest are dropped
+    for row in range(1, 5):
+        writer.write_row(*make_row(row, '2022-06-01 12:00:0' + str(row)))
+    assert [csv_row[0] for day, csv_row, txt_line in writer.pending_rows] == [2, 3, 4]
+    assert writer.dropped_rows == 2
+
+    writer.failing = False
+    writer.flush()
+    assert len(writer.pending_rows) == 3
+
+    writer.retry_at = 0.0
+    writer.flush()
+    writer.close()
+    assert writer.pending_rows == []
+    lines = read_csv(str(tmp_path / 'Sensor Transcript 2022-06-01.csv'))
+    assert [line[0] for line in lines[1:]] == ['2', '3', '4']
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        TranscriptQueue({}, overflow='ignore')
+
+def test_block_writes_every_row_in_order(tmp_path):
+    writer = TranscriptWriter(str(tmp_path), 'Sensor Transcript', 'Sensor Transcript Backup', fieldnames)
+    transcript_queue = TranscriptQueue({'sensor': writer}, maxsize=2, overflow='block')
+    for row in range(50):
+        transcript_queue.put('sensor', *make_row(row, '2022-06-01 12:00:00'))
+    transcript_queue.close()
+
+    lines = read_csv(str(tmp_path / 'Sensor Transcript 2022-06-01.csv'))
+    assert [int(line[0]) for line in lines[1:]] == list(range(50))
+    stats = transcript_queue.stats()
+    assert (stats['enqueued_rows'], stats['written_rows'], stats['dropped_rows']) == (50, 50, 0)
+
+#puts rows 0 to count - 1 while the writer thread is held writing row 0, then lets it catch up and closes the queue
+def fill_stalled_queue(overflow, count):
+    writer = RecordingWriter()
+    writer.release.clear()
+    transcript_queue = TranscriptQueue({'sensor': writer}, maxsize=2, overflow=overflow)
+    transcript_queue.put('sensor', *make_row(0, '2022-06-01 12:00:00'))
+    assert writer.writing.wait(5)
+    for row in range(1, count):
+        transcript_queue.put('sensor', *make_row(row, '2022-06-01 12:00:00'))
+    stats = transcript_queue.stats()
+    writer.release.set()
+    transcript_queue.close(timeout=5)
+    return writer.rows, stats
+
+def test_drop_oldest_keeps_the_newest_queued_rows():
+    rows, stats = fill_stalled_queue('drop_oldest', 6)
+    assert rows == [0, 4, 5]
+    assert stats['dropped_rows'] == 3
+    assert stats['depth'] == 2
+
+def test_spill_writes_every_row_in_order():
+    rows, stats = fill_stalled_queue('spill', 6)
+    assert rows == list(range(6))
+    assert stats['spilled_rows'] == 3
+    assert stats['spill_depth'] == 3
+    assert stats['dropped_rows'] == 0
@@ -0,0 +1,124 @@
+"""
+Array-backed trace store for the dashboard (main.py).
+
+TraceStore holds the last 'capacity' values of every channel (pollutant) in preallocated NumPy ring buffers: a float64
+value and an int64 timestamp (nanoseconds since the epoch, local wall-clock time) per sample. Each ring is mirrored, i.e.
+every sample is written twice, 'capacity' slots apart, so a channel's samples are always one contiguous slice of the
+buffer and values() / timestamps() can return ordered views without copying. The views are only valid until the next
+append, so callers that hold on to them (or read them from another thread) should hold the lock that guards the appends
+or copy them.
+
+Every append bumps the store's version and the channel's sequence number (the total number of samples the channel has
+received), so consumers can tell whether anything changed and which samples are new since they last looked.
+
+The ingest engine, the auto event algorithms (see channel_algorithms.py), the log files and the plots all read from the
+one store.
+"""
+
+import datetime as dt
+import numpy as np
+
+class TraceStore:
+    def __init__(self, channels, capacity):
+        self.channels = list(channels)
+        self.index = {channel: i for i, channel in enumerate(self.channels)}
+        self.capacity = capacity
+
+        self.value_buffer = np.zeros((len(self.channels), 2 * capacity), dtype=np.float64)
+        self.timestamp_buffer = np.zeros((len(self.channels), 2 * capacity), dtype=np.int64)
+        self.starts = np.zeros(len(self.channels), dtype=np.intp)
+        self.counts = np.zeros(len(self.channels), dtype=np.intp)
+        self.sequences = np.zeros(len(self.channels), dtype=np.int64)
+        self.version = 0
+
+    def __len__(self):
+        return len(self.channels)
+
+    #number of samples a channel currently holds
+    def count(self, channel):
+        return int(self.counts[self.index[channel]])
+
+    #total number of samples a channel has ever received
+    def sequence(self, channel):
+        return int(self.sequences[self.index[channel]])
+
+    #adds a sample to a channel, dropping its oldest sample if the channel is full
+    def append(self, channel, value, timestamp_ns):
+        row = self.index[channel]
+        position = (self.starts[row] + self.counts[row]) % self.capacity
+        self.value_buffer[row, position] = value
+        self.value_buffer[row, position + self.capacity] = value
+        self.timestamp_buffer[row, position] = timestamp_ns
+        self.timestamp_buffer[row, position + self.capacity] = timestamp_ns
+
+        if self.counts[row] == self.capacity:
+            self.starts[row] = (self.starts[row] + 1) % self.capacity
+        else:
+            self.counts[row] += 1
+        self.sequences[row] += 1
+        self.version += 1
+
+    #ordered (oldest first) view of a channel's values
+    def values(self, channel):
+        row = self.index[channel]
+        return self.value_buffer[row, self.starts[row]:self.starts[row] + self.counts[row]]
+
+    #ordered (oldest first) view of a channel's timestamps, in epoch nanoseconds
+    def timestamps(self, channel):
+        row = self.index[channel]
+        return self.timestamp_buffer[row, self.starts[row]:self.starts[row] + self.counts[row]]
+
+    #a channel's newest value, or default if it hasn't received any
+    def last(self, channel, default=0.0):
+        row = self.index[channel]
+        if self.counts[row] == 0:
+            return default
+        return float(self.value_buffer[row, self.starts[row] + self.counts[row] - 1])
+
+    #a channel's newest timestamp, or None if it hasn't received any
+    def last_timestamp(self, channel):
+        row = self.index[channel]
+        if self.counts[row] == 0:
+            return None
+        return int(self.timestamp_buffer[row, self.starts[row] + self.counts[row] - 1])
+
+    #copies of a channel's values and timestamps, and the store version they were taken at
+    def snapshot(self, channel):
+        return self.values(channel).copy(), self.timestamps(channel).copy(), self.version
+
+    #the newest value of each of the given rows (channel indexes)
+    def last_values(self, rows):
+        return self.value_buffer[rows, self.starts[rows] + self.counts[rows] - 1]
+
+    #copies of the given rows' windows (oldest first), with empty slots set to +inf, and the number of samples in each
+    #row
+    def windows(self, rows):
+        slots = np.arange(self.capacity)
+        windows = self.value_buffer[rows[:, None], self.starts[rows, None] + slots[None, :]]
+        filled = slots[None, :] < self.counts[rows, None]
+        return np.where(filled, windows, np.inf), self.counts[rows]
+
+#the current local wall-clock time in epoch nanoseconds, the time base of the time stamps
+def local_now_ns():
+    return int(np.datetime64(dt.datetime.now(), 'ns').astype(np.int64))
+
+#converts epoch nanoseconds back to a (local, naive) datetime
+def ns_to_datetime(timestamp_ns):
+    return dt.datetime(1970, 1, 1) + dt.timedelta(microseconds=int(timestamp_ns) // 1000)
+
+#converts a DAQ frame record's ISO 8601 time stamp (local time, e.g. "2022-06-01T13:45:10.250000") to epoch
+#nanoseconds
+def iso_time_to_ns(time_string):
+    return int(np.datetime64(time_string, 'ns').astype(np.int64))
+
+#converts a DAQ time stamp ("HH:MM:SS", local time) to epoch nanoseconds, on today's date. A time stamp more than 12
+#hours ahead of now is taken to be from yesterday, which happens when a sample from just before midnight is read just
+#after it
+def time_of_day_to_ns(time_string, now=None):
+    if now is None:
+        now = dt.datetime.now()
+    time_of_day = dt.datetime.strptime(time_string, "%H:%M:%S").time()
+    timestamp = dt.datetime.combine(now.date(), time_of_day)
+    if timestamp - now > dt.timedelta(hours=12):
+        timestamp -= dt.timedelta(days=1)
+    return int(np.datetime64(timestamp, 'ns').astype(np.int64))
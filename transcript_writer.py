@@ -0,0 +1,335 @@
+"""
+Buffered writer for the dashboard's daily log files (the Sensor Transcript and the Event Markers, each with its '.txt'
+backup).
+
+A TranscriptWriter keeps its csv and txt files open instead of re-opening them for every row, batches rows in memory
+and writes them out once 'flush_rows' rows are waiting or 'flush_interval_s' seconds have passed since the last flush,
+optionally fsync-ing so the rows survive a power cut. Files are named '<name> <date>.csv' and '<backup name>
+<date>.txt', each row going to the files of the date in its 'Time' column (so a backlog written after midnight still
+lands in the right day's files). close() flushes whatever is left, so it should be called on shutdown. If a flush fails
+(e.g. the disk is full) the rows stay pending and the next flush is only tried retry_interval_s later; past
+max_pending_rows the oldest pending rows are dropped, so a disk that stays broken doesn't eat up the memory.
+
+TranscriptQueue moves the disk I/O off the callers' threads: callers only put (writer name, csv row, txt line) tuples
+on a bounded queue and a single background thread writes them out. When the queue is full the 'overflow' policy
+decides what happens to a new row:
+    'block'       - the caller waits for room, so no rows are lost
+    'drop_oldest' - the oldest queued row is dropped to make room
+    'spill'       - rows go to a temporary file and are written out, in order, once the writer thread catches up
+stats() returns the queue depth and the enqueued, written, dropped and spilled row counts. If observe_write is given it's
+called with the seconds the writer thread spent on each row (or batch of spilled rows) and each flush that wrote
+anything, e.g. to keep a latency histogram.
+"""
+
+import os
+import csv
+import json
+import time
+import queue
+import tempfile
+import threading
+import datetime as dt
+
+class TranscriptWriter:
+    def __init__(self, folder_path, csv_name, txt_name, fieldnames, flush_rows=1, flush_interval_s=0, fsync=True,
+                 max_pending_rows=10000, retry_interval_s=5):
+        self.folder_path = folder_path
+        self.csv_name = csv_name
+        self.txt_name = txt_name
+        self.fieldnames = list(fieldnames)
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_interval_s = flush_interval_s
+        self.fsync = fsync
+        self.max_pending_rows = max(self.flush_rows, int(max_pending_rows))
+        self.retry_interval_s = retry_interval_s
+        #column holding each row's "YYYY-MM-DD HH:MM:SS" time, which picks the day's file
+        self.time_column = self.fieldnames.index('Time') if 'Time' in self.fieldnames else None
+
+        #rows waiting to be written, as (day, csv row, txt line), and how many were dropped because they couldn't be
+        #written
+        self.pending_rows = []
+        self.dropped_rows = 0
+        #monotonic time before which a failed flush isn't retried
+        self.retry_at = 0.0
+
+        #open files and the day they were opened for
+        self.csv_file = None
+        self.txt_file = None
+        self.csv_writer = None
+        self.file_day = None
+
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+
+    #file names for a given day
+    def csv_filename(self, day):
+        return self.folder_path + "/" + self.csv_name + " " + str(day) + ".csv"
+
+    def txt_filename(self, day):
+        return self.folder_path + "/" + self.txt_name + " " + str(day) + ".txt"
+
+    #opens the csv and txt files for a given day, writing the csv header if the csv is new
+    def open_files(self, day):
+        self.close_files()
+
+        filename = self.csv_filename(day)
+        file_exists = os.path.isfile(filename) and os.path.getsize(filename) > 0
+        self.csv_file = open(filename, 'a', newline='\n')
+        self.txt_file = open(self.txt_filename(day), 'a', newline='\n')
+        self.csv_writer = csv.writer(self.csv_file, delimiter=',')
+        self.file_day = day
+
+        if not file_exists:
+            self.csv_writer.writerow(self.fieldnames)
+
+    def close_files(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.txt_file.close()
+        self.csv_file = None
+        self.txt_file = None
+        self.csv_writer = None
+        self.file_day = None
+
+    #the day a row belongs to, from its time column (today if it has none)
+    def row_day(self, csv_row):
+        if self.time_column is not None:
+            try:
+                return dt.date.fromisoformat(str(csv_row[self.time_column])[:10])
+            except ValueError:
+                pass
+        return dt.date.today()
+
+    #writes rows (csv row, txt line pairs) of one day to its files
+    def write_rows(self, day, rows):
+        if self.file_day != day:
+            self.open_files(day)
+
+        self.csv_writer.writerows([csv_row for csv_row, txt_line in rows])
+        self.txt_file.write(''.join([txt_line for csv_row, txt_line in rows]))
+
+        self.csv_file.flush()
+        self.txt_file.flush()
+        if self.fsync:
+            os.fsync(self.csv_file.fileno())
+            os.fsync(self.txt_file.fileno())
+
+    #writes the pending rows to disk, a day at a time, the lock must already be held. On failure the rows that weren't
+    #written stay pending and the next flush waits retry_interval_s
+    def flush_pending(self):
+        try:
+            while self.pending_rows:
+                day = self.pending_rows[0][0]
+                count = 1
+                while (count < len(self.pending_rows)) and (self.pending_rows[count][0] == day):
+                    count += 1
+                self.write_rows(day, [(csv_row, txt_line) for row_day, csv_row, txt_line in self.pending_rows[:count]])
+                del self.pending_rows[:count]
+        except IOError:
+            self.retry_at = time.monotonic() + self.retry_interval_s
+            raise
+
+        self.last_flush = time.monotonic()
+
+    #queues one row, csv_row is a list in fieldnames order and txt_line is the (newline terminated) backup line
+    def write_row(self, csv_row, txt_line):
+        with self.lock:
+            self.pending_rows.append((self.row_day(csv_row), csv_row, txt_line))
+
+            #drop the oldest rows if the disk has been failing for that long
+            if len(self.pending_rows) > self.max_pending_rows:
+                dropped = len(self.pending_rows) - self.max_pending_rows
+                del self.pending_rows[:dropped]
+                self.dropped_rows += dropped
+
+            if time.monotonic() < self.retry_at:
+                return
+            if (len(self.pending_rows) >= self.flush_rows) or (time.monotonic() - self.last_flush >= self.flush_interval_s):
+                self.flush_pending()
+
+    def flush(self):
+        with self.lock:
+            if time.monotonic() >= self.retry_at:
+                self.flush_pending()
+
+    #flushes whatever is left and closes the files
+    def close(self):
+        with self.lock:
+            try:
+                self.flush_pending()
+            finally:
+                self.close_files()
+
+#overflow policies a TranscriptQueue accepts
+overflow_policies = ['block', 'drop_oldest', 'spill']
+
+#bounded queue of rows with one background thread writing them to their TranscriptWriters
+class TranscriptQueue:
+    def __init__(self, writers, maxsize=1000, overflow='block', observe_write=None):
+        if overflow not in overflow_policies:
+            raise ValueError('overflow must be one of: ' + ', '.join(overflow_policies))
+
+        #writers by name, rows are queued as (writer name, csv row, txt line)
+        self.writers = dict(writers)
+        self.overflow = overflow
+        self.rows = queue.Queue(maxsize=max(1, int(maxsize)))
+        self.observe_write = observe_write
+
+        #spill file, created the first time the queue overflows. While it holds rows every new row goes to it as
+        #well, so rows are still written in order
+        self.spill_file = None
+        self.spill_count = 0
+        self.spill_lock = threading.Lock()
+
+        self.stats_lock = threading.Lock()
+        self.enqueued_rows = 0
+        self.written_rows = 0
+        self.dropped_rows = 0
+        self.spilled_rows = 0
+        self.write_errors = 0
+        self.max_depth = 0
+
+        #the thread wakes up at least this often so the writers' flush intervals are honoured when rows stop coming
+        self.poll_interval_s = min([1.0] + [max(0.05, writer.flush_interval_s) for writer in self.writers.values()])
+
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name='transcript-writer', daemon=True)
+        self.thread.start()
+
+    def count(self, counter, amount=1):
+        with self.stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    #queues one row for the named writer, applying the overflow policy if the queue is full
+    def put(self, writer_name, csv_row, txt_line):
+        if self.closed:
+            return
+        row = (writer_name, csv_row, txt_line)
+        self.count('enqueued_rows')
+
+        if self.overflow == 'block':
+            self.rows.put(row)
+        elif self.overflow == 'drop_oldest':
+            while True:
+                try:
+                    self.rows.put_nowait(row)
+                    break
+                except queue.Full:
+                    try:
+                        self.rows.get_nowait()
+                        self.count('dropped_rows')
+                    except queue.Empty:
+                        pass
+        else:
+            with self.spill_lock:
+                if self.spill_count == 0:
+                    try:
+                        self.rows.put_nowait(row)
+                        row = None
+                    except queue.Full:
+                        pass
+                if row is not None:
+                    self.spill(row)
+
+        with self.stats_lock:
+            self.max_depth = max(self.max_depth, self.rows.qsize())
+
+    #appends a row to the spill file, the spill lock must already be held
+    def spill(self, row):
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(mode='w+', prefix='plume_transcript_spill_')
+        self.spill_file.write(json.dumps(row, default=float) + "\n")
+        self.spill_count += 1
+        self.count('spilled_rows')
+
+    #reads back and empties the spill file
+    def take_spilled_rows(self):
+        with self.spill_lock:
+            if self.spill_count == 0:
+                return []
+            self.spill_file.seek(0)
+            spilled_rows = [tuple(json.loads(line)) for line in self.spill_file]
+            self.spill_file.seek(0)
+            self.spill_file.truncate()
+            self.spill_count = 0
+            return spilled_rows
+
+    def write(self, rows):
+        for writer_name, csv_row, txt_line in rows:
+            try:
+                self.writers[writer_name].write_row(csv_row, txt_line)
+                self.count('written_rows')
+            except IOError:
+                self.count('write_errors')
+                print("Error writing " + writer_name + " log file. Check log folder read/write permissions or run bash script as administrator")
+
+    def flush_writers(self):
+        for writer_name, writer in self.writers.items():
+            try:
+                writer.flush()
+            except IOError:
+                self.count('write_errors')
+                print("Error writing " + writer_name + " log file. Check log folder read/write permissions or run bash script as administrator")
+
+    #reports how long the writer thread took since start
+    def observe(self, start):
+        if self.observe_write is not None:
+            self.observe_write(time.perf_counter() - start)
+
+    #writer thread, runs until close() queues None
+    def run(self):
+        while True:
+            try:
+                row = self.rows.get(timeout=self.poll_interval_s)
+            except queue.Empty:
+                #caught up, so write out anything that was spilled and flush rows that have waited long enough
+                start = time.perf_counter()
+                pending = (self.spill_count > 0) or any(writer.pending_rows for writer in self.writers.values())
+                self.write(self.take_spilled_rows())
+                self.flush_writers()
+                if pending:
+                    self.observe(start)
+                continue
+
+            if row is None:
+                break
+            start = time.perf_counter()
+            self.write([row])
+            if self.rows.empty():
+                self.write(self.take_spilled_rows())
+            self.observe(start)
+
+    #returns the queue depth and row counters
+    def stats(self):
+        with self.stats_lock:
+            return dict(
+                depth=self.rows.qsize(),
+                max_depth=self.max_depth,
+                maxsize=self.rows.maxsize,
+                overflow=self.overflow,
+                spill_depth=self.spill_count,
+                enqueued_rows=self.enqueued_rows,
+                written_rows=self.written_rows,
+                dropped_rows=self.dropped_rows,
+                spilled_rows=self.spilled_rows,
+                write_errors=self.write_errors,
+                pending_rows=sum([len(writer.pending_rows) for writer in self.writers.values()]),
+                failed_dropped_rows=sum([writer.dropped_rows for writer in self.writers.values()])
+            )
+
+    #writes out everything still queued or spilled, then flushes and closes the writers
+    def close(self, timeout=None):
+        if self.closed:
+            return
+        self.closed = True
+        self.rows.put(None)
+        self.thread.join(timeout)
+
+        self.write(self.take_spilled_rows())
+        if self.spill_file is not None:
+            self.spill_file.close()
+        for writer_name, writer in self.writers.items():
+            try:
+                writer.close()
+            except IOError:
+                print("Error closing " + writer_name + " log file. Check log folder read/write permissions or run bash script as administrator")
@@ -0,0 +1,34 @@
+"""
+WSGI entry point for serving the dashboard (main.py) with a production server and several worker processes, e.g.
+
+    gunicorn --workers 4 --bind 0.0.0.0:8090 wsgi:server
+
+Set the [state] "backend" setting to "redis" first: the workers then share one ingest engine, trace and auto event
+algorithm state through redis (see state_backend.py), and only one of them writes the log files. With the "local"
+backend every worker would ingest and log on its own, so only use it with a single worker. Don't use gunicorn's
+--preload, the ingest engine thread has to be started in each worker. Responses are compressed and assets cached as
+in the [server] "production" mode, whatever the "mode" setting says.
+
+With [push] "enable_push" on, every open dashboard holds a WebSocket (and the worker thread serving it) for as long as
+it's open, so a sync worker would be pinned by a single browser. Use threaded workers with a thread per expected viewer
+plus a few for the regular requests, e.g.
+
+    gunicorn --workers 4 --worker-class gthread --threads 32 --bind 0.0.0.0:8090 wsgi:server
+
+(or gevent workers, --worker-class gevent, with gevent installed). main.py's own "production" mode serves with waitress,
+which can't serve WebSockets, so push is only available through gunicorn.
+
+Run gunicorn from this folder so it picks up gunicorn.conf.py, which writes out each worker's buffered log rows when the
+worker exits.
+"""
+
+import main
+
+main.initialize(production=True)
+if main.simple_start_daq_script is not None:
+    print("[simple_start] is on, but the workers don't start the DAQ script, run " + main.simple_start_daq_script + " yourself")
+if isinstance(main.state_backend, main.LocalStateBackend):
+    print("[state] backend is \"local\", serve the dashboard with a single worker or set it to \"redis\"")
+main.start_ingest_engine()
+
+server = main.server